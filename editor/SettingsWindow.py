@@ -1,6 +1,6 @@
 from PyQt5.QtWidgets import (
     QDialog, QCheckBox, QVBoxLayout, QDialogButtonBox, QGroupBox, QHBoxLayout,
-    QLabel, QSpinBox, QPushButton, QTabWidget, QWidget, QFormLayout
+    QLabel, QSpinBox, QPushButton, QTabWidget, QWidget, QFormLayout, QComboBox
 )
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QKeySequence
@@ -57,6 +57,13 @@ class SettingsWindow(QDialog):
         physics_layout = QVBoxLayout()
         self.physics_checkbox = QCheckBox("Physics in Play mode")
         physics_layout.addWidget(self.physics_checkbox)
+        collision_layout = QHBoxLayout()
+        collision_layout.addWidget(QLabel("Play mode collision:"))
+        self.collision_combo = QComboBox()
+        self.collision_combo.addItem("Brushes (swept boxes)", 'brushes')
+        self.collision_combo.addItem("Tilemap (single floor)", 'tilemap')
+        collision_layout.addWidget(self.collision_combo)
+        physics_layout.addLayout(collision_layout)
         physics_group.setLayout(physics_layout)
         display_physics_layout.addWidget(physics_group)
         display_physics_layout.addStretch()
@@ -129,6 +136,7 @@ class SettingsWindow(QDialog):
 
         # Physics settings
         self.physics_checkbox.setChecked(self.config.getboolean('Settings', 'physics', fallback=True))
+        self.collision_combo.setCurrentIndex(max(0, self.collision_combo.findData(self.config.get('Settings', 'collision', fallback='brushes'))))
 
         # Controls settings
         self.invert_mouse_checkbox.setChecked(self.config.getboolean('Controls', 'invert_mouse', fallback=False))
@@ -147,6 +155,7 @@ class SettingsWindow(QDialog):
 
         if not self.config.has_section('Settings'): self.config.add_section('Settings')
         self.config.set('Settings', 'physics', str(self.physics_checkbox.isChecked()))
+        self.config.set('Settings', 'collision', self.collision_combo.currentData())
 
         if not self.config.has_section('Controls'): self.config.add_section('Controls')
         self.config.set('Controls', 'invert_mouse', str(self.invert_mouse_checkbox.isChecked()))
@@ -0,0 +1,552 @@
+"""
+Array-backed storage for brushes.
+
+Brushes are still dicts as far as editor code is concerned, but a Brush keeps
+its position, size and face textures in the columns of one BrushStore
+instead of in nested lists and dicts: pos and size are rows of (N, 3)
+float64 arrays, and each face's texture is an interned integer id. The flags
+that every pass tests (hidden, lock, trigger, fog, mover, solid, subtract)
+are mirrored into a bit column. Everything else (names, targets, fog
+settings...) stays in the dict itself.
+
+brush['pos'] and brush['size'] read as fresh lists, like everything else the
+mapping protocol hands out (dict(brush), items(), to_dict(), json), so no
+copy ever aliases a store row; write a whole new value back to move or
+resize a brush. Zero-copy access is on the store's columns: renderers,
+collision and the 2D views read them through slots() instead of visiting
+every dict.
+
+Brushes compare by identity against each other, and BrushList finds them by
+identity, so index(), remove() and `in` never compare brush contents.
+"""
+import copy
+import sys
+import weakref
+import numpy as np
+from collections.abc import MutableMapping
+from .entity_store import MISSING, new_entity_id
+
+FLAG_HIDDEN = 1 << 0
+FLAG_LOCK = 1 << 1
+FLAG_TRIGGER = 1 << 2
+FLAG_FOG = 1 << 3
+FLAG_MOVER = 1 << 4
+FLAG_NON_SOLID = 1 << 5 # 'solid' is explicitly false
+FLAG_SUBTRACT = 1 << 6
+FLAG_TEXTURED = 1 << 7 # The brush has a 'textures' entry
+FLAG_LIVE = 1 << 15 # The slot is in use
+
+# Dict keys mirrored into flag bits, and the bit each one sets.
+FLAG_KEYS = {
+    'hidden': FLAG_HIDDEN, 'lock': FLAG_LOCK, 'is_trigger': FLAG_TRIGGER,
+    'is_fog': FLAG_FOG, 'is_mover': FLAG_MOVER, 'solid': FLAG_NON_SOLID, 'operation': FLAG_SUBTRACT,
+}
+NO_TEXTURE = -1
+FACES = ('north', 'south', 'east', 'west', 'top', 'down', 'bottom')
+SLOT_CACHE_SIZE = 4 # Scene lists whose slots are cached
+
+
+def _flag_set(key, value):
+    if key == 'solid':
+        return not value
+    if key == 'operation':
+        return value == 'subtract'
+    return bool(value)
+
+
+class BrushStore:
+    def __init__(self, capacity=1024):
+        self.pos = np.zeros((capacity, 3))
+        self.size = np.zeros((capacity, 3))
+        self.flags = np.zeros(capacity, dtype=np.uint16)
+        self.textures = np.full((capacity, len(FACES)), NO_TEXTURE, dtype=np.int32)
+        self.ids = np.zeros(capacity, dtype=np.int64) # Entity id of the brush in each slot
+        self.faces = list(FACES) # Face name of each textures column
+        self._face_columns = {face: i for i, face in enumerate(FACES)}
+        self.texture_names = [] # Interned texture names, by id
+        self._texture_ids = {}
+        self._objects = [None] * capacity # Weak references to the Brush in each slot
+        self._free = [] # Released slots, reused first
+        self._used = 0 # Slots below this have been handed out at some point
+        self._scene_cache = {} # id(brush list) -> (length, (store, list) version, slots, list)
+        self.version = 0 # Bumped when a slot is taken or freed
+        self._watchers = [] # Weak references to callbacks told of every noted write: each EditorState's undo history, index and events
+
+    def __len__(self):
+        return int(np.count_nonzero(self.flags & FLAG_LIVE))
+
+    # --- Slots ---
+    def _grow(self):
+        old = len(self.flags)
+        new = old * 2
+        for name in ('pos', 'size', 'flags', 'textures', 'ids'):
+            column = getattr(self, name)
+            grown = np.zeros((new,) + column.shape[1:], dtype=column.dtype)
+            grown[:old] = column
+            setattr(self, name, grown)
+        self.textures[old:] = NO_TEXTURE
+        self._objects.extend([None] * old)
+
+    def add(self, brush):
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self._used == len(self.flags):
+                self._grow()
+            slot = self._used
+            self._used += 1
+        self.pos[slot] = 0.0
+        self.size[slot] = 0.0
+        self.flags[slot] = FLAG_LIVE
+        self.textures[slot] = NO_TEXTURE
+        self.ids[slot] = new_entity_id()
+        self._objects[slot] = weakref.ref(brush)
+        self.version += 1
+        return slot
+
+    def release(self, slot):
+        self.flags[slot] = 0
+        self._objects[slot] = None
+        self._free.append(slot)
+        self.version += 1
+
+    def watch(self, callback):
+        """Calls callback(store, slot, key, old) on every noted write, for as long as callback's object lives."""
+        self._watchers = [ref for ref in self._watchers if ref() is not None]
+        self._watchers.append(weakref.WeakMethod(callback))
+
+    def note_edit(self, slot, key, old):
+        """Notes a write about to happen: every watcher is told its key and the old value."""
+        for ref in self._watchers:
+            callback = ref()
+            if callback is not None:
+                callback(self, slot, key, old)
+
+    def note_rows(self, column, slots):
+        """note_edit() for rows of a column ('pos', 'size' or 'textures') about to be written in bulk."""
+        rows = getattr(self, column)
+        for slot in np.asarray(slots).tolist():
+            self.note_edit(slot, column, rows[slot].copy())
+
+    def write_rows(self, column, slots, rows):
+        """Writes rows (possibly narrower than the column) to the given slots, noting the edits."""
+        self.note_rows(column, slots)
+        getattr(self, column)[slots, :rows.shape[1]] = rows
+
+    def object(self, slot):
+        """The Brush in slot, or None."""
+        ref = self._objects[slot]
+        return ref() if ref is not None else None
+
+    def set_flag(self, slot, bit, on):
+        if on:
+            self.flags[slot] |= bit
+        else:
+            self.flags[slot] &= ~np.uint16(bit)
+
+    # --- Textures ---
+    def intern(self, name):
+        texture_id = self._texture_ids.get(name)
+        if texture_id is None:
+            texture_id = self._texture_ids[name] = len(self.texture_names)
+            self.texture_names.append(name)
+        return texture_id
+
+    def face_column(self, face, create=False):
+        column = self._face_columns.get(face)
+        if column is None and create:
+            column = self._face_columns[face] = len(self.faces)
+            self.faces.append(face)
+            extra = np.full((len(self.textures), 1), NO_TEXTURE, dtype=np.int32)
+            self.textures = np.concatenate((self.textures, extra), axis=1)
+        return column
+
+    def face_columns(self, faces):
+        """Column index of each face name, creating columns for unknown faces."""
+        return [self.face_column(face, create=True) for face in faces]
+
+    # --- Bulk access ---
+    def slots(self, brushes, cache=True):
+        """
+        Slots of a list of Brushes, in list order. Scene lists are cached until
+        the list or the store changes; pass cache=False for throwaway lists.
+        """
+        if cache:
+            cached = self._scene_cache.get(id(brushes))
+            if (cached is not None and cached[0] == len(brushes) and cached[1] == self._cache_version(brushes)
+                    and cached[3] is brushes):
+                return cached[2]
+        slots = np.fromiter((b.slot for b in brushes), dtype=np.int64, count=len(brushes))
+        if cache:
+            # The entry holds the list so its id can't be reused; keep only the latest few.
+            self._scene_cache.pop(id(brushes), None)
+            if len(self._scene_cache) >= SLOT_CACHE_SIZE:
+                del self._scene_cache[next(iter(self._scene_cache))]
+            self._scene_cache[id(brushes)] = (len(brushes), self._cache_version(brushes), slots, brushes)
+        return slots
+
+    def _cache_version(self, brushes):
+        # SceneLists count their own edits, which catches an item swapped for another at the same length.
+        return (self.version, getattr(brushes, 'version', None))
+
+    def bounds(self, slots):
+        """(mins, maxs) of the given slots as (N, 3) arrays."""
+        pos, half = self.pos[slots], self.size[slots] / 2.0
+        return pos - half, pos + half
+
+    def solid(self, slots):
+        """physics.is_solid_brush for every slot at once."""
+        flags = self.flags[slots]
+        passable = (flags & (FLAG_TRIGGER | FLAG_FOG | FLAG_SUBTRACT)) != 0
+        non_solid_mover = ((flags & FLAG_MOVER) != 0) & ((flags & FLAG_NON_SOLID) != 0)
+        return ~passable & ~non_solid_mover
+
+
+class FaceTextures(MutableMapping):
+    """A brush's face -> texture name mapping, read from the store's interned ids."""
+    __slots__ = ('_store', '_slot')
+
+    def __init__(self, store, slot):
+        self._store = store
+        self._slot = slot
+
+    def __getitem__(self, face):
+        column = self._store.face_column(face)
+        texture_id = NO_TEXTURE if column is None else self._store.textures[self._slot, column]
+        if texture_id == NO_TEXTURE:
+            raise KeyError(face)
+        return self._store.texture_names[texture_id]
+
+    def __setitem__(self, face, name):
+        store = self._store
+        column = store.face_column(face, create=True)
+        store.note_edit(self._slot, 'textures', store.textures[self._slot].copy())
+        store.textures[self._slot, column] = store.intern(name)
+
+    def __delitem__(self, face):
+        column = self._store.face_column(face)
+        if column is None or self._store.textures[self._slot, column] == NO_TEXTURE:
+            raise KeyError(face)
+        self._store.note_edit(self._slot, 'textures', self._store.textures[self._slot].copy())
+        self._store.textures[self._slot, column] = NO_TEXTURE
+
+    def __iter__(self):
+        row = self._store.textures[self._slot]
+        faces = self._store.faces
+        return iter([faces[i] for i in np.flatnonzero(row != NO_TEXTURE)])
+
+    def __len__(self):
+        return int(np.count_nonzero(self._store.textures[self._slot] != NO_TEXTURE))
+
+    def copy(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return repr(self.copy())
+
+
+class Brush(dict):
+    """A brush dict whose pos, size, textures and flags live in Brush.store."""
+    __slots__ = ('slot', '__weakref__')
+    store = BrushStore()
+
+    def __init__(self, data=(), **kwargs):
+        super().__init__()
+        self.slot = self.store.add(self)
+        for key, value in dict(data, **kwargs).items():
+            self._assign(key, value)
+
+    def __del__(self):
+        try:
+            self.store.release(self.slot)
+        except (AttributeError, TypeError):
+            pass # Half-built brush, or the interpreter is shutting down
+
+    @property
+    def entity_id(self):
+        """Stable id, never reused within a session and never shared with a Thing."""
+        return int(self.store.ids[self.slot])
+
+    # --- Mapping ---
+    def __getitem__(self, key):
+        if key == 'pos':
+            return self.store.pos[self.slot].tolist()
+        if key == 'size':
+            return self.store.size[self.slot].tolist()
+        if key == 'textures':
+            if not self.store.flags[self.slot] & FLAG_TEXTURED:
+                raise KeyError(key)
+            return FaceTextures(self.store, self.slot)
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        if key in ('pos', 'size', 'textures'):
+            self.store.note_edit(self.slot, key, getattr(self.store, key)[self.slot].copy())
+        else:
+            self.store.note_edit(self.slot, key, super().get(key, MISSING))
+        self._assign(key, value)
+
+    def _assign(self, key, value):
+        store, slot = self.store, self.slot
+        if key == 'pos':
+            store.pos[slot] = value
+        elif key == 'size':
+            store.size[slot] = value
+        elif key == 'textures':
+            items = list(value.items()) # Read first: value may be this brush's own textures
+            store.textures[slot] = NO_TEXTURE
+            columns = store.face_columns([face for face, _ in items])
+            store.textures[slot, columns] = [store.intern(name) for _, name in items]
+            store.set_flag(slot, FLAG_TEXTURED, True)
+        else:
+            super().__setitem__(key, value)
+            bit = FLAG_KEYS.get(key)
+            if bit is not None:
+                store.set_flag(slot, bit, _flag_set(key, value))
+
+    def __delitem__(self, key):
+        if key in ('pos', 'size'):
+            raise KeyError(f"A brush always has '{key}'")
+        if key == 'textures':
+            if key not in self:
+                raise KeyError(key)
+            self.store.note_edit(self.slot, key, self.store.textures[self.slot].copy())
+            self.store.textures[self.slot] = NO_TEXTURE
+            self.store.set_flag(self.slot, FLAG_TEXTURED, False)
+            return
+        self.store.note_edit(self.slot, key, super().__getitem__(key))
+        super().__delitem__(key)
+        if key in FLAG_KEYS:
+            self.store.set_flag(self.slot, FLAG_KEYS[key], False)
+
+    def __contains__(self, key):
+        if key in ('pos', 'size'):
+            return True
+        if key == 'textures':
+            return bool(self.store.flags[self.slot] & FLAG_TEXTURED)
+        return super().__contains__(key)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self):
+        core = ['pos', 'size', 'textures'] if 'textures' in self else ['pos', 'size']
+        return core + list(super().keys())
+
+    def values(self):
+        return list(self.to_dict().values())
+
+    def items(self):
+        return list(self.to_dict().items())
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        value = self.to_dict()[key] if key in ('pos', 'size', 'textures') else self[key]
+        del self[key]
+        return value
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        raise TypeError("A brush can't be cleared")
+
+    def popitem(self):
+        raise TypeError("A brush can't pop arbitrary items")
+
+    # --- Copies ---
+    def to_dict(self):
+        """A plain, independent dict of this brush."""
+        data = {'pos': self.store.pos[self.slot].tolist(), 'size': self.store.size[self.slot].tolist()}
+        if 'textures' in self:
+            data['textures'] = FaceTextures(self.store, self.slot).copy()
+        data.update(copy.deepcopy(dict(super().items())))
+        return data
+
+    def copy(self):
+        return self.to_dict()
+
+    def __copy__(self):
+        # A copy needs its own slot; sharing one would make it an alias.
+        return Brush(self.to_dict())
+
+    def __deepcopy__(self, memo):
+        return Brush(self.to_dict())
+
+    def __reduce__(self):
+        return (dict, (self.to_dict(),))
+
+    def __eq__(self, other):
+        if isinstance(other, Brush):
+            return other is self # Each brush is its own slot; copies are different brushes
+        if not isinstance(other, dict):
+            return NotImplemented
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Brush({self.to_dict()!r})"
+
+
+# SceneList edits, as reported to on_change(op, index, item)
+LIST_INSERT = 'insert' # item now sits at index
+LIST_DELETE = 'delete' # item was taken from index
+LIST_REPLACE = 'replace' # Anything else; item is a list of what the list held before, index is None
+
+
+def as_brush(data):
+    return data if isinstance(data, Brush) else Brush(data)
+
+
+class SceneList(list):
+    """
+    A scene list that counts its changes and reports each one as it happens
+    to on_change(op, index, item), so the undo history, scene events and
+    index follow edits without diffing the list. Every edit is an insert or
+    a delete of one item, except sorts, slice edits and clear(), which are
+    reported as one replacement.
+    """
+
+    def __init__(self, items=(), on_change=None):
+        super().__init__(items)
+        self.version = 0
+        self.on_change = on_change
+
+    def _changed(self, op, index, item):
+        self.version += 1
+        if self.on_change is not None:
+            self.on_change(op, index, item)
+
+    def _replace(self, edit, *args, **kwargs):
+        before = list(self)
+        result = edit(*args, **kwargs)
+        self._changed(LIST_REPLACE, None, before)
+        return result
+
+    def append(self, item):
+        super().append(item)
+        self._changed(LIST_INSERT, len(self) - 1, item)
+
+    def insert(self, index, item):
+        index = min(max(index + len(self), 0) if index < 0 else index, len(self))
+        super().insert(index, item)
+        self._changed(LIST_INSERT, index, item)
+
+    def extend(self, items):
+        for item in list(items):
+            self.append(item)
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def __imul__(self, count):
+        self._replace(super().__imul__, count)
+        return self
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self._replace(super().__setitem__, index, value)
+            return
+        index = range(len(self))[index]
+        old = self[index]
+        super().__setitem__(index, value)
+        self._changed(LIST_DELETE, index, old)
+        self._changed(LIST_INSERT, index, value)
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            self._replace(super().__delitem__, index)
+        else:
+            self.pop(index)
+
+    def pop(self, index=-1):
+        index = range(len(self))[index]
+        item = super().pop(index)
+        self._changed(LIST_DELETE, index, item)
+        return item
+
+    def remove(self, item):
+        self.pop(self.index(item))
+
+    def clear(self):
+        self._replace(super().clear)
+
+    def sort(self, *args, **kwargs):
+        self._replace(super().sort, *args, **kwargs)
+
+    def reverse(self):
+        self._replace(super().reverse)
+
+    def __reduce__(self):
+        # Copies and pickles are plain lists, not wired to the scene.
+        return (list, (list(self),))
+
+
+class BrushList(SceneList):
+    """EditorState.brushes: a list that turns any plain dict added to it into a Brush and finds brushes by identity."""
+
+    def __init__(self, brushes=(), on_change=None):
+        super().__init__((as_brush(b) for b in brushes), on_change)
+
+    def append(self, brush):
+        super().append(as_brush(brush))
+
+    def insert(self, index, brush):
+        super().insert(index, as_brush(brush))
+
+    def extend(self, brushes):
+        super().extend([as_brush(b) for b in brushes])
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = [as_brush(b) for b in value]
+        else:
+            value = as_brush(value)
+        super().__setitem__(index, value)
+
+    # --- Identity lookups ---
+    def _positions(self, brush):
+        """Indexes holding this very brush, found from the store's slots rather than by comparing dicts."""
+        if not isinstance(brush, Brush):
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(Brush.store.slots(self) == brush.slot)
+
+    def index(self, brush, start=0, stop=sys.maxsize):
+        start, stop, _ = slice(start, stop).indices(len(self))
+        for position in self._positions(brush).tolist():
+            if start <= position < stop:
+                return position
+        raise ValueError(f"{brush!r} is not in list")
+
+    def count(self, brush):
+        return len(self._positions(brush))
+
+    def __contains__(self, brush):
+        return len(self._positions(brush)) > 0
+
+    def remove(self, brush):
+        self.pop(self.index(brush))
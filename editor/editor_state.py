@@ -1,20 +1,63 @@
-import json
-import copy
+import functools
 from .things import Thing, Model
+from .brush_store import BrushList, SceneList, LIST_REPLACE
+from .scene_index import SceneIndex
+from .scene_events import SceneEvents
+from .undo import UndoHistory
+from engine.logic_graph import LogicGraph
+from engine.constants import UNDO_MEMORY_BUDGET
 
 class EditorState:
     """Manages all the data for the current level being edited."""
 
-    def __init__(self):
+    def __init__(self, undo_budget=UNDO_MEMORY_BUDGET):
+        self._list_listeners = [] # callback(kind, op, index, item) for every edit to a scene list
         self.brushes = []
         self.things = []
         self.selected_object = None
-        
-        self.undo_stack = []
-        self.redo_stack = []
-        
-        # Initial empty state for the undo stack
-        self.save_state()
+        # Trigger -> target dispatch table, shared by play mode and the 2D views
+        self.logic = LogicGraph()
+
+        # Entity id, name and type lookups over the scene
+        self.index = SceneIndex(self)
+        # Added/removed/modified/selection events, batched until flush()
+        self.events = SceneEvents(self)
+
+        # Undo steps are built from the edits noted since the previous save_state()
+        self.history = UndoHistory(self, undo_budget)
+
+    @property
+    def brushes(self):
+        """The scene's brushes; plain dicts assigned or added here are stored as Brushes."""
+        return self._brushes
+
+    @brushes.setter
+    def brushes(self, brushes):
+        self._replace_list('brush', '_brushes', BrushList(brushes, functools.partial(self._list_changed, 'brush')))
+
+    @property
+    def things(self):
+        """The scene's things."""
+        return self._things
+
+    @things.setter
+    def things(self, things):
+        self._replace_list('thing', '_things', SceneList(things, functools.partial(self._list_changed, 'thing')))
+
+    def _replace_list(self, kind, name, items):
+        before = getattr(self, name, None)
+        setattr(self, name, items)
+        if before is not None:
+            before.on_change = None # The old list is no longer the scene
+            self._list_changed(kind, LIST_REPLACE, None, list(before))
+
+    def add_list_listener(self, callback):
+        """callback(kind, op, index, item) is called with every edit to the brush ('brush') or thing ('thing') list."""
+        self._list_listeners.append(callback)
+
+    def _list_changed(self, kind, op, index, item):
+        for callback in self._list_listeners:
+            callback(kind, op, index, item)
 
     def set_selected_object(self, obj):
         """Sets the currently selected object."""
@@ -25,20 +68,30 @@ class EditorState:
         self.brushes.clear()
         self.things.clear()
         self.selected_object = None
-        self.undo_stack.clear()
-        self.redo_stack.clear()
-        self.save_state()
+        self.history.reset()
 
     def get_level_data(self):
         """Serializes the current scene state into a dictionary."""
-        return {'brushes': self.brushes, 'things': [t.to_dict() for t in self.things]}
+        return {'brushes': [b.to_dict() for b in self.brushes], 'things': [t.to_dict() for t in self.things]}
+
+    def get_object(self, entity_id):
+        """The brush or thing with this entity id, or None if it isn't in the scene."""
+        return self.index.get(entity_id)
+
+    def find_object(self, name):
+        """A brush or thing with this name, or None."""
+        return self.index.find(name)
+
+    def get_objects_of_type(self, type_name):
+        """Brushes of a type ('brush', 'mover', 'trigger', 'fog') or things of a class ('light', 'monster'...)."""
+        return self.index.of_type(type_name)
 
     def get_unique_mover_name(self):
         """Generates a unique name for a new mover brush."""
         i = 1
         while True:
             name = f"Mover{i:02d}"
-            if not any(brush.get('name') == name for brush in self.brushes):
+            if not self.index.has_name(name):
                 return name
             i += 1
 
@@ -57,82 +110,16 @@ class EditorState:
         self.things = new_things
         
         self.selected_object = None
-        self.undo_stack.clear()
-        self.redo_stack.clear()
-        self.save_state()
-
-    def _get_selected_object_identifier(self):
-        """Gets a stable identifier for the selected object for state restoration."""
-        if not self.selected_object:
-            return None, -1
-        try:
-            if isinstance(self.selected_object, dict):
-                return 'brush', self.brushes.index(self.selected_object)
-            else:
-                return 'thing', self.things.index(self.selected_object)
-        except ValueError:
-            return None, -1
-
-    def _restore_selection_from_identifier(self, selected_type, selected_index):
-        """Restores the selected object using its identifier."""
-        if selected_type and selected_index != -1:
-            if selected_type == 'brush' and selected_index < len(self.brushes):
-                self.selected_object = self.brushes[selected_index]
-            elif selected_type == 'thing' and selected_index < len(self.things):
-                self.selected_object = self.things[selected_index]
-            else:
-                self.selected_object = None
-        else:
-            self.selected_object = None
+        self.history.reset()
 
     def save_state(self):
-        """Saves the current state of brushes and things to the undo stack."""
-        selected_type, selected_index = self._get_selected_object_identifier()
-        state = {
-            'brushes': copy.deepcopy(self.brushes),
-            'things': [t.to_dict() for t in self.things],
-            'selected_type': selected_type,
-            'selected_index': selected_index,
-        }
-        self.undo_stack.append(json.dumps(state))
-        self.redo_stack.clear()
-        
-        if len(self.undo_stack) > 50:
-            self.undo_stack.pop(0)
-
-    def restore_state(self, state_json):
-        """Restores the scene from a JSON state string."""
-        state = json.loads(state_json)
-        self.brushes = state.get('brushes', [])
-        
-        things_data = state.get('things', [])
-        new_things = []
-        for t_data in things_data:
-            if t_data.get('type') == 'Model':
-                model_kwargs = {k: v for k, v in t_data.items() if k != 'type'}
-                new_things.append(Model(**model_kwargs))
-            else:
-                new_things.append(Thing.from_dict(t_data))
-        self.things = new_things
-        
-        self._restore_selection_from_identifier(
-            state.get('selected_type'), state.get('selected_index', -1)
-        )
+        """Checkpoint: records everything changed since the last one as an undo step."""
+        self.history.checkpoint()
 
     def undo(self):
-        """Reverts to the previous state in the undo stack."""
-        if len(self.undo_stack) > 1:
-            current_state_json = self.undo_stack.pop()
-            self.redo_stack.append(current_state_json)
-            self.restore_state(self.undo_stack[-1])
-            return True
-        return False
+        """Reverts the latest undo step."""
+        return self.history.undo()
 
     def redo(self):
-        """Re-applies a state from the redo stack."""
-        if self.redo_stack:
-            state_json = self.redo_stack.pop()
-            self.undo_stack.append(state_json)
-            self.restore_state(state_json)
-            return True
-        return False
\ No newline at end of file
+        """Re-applies the latest undone step."""
+        return self.history.redo()
\ No newline at end of file
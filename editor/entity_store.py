@@ -0,0 +1,193 @@
+"""
+Struct-of-arrays storage for Things.
+
+Every Thing owns a slot in one EntityStore. Its position and the properties
+that systems read every frame (radius, light state, global flag, speed) live
+in typed numpy columns indexed by that slot, and it has a stable entity id
+that never gets reused. The Thing object itself is a thin view: thing.pos
+reads its row of the pos column as a fresh list (like a brush's 'pos', so
+no copy aliases the store) and assigning it writes the row, and writing a
+hot key into thing.properties also writes the column, so editor UI code
+keeps working unchanged. Zero-copy access is on the columns, through slots().
+
+Systems select the slots of a scene's things with select() and then work on
+whole columns, instead of walking objects and isinstance-checking each one.
+"""
+import itertools
+import weakref
+import numpy as np
+
+HOT_PROPERTIES = ('radius', 'state', 'global', 'speed')
+FREE_SLOT = -1
+MISSING = object() # Old value of a key that wasn't set, in undo records
+SLOT_CACHE_SIZE = 4 # Scene lists whose slots are cached
+
+# Entity ids are shared by brushes and things, so one id names one object of either kind.
+_entity_ids = itertools.count(1)
+
+
+def new_entity_id():
+    return next(_entity_ids)
+
+
+def _as_float(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _as_flag(value):
+    # Map files store every property as a string, so 'False' must read as false.
+    return value in (True, 1, 'True', 'true', 'on')
+
+
+class EntityStore:
+    def __init__(self, capacity=256):
+        self.pos = np.zeros((capacity, 3))
+        self.kind = np.full(capacity, FREE_SLOT, dtype=np.int16) # Index into kinds, FREE_SLOT if unused
+        self.radius = np.zeros(capacity, dtype=np.float32)
+        self.active = np.zeros(capacity, dtype=bool) # A light's 'state' is 'on'
+        self.is_global = np.zeros(capacity, dtype=bool)
+        self.speed = np.zeros(capacity, dtype=np.float32)
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.kinds = [] # Thing classes, by kind code
+        self._kind_codes = {}
+        self._objects = [None] * capacity # Weak references to the Thing in each slot
+        self._free = list(range(capacity - 1, -1, -1))
+        self._slots_by_id = {}
+        self._scene_cache = {} # id(things list) -> (length, (store, list) version, slots, list)
+        self.version = 0 # Bumped when a slot is taken or freed
+        self._watchers = [] # Weak references to callbacks told of every noted write: each EditorState's undo history, index and events
+
+    def __len__(self):
+        return len(self._slots_by_id)
+
+    # --- Slots ---
+    def _grow(self):
+        old = len(self.kind)
+        new = old * 2
+        for name in ('pos', 'kind', 'radius', 'active', 'is_global', 'speed', 'ids'):
+            column = getattr(self, name)
+            grown = np.zeros((new,) + column.shape[1:], dtype=column.dtype)
+            grown[:old] = column
+            setattr(self, name, grown)
+        self.kind[old:] = FREE_SLOT
+        self._objects.extend([None] * old)
+        self._free.extend(range(new - 1, old - 1, -1))
+
+    def kind_code(self, cls):
+        code = self._kind_codes.get(cls)
+        if code is None:
+            code = self._kind_codes[cls] = len(self.kinds)
+            self.kinds.append(cls)
+        return code
+
+    def add(self, thing):
+        """Gives thing a slot and a new entity id. The slot is freed when thing is garbage collected."""
+        if not self._free:
+            self._grow()
+        slot = self._free.pop()
+        entity_id = new_entity_id()
+        self.kind[slot] = self.kind_code(type(thing))
+        self.ids[slot] = entity_id
+        self.pos[slot] = 0.0
+        self.radius[slot], self.active[slot], self.is_global[slot], self.speed[slot] = 0.0, False, False, 0.0
+        self._objects[slot] = weakref.ref(thing)
+        self._slots_by_id[entity_id] = slot
+        weakref.finalize(thing, self._release, slot, entity_id)
+        self.version += 1
+        return slot
+
+    def _release(self, slot, entity_id):
+        if self._slots_by_id.get(entity_id) != slot:
+            return
+        del self._slots_by_id[entity_id]
+        self.kind[slot] = FREE_SLOT
+        self._objects[slot] = None
+        self._free.append(slot)
+        self.version += 1
+
+    def watch(self, callback):
+        """Calls callback(store, slot, key, old) on every noted write, for as long as callback's object lives."""
+        self._watchers = [ref for ref in self._watchers if ref() is not None]
+        self._watchers.append(weakref.WeakMethod(callback))
+
+    def note_edit(self, slot, key, old):
+        """Notes a write about to happen: every watcher is told its key and the old value."""
+        for ref in self._watchers:
+            callback = ref()
+            if callback is not None:
+                callback(self, slot, key, old)
+
+    def note_rows(self, column, slots):
+        """note_edit() for rows of a column ('pos') about to be written in bulk."""
+        rows = getattr(self, column)
+        for slot in np.asarray(slots).tolist():
+            self.note_edit(slot, column, rows[slot].copy())
+
+    def write_rows(self, column, slots, rows):
+        """Writes rows to the given slots, noting the edits."""
+        self.note_rows(column, slots)
+        getattr(self, column)[slots, :rows.shape[1]] = rows
+
+    def set_property(self, slot, key, value):
+        """Copies a hot property into its column."""
+        if key == 'radius':
+            self.radius[slot] = _as_float(value)
+        elif key == 'state':
+            self.active[slot] = value == 'on'
+        elif key == 'global':
+            self.is_global[slot] = _as_flag(value)
+        elif key == 'speed':
+            self.speed[slot] = _as_float(value)
+
+    # --- Lookups ---
+    def get(self, entity_id):
+        """The Thing with entity_id, or None."""
+        slot = self._slots_by_id.get(entity_id)
+        return self._objects[slot]() if slot is not None else None
+
+    def object(self, slot):
+        """The Thing in slot, or None."""
+        ref = self._objects[slot]
+        return ref() if ref is not None else None
+
+    def objects(self, slots):
+        return [self._objects[slot]() for slot in slots]
+
+    def slots(self, things, cache=True):
+        """
+        Slots of a list of things, in list order. Scene lists are cached until
+        the list or the store changes; pass cache=False for throwaway lists.
+        """
+        if cache:
+            cached = self._scene_cache.get(id(things))
+            if (cached is not None and cached[0] == len(things) and cached[1] == self._cache_version(things)
+                    and cached[3] is things):
+                return cached[2]
+        slots = np.fromiter((t.slot for t in things), dtype=np.int64, count=len(things))
+        if cache:
+            # The entry holds the list so its id can't be reused; keep only the latest few.
+            self._scene_cache.pop(id(things), None)
+            if len(self._scene_cache) >= SLOT_CACHE_SIZE:
+                del self._scene_cache[next(iter(self._scene_cache))]
+            self._scene_cache[id(things)] = (len(things), self._cache_version(things), slots, things)
+        return slots
+
+    def _cache_version(self, things):
+        # SceneLists count their own edits, which catches a thing swapped for another at the same length.
+        return (self.version, getattr(things, 'version', None))
+
+    def select(self, things, cls=None, active=None, is_global=None):
+        """Slots of the things in the list that are instances of cls and match the given flags."""
+        slots = self.slots(things)
+        mask = np.ones(len(slots), dtype=bool)
+        if cls is not None:
+            codes = [code for code, kind in enumerate(self.kinds) if issubclass(kind, cls)]
+            mask &= np.isin(self.kind[slots], codes)
+        if active is not None:
+            mask &= self.active[slots] == active
+        if is_global is not None:
+            mask &= self.is_global[slots] == is_global
+        return slots[mask]
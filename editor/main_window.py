@@ -19,9 +19,10 @@ from editor.rand_map_gen_dial import RandomMapGeneratorDialog
 from editor.rand_map_gen import generate
 from editor.SettingsWindow import SettingsWindow
 from editor.ui import Ui_MainWindow, GenerateTilemapDialog
-from engine.constants import TILE_SIZE, WALL_TILE, FLOOR_TILE
+from engine.tilemap import CollisionTileMap, default_floor_y
 from editor.view_2d import View2D
 from editor.editor_state import EditorState
+from editor.scene_events import CHANGED_NAME, CHANGED_FLAGS, CHANGED_PROPERTIES
 
 class MainWindow(QMainWindow):
     def __init__(self, root_dir):
@@ -35,12 +36,15 @@ class MainWindow(QMainWindow):
         self.config_path = 'settings.ini'
         self.load_config()
 
-        self.state = EditorState()
+        undo_budget = self.config.getint('Settings', 'undo_memory_mb', fallback=64) * 1024 * 1024
+        self.state = EditorState(undo_budget)
+        self._ui_update_pending = False # A flush of scene changes is queued for this UI tick
         self.keys_pressed = set()
         self.file_path = None
         
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
+        self.state.events.subscribe(self.on_scene_changed)
 
         self.setFocus()
         self.update_global_font()
@@ -61,8 +65,26 @@ class MainWindow(QMainWindow):
         self.update_all_ui()
 
     def update_all_ui(self):
-        self.property_editor.set_object(self.state.selected_object)
-        self.scene_hierarchy.refresh_list()
+        """Queues a refresh of whatever changed in the scene; several calls in one UI tick refresh once."""
+        if not self._ui_update_pending:
+            self._ui_update_pending = True
+            QTimer.singleShot(0, self.flush_scene_changes)
+
+    def flush_scene_changes(self):
+        self._ui_update_pending = False
+        if not self.state.events.flush():
+            # Nothing the scene events can see, e.g. a list edited in place; still repaint.
+            self.update_views()
+
+    def on_scene_changed(self, changes):
+        """Updates only the parts of the UI a batch of scene changes touched."""
+        if changes.membership_changed or changes.fields & (CHANGED_NAME | CHANGED_FLAGS | CHANGED_PROPERTIES):
+            self.state.logic.mark_dirty()
+        self.view_3d.scene_changed(changes)
+        selected = self.state.selected_object
+        if changes.selection_changed or (selected is not None and changes.fields_of(selected) & (CHANGED_NAME | CHANGED_FLAGS | CHANGED_PROPERTIES)):
+            self.property_editor.set_object(selected)
+        self.scene_hierarchy.apply_changes(changes)
         self.update_views()
 
     def update_views(self):
@@ -164,70 +186,16 @@ class MainWindow(QMainWindow):
     def generate_collision_map(self):
         if not self.state.brushes:
             return None
+        player_start = next((t for t in self.state.things if isinstance(t, PlayerStart)), None)
+        floor_y = default_floor_y(self.state.brushes, player_start.pos) if player_start else 0.0
+        return CollisionTileMap.build(self.state.brushes, floor_y).tiles
 
-        min_x_world, max_x_world = float('inf'), float('-inf')
-        min_z_world, max_z_world = float('inf'), float('-inf')
-
-        solid_brushes_exist = False
-        for brush in self.state.brushes:
-            if not brush.get('is_trigger', False) and not brush.get('operation') == 'subtract':
-                solid_brushes_exist = True
-                pos, size = np.array(brush['pos']), np.array(brush['size'])
-                half_size = size / 2.0
-
-                min_x_world = min(min_x_world, pos[0] - half_size[0])
-                max_x_world = max(max_x_world, pos[0] + half_size[0])
-                min_z_world = min(min_z_world, pos[2] - half_size[2])
-                max_z_world = max(max_z_world, pos[2] + half_size[2])
-
-        if not solid_brushes_exist:
+    def build_play_tile_map(self, player_start):
+        """The collision tilemap for play mode when Settings > collision is 'tilemap', else None."""
+        if self.config.get('Settings', 'collision', fallback='brushes') != 'tilemap':
             return None
-
-        padding = TILE_SIZE * 2
-        padded_min_x = min_x_world - padding
-        padded_max_x = max_x_world + padding
-        padded_min_z = min_z_world - padding
-        padded_max_z = max_z_world + padding
-
-        min_x_tile_idx = int(math.floor(padded_min_x / TILE_SIZE))
-        max_x_tile_idx = int(math.ceil(padded_max_x / TILE_SIZE))
-        min_z_tile_idx = int(math.floor(padded_min_z / TILE_SIZE))
-        max_z_tile_idx = int(math.ceil(padded_max_z / TILE_SIZE))
-
-        map_width_tiles = max_x_tile_idx - min_x_tile_idx
-        map_depth_tiles = max_z_tile_idx - min_z_tile_idx
-
-        map_width_tiles = max(1, map_width_tiles)
-        map_depth_tiles = max(1, map_depth_tiles)
-
-        collision_tile_map = np.full((map_depth_tiles, map_width_tiles), FLOOR_TILE, dtype=int)
-
-        for brush in self.state.brushes:
-            if brush.get('is_trigger', False) or brush.get('operation') == 'subtract':
-                continue
-
-            pos, size = np.array(brush['pos']), np.array(brush['size'])
-            half_size = size / 2.0
-
-            brush_min_x_world = pos[0] - half_size[0]
-            brush_max_x_world = pos[0] + half_size[0]
-            brush_min_z_world = pos[2] - half_size[2]
-            brush_max_z_world = pos[2] + half_size[2]
-
-            brush_min_x_map_tile = int(math.floor(brush_min_x_world / TILE_SIZE) - min_x_tile_idx)
-            brush_max_x_map_tile = int(math.ceil(brush_max_x_world / TILE_SIZE) - min_x_tile_idx)
-            brush_min_z_map_tile = int(math.floor(brush_min_z_world / TILE_SIZE) - min_z_tile_idx)
-            brush_max_z_map_tile = int(math.ceil(brush_max_z_world / TILE_SIZE) - min_z_tile_idx)
-
-            min_x_idx_clamped = max(0, brush_min_x_map_tile)
-            max_x_idx_clamped = min(map_width_tiles, brush_max_x_map_tile)
-            min_z_idx_clamped = max(0, brush_min_z_map_tile)
-            max_z_idx_clamped = min(map_depth_tiles, brush_max_z_map_tile)
-
-            if min_x_idx_clamped < max_x_idx_clamped and min_z_idx_clamped < max_z_idx_clamped:
-                collision_tile_map[min_z_idx_clamped:max_x_idx_clamped, min_x_idx_clamped:max_x_idx_clamped] = WALL_TILE
-
-        return collision_tile_map
+        floor_y = default_floor_y(self.state.brushes, player_start.pos)
+        return CollisionTileMap.for_level(self.state.brushes, self.file_path, floor_y)
 
 
     def enter_play_mode(self):
@@ -242,7 +210,7 @@ class MainWindow(QMainWindow):
             return
 
         physics_enabled = self.config.getboolean('Settings', 'physics', fallback=True)
-        self.view_3d.set_tile_map(None)
+        self.view_3d.set_tile_map(self.build_play_tile_map(player_start))
         self.view_3d.toggle_play_mode(player_start.pos, player_start.get_angle(), physics_enabled)
         self.view_3d.setFocus() # Explicitly set focus to the 3D view
 
@@ -327,6 +295,8 @@ class MainWindow(QMainWindow):
 
     def save_state(self):
         self.state.save_state()
+        self.state.logic.mark_dirty()
+        self.view_3d.brushes_changed()
 
     def undo(self):
         if self.state.undo():
@@ -565,6 +535,7 @@ class MainWindow(QMainWindow):
             size[1], size[2] = size[2], size[1]
         elif view_type == 'front':
             size[0], size[1] = size[1], size[0]
+        self.state.selected_object['size'] = size
 
         self.update_all_ui()
 
@@ -572,6 +543,22 @@ class MainWindow(QMainWindow):
         self.view_3d.show_triggers_as_solid = checked
         self.view_3d.update()
 
+    def toggle_profiler_hud(self, checked):
+        self.view_3d.set_profiler_enabled(checked)
+
+    def toggle_render_stats(self, checked):
+        self.view_3d.set_render_stats_enabled(checked)
+
+    def export_frame_trace(self):
+        profiler = self.view_3d.profiler
+        if not profiler.frames:
+            QMessageBox.information(self, "No Frame Data", "Enable the frame profiler and let a few frames render before exporting a trace.")
+            return
+        filePath, _ = QFileDialog.getSaveFileName(self, "Export Frame Trace", f"frame_trace_{time.strftime('%Y%m%d_%H%M%S')}.json", "Chrome Trace (*.json)")
+        if filePath:
+            profiler.export_chrome_trace(filePath)
+            print(f"Frame trace written to {filePath}")
+
     def keyPressEvent(self, event):
         if self.view_3d.play_mode:
             if event.key() == Qt.Key_Escape:
@@ -580,6 +567,8 @@ class MainWindow(QMainWindow):
             elif event.key() == Qt.Key_F3:
                 self.view_3d.show_sprites_in_play_mode = not self.view_3d.show_sprites_in_play_mode
                 self.view_3d.update()
+            elif event.key() == Qt.Key_F8:
+                self.view_3d.toggle_input_recording()
             else:
                 self.keys_pressed.add(event.key())
             return # Consume the event completely in play mode
@@ -617,9 +606,14 @@ class MainWindow(QMainWindow):
                     pos_map = {'x': 0, 'y': 1, 'z': 2}
                     ax1_name, ax2_name = axis_map.get(current_view.view_type, ('x', 'z'))
                     offset = self.grid_size_spinbox.value()
-                    pos_ref = new_obj['pos'] if isinstance(new_obj, dict) else new_obj.pos
-                    pos_ref[pos_map[ax1_name]] += offset
-                    pos_ref[pos_map[ax2_name]] += offset
+                    pos = list(new_obj['pos'] if isinstance(new_obj, dict) else new_obj.pos)
+                    pos[pos_map[ax1_name]] += offset
+                    pos[pos_map[ax2_name]] += offset
+                    # Written back whole so the stores note the edit.
+                    if isinstance(new_obj, dict):
+                        new_obj['pos'] = pos
+                    else:
+                        new_obj.pos = pos
 
                 self.set_selected_object(new_obj)
                 return
@@ -735,7 +729,7 @@ class MainWindow(QMainWindow):
                 player_start_pos = t.pos
                 break
 
-        if player_start_pos:
+        if player_start_pos is not None:
             self.view_3d.camera.pos = [player_start_pos[0], player_start_pos[1] + 50, player_start_pos[2] + 200]
             self.view_3d.camera.pitch = -15
             self.view_3d.camera.yaw = -90
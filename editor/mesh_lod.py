@@ -0,0 +1,98 @@
+# mesh_lod.py
+import numpy as np
+
+# Grid resolutions used to build LOD1..LOD3 by vertex clustering. Meshes are
+# normalized to a unit cube on import, so these are cells per model extent.
+LOD_GRID_RESOLUTIONS = (48, 24, 12)
+# A level is only kept if it has at most this fraction of the previous level's triangles.
+LOD_MIN_REDUCTION = 0.75
+
+def _normal_bins(normals):
+    """Buckets normals by dominant signed axis (0..5) so hard edges survive clustering."""
+    axis = np.argmax(np.abs(normals), axis=1)
+    sign = np.take_along_axis(normals, axis[:, None], axis=1)[:, 0] < 0
+    return axis * 2 + sign
+
+def cluster_simplify(vertices, indices, resolution):
+    """
+    Simplifies a triangle mesh by vertex clustering: vertices are snapped to a
+    resolution^3 grid, each cell collapses to the average of its members, and
+    triangles that collapse to a line or point are dropped.
+    vertices is (N, 6) position/normal float32, indices a flat uint32 array.
+    """
+    positions, normals = vertices[:, :3], vertices[:, 3:]
+    min_coord = positions.min(axis=0)
+    extent = float(np.max(positions.max(axis=0) - min_coord))
+    cell_size = extent / resolution if extent > 0 else 1.0
+
+    cells = np.clip(((positions - min_coord) / cell_size).astype(np.int64), 0, resolution - 1)
+    keys = ((cells[:, 0] * resolution + cells[:, 1]) * resolution + cells[:, 2]) * 6 + _normal_bins(normals)
+    _, cluster = np.unique(keys, return_inverse=True)
+    cluster = cluster.ravel()
+    cluster_count = int(cluster.max()) + 1
+
+    counts = np.bincount(cluster, minlength=cluster_count).astype(np.float32)
+    merged = np.empty((cluster_count, 6), dtype=np.float32)
+    for column in range(6):
+        merged[:, column] = np.bincount(cluster, weights=vertices[:, column], minlength=cluster_count)
+    merged[:, :3] /= counts[:, None]
+    lengths = np.linalg.norm(merged[:, 3:], axis=1)
+    lengths[lengths == 0] = 1.0
+    merged[:, 3:] /= lengths[:, None]
+
+    triangles = cluster[indices].reshape(-1, 3)
+    keep = ((triangles[:, 0] != triangles[:, 1]) &
+            (triangles[:, 1] != triangles[:, 2]) &
+            (triangles[:, 0] != triangles[:, 2]))
+    triangles = triangles[keep]
+    if len(triangles) == 0:
+        return None
+
+    # Several source triangles often collapse onto the same cluster triangle.
+    _, first = np.unique(np.sort(triangles, axis=1), axis=0, return_index=True)
+    triangles = triangles[np.sort(first)]
+
+    # Compact away clusters no surviving triangle references.
+    used, remapped = np.unique(triangles, return_inverse=True)
+    return {'vertices': merged[used], 'indices': remapped.astype(np.uint32).ravel()}
+
+def generate_lods(mesh_data):
+    """
+    Builds coarser levels for a parsed mesh. Returns a dict of extra arrays
+    ('lod1_vertices', 'lod1_indices', ...) to merge into the mesh data.
+    """
+    lods = {}
+    previous = mesh_data
+    level = 1
+    for resolution in LOD_GRID_RESOLUTIONS:
+        simplified = cluster_simplify(mesh_data['vertices'], mesh_data['indices'], resolution)
+        if simplified is None or len(simplified['indices']) > len(previous['indices']) * LOD_MIN_REDUCTION:
+            continue
+        lods[f'lod{level}_vertices'] = simplified['vertices']
+        lods[f'lod{level}_indices'] = simplified['indices']
+        previous = simplified
+        level += 1
+    return lods
+
+def lod_levels(mesh_data):
+    """Splits mesh data into a list of {'vertices', 'indices'} dicts, finest first."""
+    levels = [{'vertices': mesh_data['vertices'], 'indices': mesh_data['indices']}]
+    level = 1
+    while f'lod{level}_indices' in mesh_data:
+        levels.append({'vertices': mesh_data[f'lod{level}_vertices'], 'indices': mesh_data[f'lod{level}_indices']})
+        level += 1
+    return levels
+
+def select_lods(screen_fractions, current_lods, thresholds, hysteresis=0.15):
+    """
+    Picks an LOD per instance from its projected size (fraction of viewport
+    height). thresholds are descending screen fractions below which the next
+    coarser level is used. An instance only changes level once it is clearly
+    past a threshold, which stops meshes popping back and forth at the boundary.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float32)
+    fractions = np.asarray(screen_fractions, dtype=np.float32)[:, None]
+    coarser = np.sum(fractions < thresholds * (1.0 - hysteresis), axis=1)
+    finer = np.sum(fractions < thresholds * (1.0 + hysteresis), axis=1)
+    current = np.asarray(current_lods)
+    return np.where(coarser > current, coarser, np.where(finer < current, finer, current))
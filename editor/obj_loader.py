@@ -1,104 +1,284 @@
 # obj_loader.py
 import os
+import ctypes
+import warnings
 import numpy as np
-from PyQt5.QtWidgets import QMessageBox
-from OpenGL.GL import *
-from OpenGL.arrays import vbo
+from engine.render_stats import gl
+from editor.mesh_lod import generate_lods
+
+# Attribute locations shared with vertex_shader_model.glsl. The per-instance
+# model matrix occupies four consecutive vec4 slots starting at location 3.
+POSITION_LOCATION = 0
+NORMAL_LOCATION = 1
+INSTANCE_MATRIX_LOCATION = 3
+
+# Parsed meshes are cached as .npz files in a folder next to the source OBJ.
+# Bump the version whenever the layout of the cached arrays changes.
+MESH_CACHE_DIR = '.meshcache'
+MESH_CACHE_VERSION = 2
+_CACHE_META_KEYS = ('version', 'source_mtime_ns', 'source_size')
+
+class OBJLoadError(Exception):
+    """Raised when an OBJ file cannot be turned into render data."""
+
+def _report(progress, fraction, stage):
+    if progress: progress(fraction, stage)
+
+def _fromstring(text, dtype):
+    """Bulk-parses whitespace separated numbers, or returns None on bad input."""
+    with warnings.catch_warnings():
+        # numpy warns (and will later raise) when it stops at unparsable text.
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            return np.fromstring(text, dtype=dtype, sep=' ')
+        except (ValueError, DeprecationWarning):
+            return None
+
+def _parse_vectors(bodies):
+    """Parses 'x y z ...' line bodies into an (N, 3) float32 array."""
+    if not bodies:
+        return np.zeros((0, 3), dtype=np.float32)
+    flat = _fromstring(' '.join(bodies), np.float32)
+    columns = len(bodies[0].split())
+    if flat is not None and columns >= 3 and flat.size == columns * len(bodies):
+        return flat.reshape(-1, columns)[:, :3]
+    # Rows of differing width (optional w, vertex colours): parse row by row.
+    try:
+        return np.array([row.split()[:3] for row in bodies], dtype=np.float32)
+    except ValueError as e:
+        raise OBJLoadError(f"Malformed vertex data: {e}")
+
+def _parse_face_corners(tokens):
+    """
+    Parses face corner tokens ('v', 'v/t', 'v//n' or 'v/t/n') into two int64
+    arrays of raw OBJ vertex and normal indices (0 where no normal is given).
+    """
+    fields = tokens[0].count('/') + 1
+    text = ' '.join(tokens).replace('//', '/0/').replace('/', ' ')
+    flat = _fromstring(text, np.int64)
+    if flat is not None and flat.size == len(tokens) * fields:
+        flat = flat.reshape(-1, fields)
+        normals = flat[:, 2] if fields > 2 else np.zeros(len(flat), dtype=np.int64)
+        return flat[:, 0], normals
+
+    # Mixed corner formats in one file: parse corner by corner.
+    vertices, normals = np.zeros(len(tokens), dtype=np.int64), np.zeros(len(tokens), dtype=np.int64)
+    for i, token in enumerate(tokens):
+        w = token.split('/')
+        try:
+            vertices[i] = int(w[0])
+            normals[i] = int(w[2]) if len(w) > 2 and w[2] else 0
+        except (ValueError, IndexError):
+            continue
+    return vertices, normals
+
+def parse_obj(filename, progress=None):
+    """
+    Parses an OBJ file into interleaved position/normal vertices and triangle
+    indices. Geometry is centred and scaled to fit a unit cube.
+    Returns {'vertices': (N, 6) float32, 'indices': (M,) uint32}.
+    """
+    _report(progress, 0.0, "Reading file")
+    try:
+        with open(filename, "r") as f:
+            lines = f.read().splitlines()
+    except (OSError, UnicodeDecodeError) as e:
+        raise OBJLoadError(f"Could not read '{filename}': {e}")
+
+    _report(progress, 0.1, "Parsing vertices")
+    # Records are keyed by their first token; any whitespace may follow it.
+    records = [l.split(None, 1) for l in lines]
+    vertex_bodies = [r[1] for r in records if len(r) == 2 and r[0] == 'v']
+    normal_bodies = [r[1] for r in records if len(r) == 2 and r[0] == 'vn']
+    face_bodies = [r[1] for r in records if len(r) == 2 and r[0] == 'f']
+    vertices = _parse_vectors(vertex_bodies)
+    normals = _parse_vectors(normal_bodies)
+
+    _report(progress, 0.3, "Parsing faces")
+    corner_counts = np.fromiter(map(len, map(str.split, face_bodies)), dtype=np.int64, count=len(face_bodies))
+    tokens = ' '.join(face_bodies).split()
+    if len(vertices) == 0 or not tokens:
+        raise OBJLoadError(f"No vertex or face data found in {os.path.basename(filename)}.")
+    v_raw, n_raw = _parse_face_corners(tokens)
+
+    # OBJ indices are 1-based; negative values count back from the end.
+    v_idx = np.where(v_raw < 0, len(vertices) + v_raw, v_raw - 1)
+    n_idx = np.where(n_raw < 0, len(normals) + n_raw, n_raw - 1)
+    n_idx[(n_raw == 0) | (n_idx < 0) | (n_idx >= len(normals))] = -1
+
+    _report(progress, 0.5, "Triangulating")
+    # Fan-triangulate every polygon: corners (0, i, i + 1) for i in 1..n-2.
+    tri_counts = np.clip(corner_counts - 2, 0, None)
+    face_starts = np.cumsum(corner_counts) - corner_counts
+    first_tri = np.cumsum(tri_counts) - tri_counts
+    tri_face_start = np.repeat(face_starts, tri_counts)
+    fan_step = np.arange(tri_counts.sum()) - np.repeat(first_tri, tri_counts) + 1
+    tri_corners = np.stack([tri_face_start, tri_face_start + fan_step, tri_face_start + fan_step + 1], axis=1).ravel()
+    if tri_corners.size == 0:
+        raise OBJLoadError(f"Could not generate valid render data from {os.path.basename(filename)}.")
+
+    corner_v, corner_n = v_idx[tri_corners], n_idx[tri_corners]
+    if corner_v.min() < 0 or corner_v.max() >= len(vertices):
+        raise OBJLoadError(f"Face references a vertex that does not exist in {os.path.basename(filename)}.")
+
+    _report(progress, 0.7, "Building vertex buffer")
+    # Each distinct (vertex, normal) pair becomes one output vertex.
+    normal_slots = len(normals) + 1
+    unique_keys, indices = np.unique(corner_v * normal_slots + (corner_n + 1), return_inverse=True)
+    unique_v, unique_n = unique_keys // normal_slots, unique_keys % normal_slots - 1
+
+    min_coord, max_coord = vertices.min(axis=0), vertices.max(axis=0)
+    center = (min_coord + max_coord) / 2.0
+    size = np.max(max_coord - min_coord)
+    scale_factor = 1.0 / size if size > 0 else 1.0
+
+    vertex_data = np.empty((len(unique_keys), 6), dtype=np.float32)
+    vertex_data[:, :3] = (vertices[unique_v] - center) * scale_factor
+    vertex_data[:, 3:] = (0.0, 1.0, 0.0)
+    has_normal = unique_n >= 0
+    if len(normals):
+        vertex_data[has_normal, 3:] = normals[unique_n[has_normal]]
+
+    return {'vertices': vertex_data, 'indices': indices.astype(np.uint32).ravel()}
+
+def mesh_cache_path(filename):
+    directory = os.path.join(os.path.dirname(os.path.abspath(filename)), MESH_CACHE_DIR)
+    return os.path.join(directory, os.path.basename(filename) + '.npz')
+
+def read_mesh_cache(filename):
+    """Returns cached mesh arrays for filename, or None if missing or stale."""
+    cache_path = mesh_cache_path(filename)
+    if not os.path.exists(cache_path): return None
+    try:
+        stat = os.stat(filename)
+        # The cache is written uncompressed, so each array is a straight read
+        # from the archive with no parsing involved.
+        with np.load(cache_path) as data:
+            if (int(data['version']) != MESH_CACHE_VERSION or
+                    int(data['source_mtime_ns']) != stat.st_mtime_ns or
+                    int(data['source_size']) != stat.st_size):
+                return None
+            return {key: data[key] for key in data.files if key not in _CACHE_META_KEYS}
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Warning: Ignoring unreadable mesh cache '{cache_path}': {e}")
+        return None
+
+def write_mesh_cache(filename, mesh_data):
+    cache_path = mesh_cache_path(filename)
+    try:
+        stat = os.stat(filename)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = cache_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            np.savez(f, version=MESH_CACHE_VERSION, source_mtime_ns=stat.st_mtime_ns,
+                     source_size=stat.st_size, **mesh_data)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: Could not write mesh cache '{cache_path}': {e}")
+
+def load_mesh_data(filename, progress=None, use_cache=True):
+    """
+    Loads render-ready mesh arrays for an OBJ file, from the binary cache when
+    it is up to date, otherwise by parsing the OBJ, generating its LOD levels
+    and refreshing the cache. Safe to call from a worker thread; progress(fraction, stage) is optional.
+    """
+    if not os.path.exists(filename):
+        raise OBJLoadError(f"OBJ file not found at '{filename}'")
+    if use_cache:
+        cached = read_mesh_cache(filename)
+        if cached is not None:
+            _report(progress, 1.0, "Loaded from cache")
+            return cached
+    mesh_data = parse_obj(filename, progress)
+    _report(progress, 0.8, "Generating LODs")
+    mesh_data.update(generate_lods(mesh_data))
+    _report(progress, 1.0, "Done")
+    if use_cache:
+        write_mesh_cache(filename, mesh_data)
+    return mesh_data
 
 class OBJ:
     """
-    Loads a .obj file, normalizes its geometry, and prepares it for rendering
-    with an interleaved VBO.
+    Holds a parsed .obj mesh and prepares it for rendering with an interleaved
+    VBO inside a core-profile VAO. Pass either a filename to load synchronously
+    or mesh_data produced by load_mesh_data() on a worker thread.
     """
-    def __init__(self, filename):
+    def __init__(self, filename=None, mesh_data=None):
+        self.vertex_data = None
+        self.index_data = None
+        self.vao = None
         self.vbo = None
         self.element_buffer = None
+        self.instance_buffer = None
         self.vertex_count = 0
         self.is_loaded = False
-        self.load(filename)
-    
+        if mesh_data is not None:
+            self.set_mesh_data(mesh_data)
+        elif filename is not None:
+            self.load(filename)
+
     def load(self, filename):
-        if not os.path.exists(filename):
-            print(f"Error: OBJ file not found at '{filename}'")
-            return
-        
-        temp_vertices, temp_normals, face_data = [], [], []
         try:
-            with open(filename, "r") as f:
-                for line in f:
-                    if line.startswith('#'): continue
-                    values = line.split()
-                    if not values: continue
-                    
-                    if values[0] == 'v':
-                        temp_vertices.append(list(map(float, values[1:4])))
-                    elif values[0] == 'vn':
-                        temp_normals.append(list(map(float, values[1:4])))
-                    elif values[0] == 'f':
-                        face_row = []
-                        for v in values[1:]:
-                            try:
-                                w = v.split('/')
-                                v_idx = int(w[0]) - 1
-                                n_idx = int(w[2]) - 1 if len(w) > 2 and w[2] else -1
-                                face_row.append((v_idx, n_idx))
-                            except (ValueError, IndexError):
-                                continue
-                        face_data.append(face_row)
-
-            if not temp_vertices or not face_data:
-                QMessageBox.warning(None, "Load Error", f"No vertex or face data found in {os.path.basename(filename)}.")
-                return
-
-            min_coord = np.min(temp_vertices, axis=0)
-            max_coord = np.max(temp_vertices, axis=0)
-            center = (min_coord + max_coord) / 2.0
-            size = np.max(max_coord - min_coord)
-            scale_factor = 1.0 / size if size > 0 else 1.0
-            normalized_vertices = [((v - center) * scale_factor).tolist() for v in temp_vertices]
-            
-            final_vbo_data, final_indices, vertex_map = [], [], {}
-            for face in face_data:
-                for i in range(1, len(face) - 1):
-                    indices = [face[0], face[i], face[i+1]]
-                    for v_idx, n_idx in indices:
-                        if (v_idx, n_idx) not in vertex_map:
-                            vertex_map[(v_idx, n_idx)] = len(final_vbo_data)
-                            pos = normalized_vertices[v_idx]
-                            norm = temp_normals[n_idx] if n_idx != -1 and n_idx < len(temp_normals) else [0, 1, 0]
-                            final_vbo_data.append(pos + norm)
-                        final_indices.append(vertex_map[(v_idx, n_idx)])
-            
-            if not final_vbo_data or not final_indices:
-                QMessageBox.warning(None, "Load Error", f"Could not generate valid render data from {os.path.basename(filename)}.")
-                return
-
-            self.vbo = vbo.VBO(np.array(final_vbo_data, dtype=np.float32))
-            self.element_buffer = vbo.VBO(np.array(final_indices, dtype=np.uint32), target=GL_ELEMENT_ARRAY_BUFFER)
-            self.vertex_count = len(final_indices)
-            self.is_loaded = True
-
-        except Exception as e:
-            QMessageBox.critical(None, "Load Error", f"An error occurred while loading the OBJ file:\n{e}")
+            self.set_mesh_data(load_mesh_data(filename))
+        except OBJLoadError as e:
+            print(f"Error: {e}")
             self.is_loaded = False
 
-    def render(self):
-        if not self.is_loaded: return
-        try:
-            self.vbo.bind()
-            self.element_buffer.bind()
-            stride = 24
-            glEnableClientState(GL_VERTEX_ARRAY)
-            glVertexPointer(3, GL_FLOAT, stride, self.vbo)
-            glEnableClientState(GL_NORMAL_ARRAY)
-            glNormalPointer(GL_FLOAT, stride, self.vbo + 12)
-            glDrawElements(GL_TRIANGLES, self.vertex_count, GL_UNSIGNED_INT, None)
-        finally:
-            self.element_buffer.unbind()
-            self.vbo.unbind()
-            glDisableClientState(GL_VERTEX_ARRAY)
-            glDisableClientState(GL_NORMAL_ARRAY)
-            
+    def set_mesh_data(self, mesh_data):
+        self.vertex_data = np.ascontiguousarray(mesh_data['vertices'], dtype=np.float32)
+        self.index_data = np.ascontiguousarray(mesh_data['indices'], dtype=np.uint32)
+        self.vertex_count = len(self.index_data)
+        self.is_loaded = self.vertex_count > 0
+
+    def upload(self):
+        """
+        Creates the VAO for this mesh. Needs a current GL context, so it is
+        kept separate from load() and only called once per mesh.
+        """
+        if not self.is_loaded or self.vao is not None: return
+        self.vao = gl.glGenVertexArrays(1)
+        gl.glBindVertexArray(self.vao)
+
+        self.vbo = gl.glGenBuffers(1)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, self.vertex_data.nbytes, self.vertex_data, gl.GL_STATIC_DRAW)
+        stride = 24
+        gl.glVertexAttribPointer(POSITION_LOCATION, 3, gl.GL_FLOAT, gl.GL_FALSE, stride, ctypes.c_void_p(0))
+        gl.glEnableVertexAttribArray(POSITION_LOCATION)
+        gl.glVertexAttribPointer(NORMAL_LOCATION, 3, gl.GL_FLOAT, gl.GL_FALSE, stride, ctypes.c_void_p(12))
+        gl.glEnableVertexAttribArray(NORMAL_LOCATION)
+
+        self.element_buffer = gl.glGenBuffers(1)
+        gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.element_buffer)
+        gl.glBufferData(gl.GL_ELEMENT_ARRAY_BUFFER, self.index_data.nbytes, self.index_data, gl.GL_STATIC_DRAW)
+
+        # Per-instance model matrices, one mat4 (four vec4 columns) per instance.
+        self.instance_buffer = gl.glGenBuffers(1)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.instance_buffer)
+        for column in range(4):
+            location = INSTANCE_MATRIX_LOCATION + column
+            gl.glVertexAttribPointer(location, 4, gl.GL_FLOAT, gl.GL_FALSE, 64, ctypes.c_void_p(column * 16))
+            gl.glEnableVertexAttribArray(location)
+            gl.glVertexAttribDivisor(location, 1)
+
+        gl.glBindVertexArray(0)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+
+    def set_instances(self, matrices):
+        """Uploads an (N, 4, 4) float32 array of column-major model matrices."""
+        if self.instance_buffer is None: return
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.instance_buffer)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, matrices.nbytes, matrices, gl.GL_DYNAMIC_DRAW)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+
+    def render(self, instance_count=1):
+        if not self.is_loaded or self.vao is None: return
+        gl.glBindVertexArray(self.vao)
+        gl.glDrawElementsInstanced(gl.GL_TRIANGLES, self.vertex_count, gl.GL_UNSIGNED_INT, None, instance_count)
+        gl.glBindVertexArray(0)
+
     def cleanup(self):
-        if self.vbo: self.vbo.delete()
-        if self.element_buffer: self.element_buffer.delete()
\ No newline at end of file
+        buffers = [b for b in (self.vbo, self.element_buffer, self.instance_buffer) if b]
+        if buffers: gl.glDeleteBuffers(len(buffers), buffers)
+        if self.vao: gl.glDeleteVertexArrays(1, [self.vao])
+        self.vao = self.vbo = self.element_buffer = self.instance_buffer = None
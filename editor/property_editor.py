@@ -212,6 +212,7 @@ class PropertyEditor(QWidget):
             if 'name' not in self.current_object or not self.current_object['name']:
                 self.current_object['name'] = self.editor.state.get_unique_mover_name()
         self.set_object(self.current_object)
+        self.editor.save_state()
         self.editor.update_all_ui()
 
     def on_fog_color_changed(self):
@@ -221,6 +222,7 @@ class PropertyEditor(QWidget):
         if color.isValid():
             self.current_object['fog_color'] = [color.redF(), color.greenF(), color.blueF()]
             self.update_fog_color_button(self.current_object['fog_color'])
+            self.editor.save_state()
             self.editor.update_all_ui()
 
     def update_fog_color_button(self, color_rgb):
@@ -286,6 +288,7 @@ class PropertyEditor(QWidget):
         
         self.current_object['lock'] = is_locked
         self.update_brush_ui_state()
+        self.editor.save_state()
         self.editor.update_all_ui()
 
     def on_trigger_changed(self, is_trigger):
@@ -301,6 +304,7 @@ class PropertyEditor(QWidget):
             for face in ['north','south','east','west','top','down']:
                 self.current_object['textures'][face] = 'trigger.jpg'
         self.set_object(self.current_object)
+        self.editor.save_state()
         self.editor.update_all_ui()
 
     def on_fog_changed(self, is_fog):
@@ -313,6 +317,7 @@ class PropertyEditor(QWidget):
             if 'fog_density' not in self.current_object:
                 self.current_object['fog_density'] = 2.0
         self.set_object(self.current_object)
+        self.editor.save_state()
         self.editor.update_all_ui()
 
     def on_fog_emit_light_changed(self, emit_light):
@@ -320,6 +325,7 @@ class PropertyEditor(QWidget):
         if self.current_object is None: return
         
         self.current_object['fog_emit_light'] = emit_light
+        self.editor.save_state()
         self.editor.update_all_ui()
 
     def populate_for_thing(self, thing):
@@ -450,4 +456,5 @@ class PropertyEditor(QWidget):
                     except (ValueError, TypeError): value = 0.0
             self.current_object.properties[key] = value
 
+        self.editor.save_state()
         self.editor.update_all_ui()
\ No newline at end of file
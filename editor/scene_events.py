@@ -0,0 +1,190 @@
+"""
+Scene change notifications.
+
+EditorState.events gathers what changed in the scene between UI ticks and
+hands it to subscribers as one SceneChanges batch: objects added, removed or
+modified (with a mask of the fields touched), and whether the selection
+changed. Subscribers (the hierarchy, the property editor, play-mode indexes)
+then update only what the batch names.
+
+Nothing is diffed. The scene lists report each insert and delete as it
+happens, and the brush and entity stores tell the events of the keys and
+columns written to each slot, kept per EditorState since the stores are
+shared; flush() turns what was noted since the previous flush into
+the batch, so a tick costs as much as its edits, not as the scene. Code that
+changes something the stores can't see calls touch().
+"""
+from .brush_store import Brush, FLAG_KEYS, LIST_INSERT, LIST_DELETE
+from .things import Thing
+
+# Field mask bits of a modified object
+CHANGED_POS = 1 << 0
+CHANGED_SIZE = 1 << 1
+CHANGED_TEXTURES = 1 << 2
+CHANGED_NAME = 1 << 3
+CHANGED_FLAGS = 1 << 4 # hidden, lock, trigger, fog, mover, solid or subtract
+CHANGED_PROPERTIES = 1 << 5 # Any other key
+CHANGED_ALL = (1 << 6) - 1
+
+COLUMNS = {'pos': CHANGED_POS, 'size': CHANGED_SIZE, 'textures': CHANGED_TEXTURES}
+
+
+def key_fields(key):
+    """The field mask bit a dict key, Thing property or store column falls under."""
+    if key in COLUMNS:
+        return COLUMNS[key]
+    if key == 'name':
+        return CHANGED_NAME
+    if key in FLAG_KEYS:
+        return CHANGED_FLAGS
+    return CHANGED_PROPERTIES
+
+
+class SceneChanges:
+    """One batch of scene events."""
+
+    def __init__(self):
+        self.added = [] # Brushes and things, in the order they were added
+        self.removed = []
+        self.modified = {} # entity id -> (object, field mask)
+        self.reordered = False # A scene list's order changed beyond the adds and removes
+        self.selection_changed = False
+        self.selection = None
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.modified or self.reordered or self.selection_changed)
+
+    def touch(self, obj, fields):
+        entity_id = obj.entity_id
+        fields |= self.modified.get(entity_id, (obj, 0))[1]
+        self.modified[entity_id] = (obj, fields)
+
+    @property
+    def membership_changed(self):
+        return bool(self.added or self.removed or self.reordered)
+
+    @property
+    def fields(self):
+        """Every field touched by any modified object."""
+        mask = 0
+        for _, fields in self.modified.values():
+            mask |= fields
+        return mask
+
+    def fields_of(self, obj):
+        """The field mask obj was modified in, 0 if it wasn't."""
+        entry = self.modified.get(obj.entity_id)
+        return entry[1] if entry is not None and entry[0] is obj else 0
+
+    def modified_brushes(self, fields=CHANGED_ALL):
+        return [obj for obj, mask in self.modified.values() if isinstance(obj, Brush) and mask & fields]
+
+    def modified_things(self, fields=CHANGED_ALL):
+        return [obj for obj, mask in self.modified.values() if isinstance(obj, Thing) and mask & fields]
+
+
+class SceneEvents:
+    def __init__(self, state):
+        self.state = state
+        self._subscribers = []
+        self._touched = SceneChanges() # Changes reported with touch()
+        state.add_list_listener(self._list_changed)
+        Brush.store.watch(self._noted)
+        Thing.store.watch(self._noted)
+        self.rebase()
+
+    def subscribe(self, callback):
+        """callback(changes) is called with every non-empty SceneChanges batch."""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def touch(self, obj, fields=CHANGED_ALL):
+        """Reports a change the stores can't see, such as a plain attribute or a list edited in place."""
+        self._touched.touch(obj, fields)
+
+    def rebase(self):
+        """Forgets everything noted so far; the next flush reports only what changes from here."""
+        self._listed = {} # id(object) -> [object, in the scene at the last flush, in it now]
+        self._reordered = False
+        self._written = {} # entity id -> (store, slot, keys written since the last flush)
+        self._selection = self.state.selected_object
+
+    def _list_changed(self, kind, op, index, item):
+        if op == LIST_INSERT:
+            self._note_listed(item, True)
+        elif op == LIST_DELETE:
+            self._note_listed(item, False)
+        else:
+            before, after = item, (self.state.brushes if kind == 'brush' else self.state.things)
+            before_ids, after_ids = set(map(id, before)), set(map(id, after))
+            for obj in before:
+                if id(obj) not in after_ids:
+                    self._note_listed(obj, False)
+            for obj in after:
+                if id(obj) not in before_ids:
+                    self._note_listed(obj, True)
+            if [obj for obj in before if id(obj) in after_ids] != [obj for obj in after if id(obj) in before_ids]:
+                self._reordered = True
+
+    def _noted(self, store, slot, key, old):
+        entity_id = int(store.ids[slot])
+        written = self._written.get(entity_id)
+        if written is None:
+            written = self._written[entity_id] = (store, slot, set())
+        written[2].add(key)
+
+    def _note_listed(self, obj, listed):
+        entry = self._listed.get(id(obj))
+        if entry is None:
+            # The first edit tells where it was: only a listed object can be taken out.
+            self._listed[id(obj)] = [obj, not listed, listed]
+        else:
+            entry[2] = listed
+
+    # --- Batches ---
+    def _written_keys(self, changes, gone):
+        """Objects still in the scene whose keys or columns were written."""
+        index = self.state.index
+        for entity_id, (store, slot, keys) in self._written.items():
+            obj = store.object(slot)
+            if obj is None or id(obj) in gone or index.get(entity_id) is not obj:
+                continue # Came or went in this batch, or not in this scene at all
+            fields = 0
+            for key in keys:
+                fields |= key_fields(key)
+            changes.touch(obj, fields)
+
+    def collect(self):
+        """Everything that changed since the last collect() or flush(), as one SceneChanges."""
+        state = self.state
+        changes, self._touched = self._touched, SceneChanges()
+        changes.reordered = self._reordered
+        for obj, was_listed, listed in self._listed.values():
+            if listed and not was_listed:
+                changes.added.append(obj)
+            elif was_listed and not listed:
+                changes.removed.append(obj)
+            elif listed:
+                changes.reordered = True # Taken out and put back
+        gone = {id(obj) for obj in changes.added + changes.removed}
+        self._written_keys(changes, gone)
+        # Objects that came or went are reported as that, not as modified too.
+        for entity_id in [entity_id for entity_id, (obj, _) in changes.modified.items() if id(obj) in gone]:
+            del changes.modified[entity_id]
+        if state.selected_object is not self._selection:
+            changes.selection_changed = True
+        changes.selection = state.selected_object
+        self.rebase()
+        return changes
+
+    def flush(self):
+        """Collects the pending changes and sends them to every subscriber. Returns the batch."""
+        changes = self.collect()
+        if changes:
+            for callback in list(self._subscribers):
+                callback(changes)
+        return changes
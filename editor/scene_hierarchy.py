@@ -1,6 +1,7 @@
 from PyQt5.QtWidgets import QTreeWidget, QTreeWidgetItem, QMenu, QAction, QHeaderView
 from PyQt5.QtGui import QIcon, QColor, QBrush, QFont
 from PyQt5.QtCore import Qt
+from editor.scene_events import CHANGED_NAME, CHANGED_FLAGS, CHANGED_PROPERTIES
 
 class SceneHierarchy(QTreeWidget):
     def __init__(self, main_window):
@@ -21,6 +22,9 @@ class SceneHierarchy(QTreeWidget):
         self.lock_icon = QIcon("assets/lock.png")
         self.hidden_icon = QIcon("assets/hidden.png")
         self.itemSelectionChanged.connect(self.handle_selection_change)
+        self._items = {} # entity id -> tree item
+        self._brushes_header = None
+        self._things_header = None
 
         # Load color icons
         self.color_icons = {
@@ -46,6 +50,7 @@ class SceneHierarchy(QTreeWidget):
     def refresh_list(self):
         self.blockSignals(True)
         self.clear()
+        self._items = {} # entity id -> tree item
         
         # Define font for headers
         header_font = QFont()
@@ -57,26 +62,11 @@ class SceneHierarchy(QTreeWidget):
         brushes_header.setForeground(0, QBrush(QColor("white")))
         brushes_header.setFont(0, header_font)
         brushes_header.setExpanded(True)
+        self._brushes_header = brushes_header
         
         # Add Brushes
         for i, brush_dict in enumerate(self.main_window.state.brushes):
-            item_text = brush_dict.get('name', f'Brush {i+1}')
-            if brush_dict.get('is_mover'):
-                item_text = brush_dict.get('name', f'Mover {i+1}')
-
-            item = QTreeWidgetItem(brushes_header, [item_text, ""]) # Add an empty string for the second column
-            item.setData(0, Qt.UserRole, ('brush', i))
-            
-            # Check for lock status and apply icon
-            if brush_dict.get('lock', False):
-                item.setIcon(0, self.lock_icon)
-            if brush_dict.get('hidden', False):
-                item.setIcon(0, self.hidden_icon)
-            
-            # Display color icon if assigned
-            if 'color' in brush_dict and brush_dict['color'] in self.color_icons:
-                item.setIcon(1, self.color_icons[brush_dict['color']]) # Set icon in the second column
-            
+            item = self._add_item(brushes_header, i, brush_dict)
             if self.main_window.state.selected_object is brush_dict:
                 item.setSelected(True)
 
@@ -86,18 +76,84 @@ class SceneHierarchy(QTreeWidget):
         things_header.setForeground(0, QBrush(QColor("white")))
         things_header.setFont(0, header_font)
         things_header.setExpanded(True)
+        self._things_header = things_header
         
         # Add Things
         for i, thing_obj in enumerate(self.main_window.state.things):
-            item_text = thing_obj.name if thing_obj.name else f'Thing {i+1}'
-            item = QTreeWidgetItem(things_header, [item_text, ""]) # Add an empty string for the second column
-            item.setData(0, Qt.UserRole, ('thing', i))
-
+            item = self._add_item(things_header, i, thing_obj)
             if self.main_window.state.selected_object is thing_obj:
                 item.setSelected(True)
                 
         self.blockSignals(False)
 
+    def _add_item(self, header, index, obj):
+        item = QTreeWidgetItem(["", ""]) # Add an empty string for the second column
+        kind = 'brush' if header is self._brushes_header else 'thing'
+        item.setData(0, Qt.UserRole, (kind, obj.entity_id))
+        header.insertChild(index, item)
+        self._decorate(item, index, obj)
+        self._items[obj.entity_id] = item
+        return item
+
+    def _decorate(self, item, index, obj):
+        """Sets an item's text and icons from its brush or thing; unnamed objects are labelled by index."""
+        if not isinstance(obj, dict):
+            item.setText(0, obj.name if obj.name else f'Thing {index+1}')
+            return
+        item_text = obj.get('name', f'Brush {index+1}')
+        if obj.get('is_mover'):
+            item_text = obj.get('name', f'Mover {index+1}')
+        item.setText(0, item_text)
+
+        # Check for lock status and apply icon
+        item.setIcon(0, QIcon())
+        if obj.get('lock', False):
+            item.setIcon(0, self.lock_icon)
+        if obj.get('hidden', False):
+            item.setIcon(0, self.hidden_icon)
+
+        # Display color icon if assigned
+        if 'color' in obj and obj['color'] in self.color_icons:
+            item.setIcon(1, self.color_icons[obj['color']]) # Set icon in the second column
+        else:
+            item.setIcon(1, QIcon())
+
+    def apply_changes(self, changes):
+        """Updates the tree for a batch of scene changes instead of rebuilding it."""
+        state = self.main_window.state
+        if self._brushes_header is None or changes.reordered or \
+                len(changes.added) + len(changes.removed) > len(self._items) // 2:
+            self.refresh_list()
+            return
+        self.blockSignals(True)
+        for obj in changes.removed:
+            item = self._items.pop(obj.entity_id, None)
+            if item is not None:
+                item.parent().removeChild(item)
+        if changes.membership_changed:
+            # Walk the lists once: insert new items where they belong and relabel
+            # unnamed objects whose index moved.
+            for header, objects in ((self._brushes_header, state.brushes), (self._things_header, state.things)):
+                for index, obj in enumerate(objects):
+                    item = self._items.get(obj.entity_id)
+                    if item is None:
+                        self._add_item(header, index, obj)
+                        continue
+                    name = obj.get('name') if isinstance(obj, dict) else obj.name
+                    if not name:
+                        self._decorate(item, index, obj)
+        for obj, fields in changes.modified.values():
+            item = self._items.get(obj.entity_id)
+            if item is not None and fields & (CHANGED_NAME | CHANGED_FLAGS | CHANGED_PROPERTIES):
+                self._decorate(item, item.parent().indexOfChild(item), obj)
+        if changes.selection_changed:
+            for item in self.selectedItems():
+                item.setSelected(False)
+            item = self._items.get(changes.selection.entity_id) if changes.selection is not None else None
+            if item is not None:
+                item.setSelected(True)
+        self.blockSignals(False)
+
     def handle_selection_change(self):
         selected_items = self.selectedItems()
         if not selected_items:
@@ -107,11 +163,8 @@ class SceneHierarchy(QTreeWidget):
         data = item.data(0, Qt.UserRole)
         
         if data:
-            obj_type, obj_index = data
-            if obj_type == 'brush':
-                self.main_window.set_selected_object(self.main_window.state.brushes[obj_index])
-            elif obj_type == 'thing':
-                self.main_window.set_selected_object(self.main_window.state.things[obj_index])
+            # Items hold entity ids, which stay valid when objects are inserted or removed
+            self.main_window.set_selected_object(self.main_window.state.get_object(data[1]))
         else:
              self.main_window.set_selected_object(None)
 
@@ -125,7 +178,9 @@ class SceneHierarchy(QTreeWidget):
         item = selected_items[0]
         data = item.data(0, Qt.UserRole)
         if data and data[0] == 'brush':
-            brush_dict = self.main_window.state.brushes[data[1]]
+            brush_dict = self.main_window.state.get_object(data[1])
+            if brush_dict is None:
+                return
             
             # Lock/Unlock Action
             is_locked = brush_dict.get('lock', False)
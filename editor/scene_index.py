@@ -0,0 +1,185 @@
+"""
+Lookup tables over the scene in EditorState.
+
+Every brush and thing has an entity id (Brush.entity_id, Thing.entity_id)
+that stays with the object for the whole session, through list edits, undo
+and redo. SceneIndex maps entity ids, names and types to the objects in the
+scene so selection, naming and the hierarchy don't search the lists.
+
+It is kept up to date as the scene changes rather than rebuilt: the scene
+lists report each insert and delete, and the stores tell the index of
+every write; objects whose name or type flags were written are re-indexed
+at the next lookup. The stores are shared by every EditorState, so each
+index keeps its own list of those objects.
+Only a wholesale change to a list (a new list, a sort, a slice edit or
+clear()) rebuilds the tables, on the next lookup.
+"""
+import collections
+import numpy as np
+from .brush_store import Brush, FLAG_KEYS, FLAG_TRIGGER, FLAG_MOVER, FLAG_FOG, LIST_INSERT, LIST_DELETE
+from .things import Thing
+
+# Brush types, by the flag that makes a brush one; the first match wins.
+BRUSH_TYPES = (('trigger', FLAG_TRIGGER), ('mover', FLAG_MOVER), ('fog', FLAG_FOG))
+
+
+def brush_type(brush):
+    """'trigger', 'mover', 'fog' or plain 'brush'."""
+    flags = Brush.store.flags[brush.slot]
+    return next((name for name, bit in BRUSH_TYPES if flags & bit), 'brush')
+
+
+def thing_type(thing):
+    """The lowercased class name, as in a new Thing's 'type' property."""
+    return type(thing).__name__.lower()
+
+
+class SceneIndex:
+    def __init__(self, state):
+        self.state = state
+        self.by_id = {} # entity id -> brush or thing
+        self.by_name = {} # name -> a brush or thing with it, the first indexed
+        self._shared = {} # name -> {entity id: object} for names more than one object has
+        self.by_type = {} # brush_type() or thing_type() -> set of entity ids
+        self._names = {} # entity id -> name it is indexed under
+        self._types = {} # entity id -> type it is indexed under
+        self._repeats = {} # entity id -> times it is listed beyond the first, for the rare object listed twice
+        self._renamed = {} # entity id -> (store, slot) of objects renamed or retyped since the last lookup
+        self._stale = True # Rebuild on the next lookup
+        state.add_list_listener(self._list_changed)
+        Brush.store.watch(self._noted)
+        Thing.store.watch(self._noted)
+
+    def _list_changed(self, kind, op, index, item):
+        if self._stale:
+            return
+        if op == LIST_INSERT:
+            self._add(item)
+        elif op == LIST_DELETE:
+            self._remove(item)
+        else:
+            self._stale = True
+
+    def _noted(self, store, slot, key, old):
+        if key == 'name' or key in FLAG_KEYS:
+            self._renamed[int(store.ids[slot])] = (store, slot)
+
+    # --- Entries ---
+    def _add(self, obj):
+        entity_id = obj.entity_id
+        if entity_id in self.by_id:
+            self._repeats[entity_id] = self._repeats.get(entity_id, 0) + 1
+            return
+        self.by_id[entity_id] = obj
+        self._index(entity_id, obj)
+
+    def _remove(self, obj):
+        entity_id = obj.entity_id
+        repeats = self._repeats.pop(entity_id, 0)
+        if repeats > 1:
+            self._repeats[entity_id] = repeats - 1
+        elif not repeats and self.by_id.pop(entity_id, None) is not None:
+            self._unindex(entity_id)
+
+    def _index(self, entity_id, obj):
+        if isinstance(obj, Brush):
+            name, type_name = dict.get(obj, 'name'), brush_type(obj)
+        else:
+            name, type_name = obj.name, thing_type(obj)
+        self._names[entity_id] = name
+        self._types[entity_id] = type_name
+        self.by_type.setdefault(type_name, set()).add(entity_id)
+        if name:
+            holder = self.by_name.setdefault(name, obj)
+            if holder is not obj:
+                self._shared.setdefault(name, {holder.entity_id: holder})[entity_id] = obj
+
+    def _unindex(self, entity_id):
+        self.by_type[self._types.pop(entity_id)].discard(entity_id)
+        name = self._names.pop(entity_id)
+        if not name:
+            return
+        shared = self._shared.get(name)
+        if shared is None:
+            del self.by_name[name]
+            return
+        del shared[entity_id]
+        self.by_name[name] = next(iter(shared.values()))
+        if len(shared) == 1:
+            del self._shared[name]
+
+    # --- Syncing ---
+    def sync(self):
+        if self._stale:
+            self.rebuild()
+        if self._renamed:
+            for entity_id, (store, slot) in self._renamed.items():
+                obj = store.object(slot)
+                if obj is not None and self.by_id.get(entity_id) is obj:
+                    self._unindex(entity_id)
+                    self._index(entity_id, obj)
+            self._renamed.clear()
+
+    def rebuild(self):
+        for table in (self.by_id, self.by_name, self.by_type, self._names, self._types, self._shared, self._repeats):
+            table.clear()
+        brushes, things = self.state.brushes, self.state.things
+
+        # Ids and types for every brush at once from the store's columns.
+        store = Brush.store
+        slots = store.slots(brushes)
+        brush_ids = store.ids[slots]
+        flags = store.flags[slots]
+        typed = np.zeros(len(slots), dtype=bool)
+        for type_name, bit in BRUSH_TYPES:
+            mask = ((flags & bit) != 0) & ~typed
+            self.by_type[type_name] = set(brush_ids[mask].tolist())
+            typed |= mask
+        self.by_type['brush'] = set(brush_ids[~typed].tolist())
+        types = np.full(len(slots), 'brush', dtype=object)
+        for type_name, bit in reversed(BRUSH_TYPES): # So the first match is written last and wins
+            types[(flags & bit) != 0] = type_name
+        for thing in things:
+            self.by_type.setdefault(thing_type(thing), set()).add(thing.entity_id)
+
+        ids = brush_ids.tolist() + [thing.entity_id for thing in things]
+        objects = list(brushes) + list(things)
+        names = [dict.get(brush, 'name') for brush in brushes] + [thing.name for thing in things]
+        self.by_id.update(zip(ids, objects))
+        self._names.update(zip(ids, names))
+        self._types.update(zip(ids, types.tolist() + [thing_type(thing) for thing in things]))
+        # Reversed, so the first object with a name is the one left in by_name.
+        self.by_name.update(zip(reversed(names), reversed(objects)))
+        self.by_name.pop(None, None)
+        self.by_name.pop('', None)
+        counts = collections.Counter(self._names.values())
+        if len(self.by_name) < len(self._names) - counts[None] - counts['']:
+            for entity_id, name in self._names.items():
+                if name and counts[name] > 1:
+                    self._shared.setdefault(name, {})[entity_id] = self.by_id[entity_id]
+        if len(self.by_id) < len(ids): # Some object is listed more than once
+            for entity_id, count in collections.Counter(ids).items():
+                if count > 1:
+                    self._repeats[entity_id] = count - 1
+        self._renamed.clear()
+        self._stale = False
+
+    # --- Lookups ---
+    def get(self, entity_id):
+        """The brush or thing with entity_id, or None if it isn't in the scene."""
+        self.sync()
+        return self.by_id.get(entity_id)
+
+    def find(self, name):
+        """A brush or thing named name (the first one indexed, if several are), or None."""
+        self.sync()
+        return self.by_name.get(name)
+
+    def has_name(self, name):
+        self.sync()
+        return name in self.by_name
+
+    def of_type(self, type_name):
+        """The brushes or things of a brush_type() or thing_type(), in no particular order."""
+        self.sync()
+        return [self.by_id[entity_id] for entity_id in self.by_type.get(type_name, ())]
@@ -1,7 +1,9 @@
 import os
+import copy
 from PyQt5.QtGui import QPixmap
 import json
 import ast
+from .entity_store import EntityStore, HOT_PROPERTIES, MISSING
 
 def find_subclasses(cls):
     """Recursively finds all subclasses of a given class."""
@@ -11,14 +13,55 @@ def find_subclasses(cls):
         all_subclasses.extend(find_subclasses(subclass))
     return all_subclasses
 
+class ThingProperties(dict):
+    """A Thing's properties; hot keys are mirrored into the entity store's columns."""
+
+    def __init__(self, thing=None, values=()):
+        super().__init__(values)
+        self._thing = thing
+        if thing is not None:
+            for key in HOT_PROPERTIES:
+                if key in self:
+                    thing.store.set_property(thing.slot, key, self[key])
+
+    def __setitem__(self, key, value):
+        if self._thing is not None:
+            self._thing.store.note_edit(self._thing.slot, key, self.get(key, MISSING))
+        super().__setitem__(key, value)
+        if key in HOT_PROPERTIES and self._thing is not None:
+            self._thing.store.set_property(self._thing.slot, key, value)
+
+    def __delitem__(self, key):
+        if self._thing is not None:
+            self._thing.store.note_edit(self._thing.slot, key, self[key])
+        super().__delitem__(key)
+        if key in HOT_PROPERTIES and self._thing is not None:
+            self._thing.store.set_property(self._thing.slot, key, None)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __reduce__(self):
+        # Copies and pickles are plain dicts, detached from the store.
+        return (dict, (dict(self),))
+
+
 class Thing:
     pixmap_path = None
     _pixmap_cache = {} # Class-level cache for loaded pixmaps
     _counters = {} # Class-level counter for unique naming
+    store = EntityStore() # Positions and hot properties of every Thing
 
     def __init__(self, pos=None, properties=None):
+        self.slot = self.store.add(self)
         self.pos = pos if pos is not None else [0, 0, 0]
-        self.properties = properties if properties is not None else {}
+        self.properties = ThingProperties(self, properties if properties is not None else {})
         self.properties.setdefault('type', self.__class__.__name__.lower())
         
         # --- Set a default and unique name ---
@@ -30,6 +73,28 @@ class Thing:
                 Thing._counters[class_name] += 1
             self.properties['name'] = f"{class_name}_{Thing._counters[class_name]}"
 
+    @property
+    def pos(self):
+        """A fresh list of this thing's position. Assign a new value to move it, so the edit is noted."""
+        return self.store.pos[self.slot].tolist()
+
+    @pos.setter
+    def pos(self, value):
+        self.store.note_edit(self.slot, 'pos', self.store.pos[self.slot].copy())
+        self.store.pos[self.slot] = value
+
+    @property
+    def entity_id(self):
+        """Stable id, never reused within a session and never shared with a brush."""
+        return int(self.store.ids[self.slot])
+
+    def __copy__(self):
+        # A copy needs its own slot; sharing one would make it an alias.
+        return type(self)(pos=self.pos, properties=dict(self.properties))
+
+    def __deepcopy__(self, memo):
+        return type(self)(pos=self.pos, properties=copy.deepcopy(dict(self.properties), memo))
+
     @property
     def name(self):
         """Gets the name from the properties dictionary."""
@@ -148,6 +213,7 @@ class Speaker(Thing):
         self.properties.setdefault('volume', 1.0)
         self.properties.setdefault('looping', False)
         self.properties.setdefault('play_on_start', False)
+        self.properties.setdefault('priority', 0) # Higher priority speakers keep their voice when too many play
 
     def get_radius(self):
         return float(self.properties.get('radius', 512.0))
@@ -158,6 +224,7 @@ class Monster(Thing):
         super().__init__(pos, properties)
         self.properties.setdefault('type', 'monster')
         self.properties.setdefault('id', 0)
+        self.properties.setdefault('speed', 150.0)
 
 class Pickup(Thing):
     pixmap_path = "assets/pickup.png"
@@ -178,9 +245,12 @@ class Trigger(Thing):
 class Model(Thing):
     """Represents a 3D model placed in the world."""
     pixmap_path = "assets/model_icon.png"
-    def __init__(self, pos=None, properties=None):
+    def __init__(self, pos=None, properties=None, model_path=None, rotation=None, scale=None):
         super().__init__(pos, properties)
         self.properties.setdefault('type', 'model')
+        if model_path is not None: self.properties['model_path'] = model_path
+        if rotation is not None: self.properties['rotation'] = list(rotation)
+        if scale is not None: self.properties['scale'] = list(scale)
         self.properties.setdefault('model_path', "")
         self.properties.setdefault('rotation', [0, 0, 0])
         self.properties.setdefault('scale', [1, 1, 1])
\ No newline at end of file
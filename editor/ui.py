@@ -204,6 +204,15 @@ class Ui_MainWindow(object):
         modern_action.triggered.connect(lambda: MainWindow.set_render_mode("Modern (Shaders)"))
         immediate_action.triggered.connect(lambda: MainWindow.set_render_mode("Immediate (Legacy)"))
 
+        render_menu.addSeparator()
+        profiler_action = QAction('Frame Profiler', MainWindow, shortcut='F4', checkable=True)
+        profiler_action.triggered.connect(MainWindow.toggle_profiler_hud)
+        render_menu.addAction(profiler_action)
+        render_stats_action = QAction('Render Statistics', MainWindow, shortcut='F6', checkable=True)
+        render_stats_action.triggered.connect(MainWindow.toggle_render_stats)
+        render_menu.addAction(render_stats_action)
+        render_menu.addAction(QAction('Export Frame Trace...', MainWindow, triggered=MainWindow.export_frame_trace))
+
         help_menu.addAction(QAction('About', MainWindow, triggered=MainWindow.show_about))
 
     def create_toolbars(self, MainWindow):
@@ -0,0 +1,366 @@
+"""
+Command-based undo history.
+
+An undo step is a list of reversible records holding only what changed:
+edits to the scene lists (with the objects they added or removed, kept
+alive so redo brings back the very same objects), dict keys and Thing
+properties that were set, and position/size/texture rows that moved. The
+scene lists report each insert and delete to the history as it happens, and
+the brush and entity stores tell it of every slot about to be written, with
+the value or row it held; the history keeps the one before the first write.
+The stores are shared by every EditorState, so each history keeps its own
+log and only records writes to objects in its scene. At each checkpoint (EditorState.save_state) the
+history turns what was noted since the previous one into a step, so the cost
+follows the size of the edit rather than of the scene.
+
+A step that changes the same fields of the same objects as the step just
+before it, within UNDO_COALESCE_SECONDS, is merged into it, so a drag or a
+spin box scroll undoes in one go. Steps are dropped oldest first once the
+history's estimated size exceeds its memory budget.
+"""
+import sys
+import time
+import numpy as np
+from .brush_store import Brush, NO_TEXTURE, LIST_INSERT, LIST_DELETE, LIST_REPLACE
+from .things import Thing
+from .entity_store import MISSING
+from engine.constants import UNDO_MEMORY_BUDGET, UNDO_COALESCE_SECONDS
+
+BRUSH_COLUMNS = ('pos', 'size', 'textures')
+THING_COLUMNS = ('pos',)
+
+
+def _approx_size(value):
+    """Rough bytes held by a value and whatever it contains."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes + 112
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_approx_size(k) + _approx_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_approx_size(v) for v in value)
+    return size
+
+
+def _object_size(obj):
+    if isinstance(obj, dict):
+        return _approx_size(obj)
+    return sys.getsizeof(obj) + _approx_size(dict(obj.properties))
+
+
+def _same(a, b):
+    try:
+        return bool(a == b)
+    except ValueError: # Arrays compare elementwise
+        return a is b
+
+
+def _scene_list(state, kind):
+    return state.brushes if kind == 'brush' else state.things
+
+
+def _store(kind):
+    return Brush.store if kind == 'brush' else Thing.store
+
+
+def _kind(store):
+    return 'brush' if store is Brush.store else 'thing'
+
+
+def _stack(rows, width):
+    """Rows noted at different times as one (N, width) array; texture rows noted before a face column was added are padded."""
+    if all(len(row) == width for row in rows):
+        return np.array(rows)
+    stacked = np.full((len(rows), width), NO_TEXTURE, dtype=rows[0].dtype)
+    for i, row in enumerate(rows):
+        stacked[i, :len(row)] = row
+    return stacked
+
+
+# --- Records ---
+class MembershipRecord:
+    """Edits to one scene list, as (op, index, object) in the order they happened; a replacement keeps (before, after)."""
+
+    def __init__(self, kind, ops):
+        self.kind = kind
+        self.ops = ops
+        self.nbytes = 0
+        for op, _, item in ops:
+            if op == LIST_REPLACE:
+                before, after = item
+                changed = set(map(id, before)) ^ set(map(id, after))
+                self.nbytes += 8 * (len(before) + len(after)) + sum(
+                    _object_size(obj) for obj in before + after if id(obj) in changed)
+            else:
+                self.nbytes += _object_size(item) + 64
+
+    def undo(self, state):
+        items = _scene_list(state, self.kind)
+        for op, index, item in reversed(self.ops):
+            if op == LIST_INSERT:
+                del items[index]
+            elif op == LIST_DELETE:
+                items.insert(index, item)
+            else:
+                items[:] = item[0]
+
+    def redo(self, state):
+        items = _scene_list(state, self.kind)
+        for op, index, item in self.ops:
+            if op == LIST_INSERT:
+                items.insert(index, item)
+            elif op == LIST_DELETE:
+                del items[index]
+            else:
+                items[:] = item[1]
+
+
+class PropertyRecord:
+    """One dict key of a brush, or property of a Thing, set from old to new (MISSING if absent)."""
+
+    def __init__(self, kind, obj, key, old, new):
+        self.kind = kind
+        self.obj = obj
+        self.key = key
+        self.old = old
+        self.new = new
+        self.nbytes = 64 + _approx_size(old) + _approx_size(new)
+
+    @property
+    def merge_key(self):
+        return (id(self.obj), self.key)
+
+    def _apply(self, value):
+        target = self.obj if self.kind == 'brush' else self.obj.properties
+        if value is MISSING:
+            if self.key in target:
+                del target[self.key]
+        else:
+            target[self.key] = value
+
+    def undo(self, state):
+        self._apply(self.old)
+
+    def redo(self, state):
+        self._apply(self.new)
+
+    def merge(self, other):
+        self.new = other.new
+        self.nbytes = 64 + _approx_size(self.old) + _approx_size(self.new)
+
+
+class ColumnRecord:
+    """Rows of one store column (a transform's pos or size, or face textures) for several objects."""
+
+    def __init__(self, kind, column, objects, old, new):
+        self.kind = kind
+        self.column = column
+        self.objects = objects
+        self.old = old
+        self.new = new
+        self.nbytes = 8 * len(objects) + old.nbytes + new.nbytes
+
+    @property
+    def merge_keys(self):
+        return [(id(obj), self.column) for obj in self.objects]
+
+    def _apply(self, rows):
+        _store(self.kind).write_rows(self.column, [obj.slot for obj in self.objects], rows)
+
+    def undo(self, state):
+        self._apply(self.old)
+
+    def redo(self, state):
+        self._apply(self.new)
+
+    def merge(self, other):
+        rows = {id(obj): i for i, obj in enumerate(self.objects)}
+        self.new[[rows[id(obj)] for obj in other.objects]] = other.new
+
+
+class UndoStep:
+    def __init__(self, records, selection_before, selection_after):
+        self.records = records
+        self.selection_before = selection_before
+        self.selection_after = selection_after
+        self.time = time.monotonic()
+        self.nbytes = sum(record.nbytes for record in records)
+
+    def merge_keys(self):
+        """The (object, field) pairs this step changes, or None if it adds or removes objects."""
+        keys = set()
+        for record in self.records:
+            if isinstance(record, PropertyRecord):
+                keys.add(record.merge_key)
+            elif isinstance(record, ColumnRecord):
+                keys.update(record.merge_keys)
+            else:
+                return None
+        return keys
+
+    @staticmethod
+    def _record_key(record):
+        if isinstance(record, PropertyRecord):
+            return (record.kind, record.merge_key)
+        return (record.kind, record.column)
+
+    def merge(self, other):
+        """Folds a later step over the same fields into this one. Returns False if it can't."""
+        keys = self.merge_keys()
+        if keys is None or keys != other.merge_keys():
+            return False
+        mine = {self._record_key(record): record for record in self.records}
+        pairs = [(mine.get(self._record_key(record)), record) for record in other.records]
+        if any(target is None or (isinstance(target, ColumnRecord) and target.new.shape[1] != record.new.shape[1])
+               for target, record in pairs):
+            return False
+        for target, record in pairs:
+            target.merge(record)
+        self.selection_after = other.selection_after
+        self.time = other.time
+        self.nbytes = sum(record.nbytes for record in self.records)
+        return True
+
+
+# --- History ---
+class UndoHistory:
+    def __init__(self, state, budget=UNDO_MEMORY_BUDGET, coalesce_seconds=UNDO_COALESCE_SECONDS):
+        self.state = state
+        self.budget = budget # Bytes
+        self.coalesce_seconds = coalesce_seconds
+        self.undo_steps = []
+        self.redo_steps = []
+        self.nbytes = 0
+        self._last_step = None # The step the next checkpoint may merge into
+        state.add_list_listener(self._list_changed)
+        Brush.store.watch(self._noted)
+        Thing.store.watch(self._noted)
+        self.rebase()
+
+    def reset(self):
+        """Forgets all history and starts the next step from the current scene."""
+        self.undo_steps.clear()
+        self.redo_steps.clear()
+        self.nbytes = 0
+        self._last_step = None
+        self.rebase()
+
+    def rebase(self):
+        """Starts the next step: forgets the list edits and written slots noted so far."""
+        self._ops = {'brush': [], 'thing': []} # kind -> (op, index, item) since the last checkpoint
+        # kind -> {entity id: (slot, {key or column: value or row before its first write})}. Every
+        # state's history hears every write; _records() keeps the ones to objects in this scene.
+        self._edited = {'brush': {}, 'thing': {}}
+        self._selection = self.state.selected_object
+
+    def _list_changed(self, kind, op, index, item):
+        if op == LIST_REPLACE:
+            item = (item, list(_scene_list(self.state, kind)))
+        self._ops[kind].append((op, index, item))
+
+    def _noted(self, store, slot, key, old):
+        edits = self._edited[_kind(store)].setdefault(int(store.ids[slot]), (slot, {}))[1]
+        if key not in edits:
+            edits[key] = old
+
+    # --- Records ---
+    def _records(self, kind, columns):
+        records = []
+        store = _store(kind)
+        ops = self._ops[kind]
+        if ops:
+            records.append(MembershipRecord(kind, ops))
+        edited = self._edited[kind]
+        if not edited:
+            return records
+
+        # Edits count for objects in the scene and ones this step added or removed, not for clipboard copies.
+        listed = set()
+        for op, _, item in ops:
+            listed.update(map(id, item[0] + item[1]) if op == LIST_REPLACE else (id(item),))
+        rows = {} # column -> (objects, rows before their first write)
+        for entity_id, (slot, edits) in edited.items():
+            obj = store.object(slot)
+            if obj is None or obj.entity_id != entity_id: # Gone, and maybe its slot reused
+                continue
+            if id(obj) not in listed and self.state.index.get(entity_id) is not obj:
+                continue
+            values = obj if kind == 'brush' else obj.properties
+            for key, old in edits.items():
+                if key in columns:
+                    objects, old_rows = rows.setdefault(key, ([], []))
+                    objects.append(obj)
+                    old_rows.append(old)
+                    continue
+                new = values[key] if key in values else MISSING
+                if not _same(old, new):
+                    records.append(PropertyRecord(kind, obj, key, old, new))
+
+        # Column rows, for the objects whose rows actually ended up different.
+        for name, (objects, old_rows) in rows.items():
+            new = getattr(store, name)[[obj.slot for obj in objects]]
+            old = _stack(old_rows, new.shape[1])
+            changed = np.flatnonzero(np.any(old != new, axis=1))
+            if len(changed):
+                records.append(ColumnRecord(kind, name, [objects[i] for i in changed], old[changed], new[changed]))
+        return records
+
+    # --- Steps ---
+    def checkpoint(self):
+        """Records everything that changed since the last checkpoint as one undo step."""
+        records = self._records('thing', THING_COLUMNS) + self._records('brush', BRUSH_COLUMNS)
+        # Membership goes last so undo re-inserts objects before restoring their fields.
+        records.sort(key=lambda record: isinstance(record, MembershipRecord))
+        if records:
+            step = UndoStep(records, self._selection, self.state.selected_object)
+            last = self._last_step
+            if (last is not None and self.undo_steps and self.undo_steps[-1] is last
+                    and step.time - last.time <= self.coalesce_seconds):
+                before = last.nbytes
+                if last.merge(step):
+                    self.nbytes += last.nbytes - before
+                    step = None
+            if step is not None:
+                self.undo_steps.append(step)
+                self.nbytes += step.nbytes
+                self._last_step = step
+            self._drop_redo()
+            self._trim()
+        self.rebase()
+        return bool(records)
+
+    def _drop_redo(self):
+        self.nbytes -= sum(step.nbytes for step in self.redo_steps)
+        self.redo_steps.clear()
+
+    def _trim(self):
+        """Drops the oldest steps until the history fits its budget; the latest step always stays."""
+        while self.nbytes > self.budget and len(self.undo_steps) > 1:
+            self.nbytes -= self.undo_steps.pop(0).nbytes
+
+    def undo(self):
+        """Reverts the latest step. Edits made since the last checkpoint become a step of their own first."""
+        self.checkpoint()
+        if not self.undo_steps:
+            return False
+        step = self.undo_steps.pop()
+        for record in reversed(step.records):
+            record.undo(self.state)
+        self.state.selected_object = step.selection_before
+        self.redo_steps.append(step)
+        self._last_step = None
+        self.rebase() # The edits just replayed are the step itself, not a new one
+        return True
+
+    def redo(self):
+        self.checkpoint()
+        if not self.redo_steps:
+            return False
+        step = self.redo_steps.pop()
+        for record in step.records:
+            record.redo(self.state)
+        self.state.selected_object = step.selection_after
+        self.undo_steps.append(step)
+        self._last_step = None
+        self.rebase()
+        return True
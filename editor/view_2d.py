@@ -3,6 +3,7 @@ from PyQt5.QtWidgets import QWidget, QMenu
 from PyQt5.QtGui import QPainter, QPen, QBrush, QColor, QFont, QPolygonF, QPixmap
 from PyQt5.QtCore import Qt, QRectF, QPointF, QPoint
 from editor.things import Thing, Light, PlayerStart, Pickup, Speaker
+from editor.brush_store import Brush, FLAG_HIDDEN, FLAG_LOCK, FLAG_MOVER
 from editor.scene_hierarchy import SceneHierarchy # Import SceneHierarchy to access color_icons
 
 class View2D(QWidget):
@@ -149,10 +150,22 @@ class View2D(QWidget):
     def draw_brushes(self, painter):
         ax1, ax2 = self.get_axes()
         ax_map = {'x': 0, 'y': 1, 'z': 2}
-        
-        for brush in self.editor.state.brushes:
-            if brush.get('hidden', False):
-                continue
+
+        # Cull against the visible world rectangle using the brush store's columns.
+        # Movers are always drawn, since their path can cross the view when the brush doesn't.
+        brushes = self.editor.state.brushes
+        slots = Brush.store.slots(brushes)
+        flags = Brush.store.flags[slots]
+        mins, maxs = Brush.store.bounds(slots)
+        mins, maxs = np.minimum(mins, maxs), np.maximum(mins, maxs)
+        corner1, corner2 = self.screen_to_world(QPointF(0, 0)), self.screen_to_world(QPointF(self.width(), self.height()))
+        a1, a2 = ax_map[ax1], ax_map[ax2]
+        on_screen = ((maxs[:, a1] >= min(corner1.x(), corner2.x())) & (mins[:, a1] <= max(corner1.x(), corner2.x())) &
+                     (maxs[:, a2] >= min(corner1.y(), corner2.y())) & (mins[:, a2] <= max(corner1.y(), corner2.y())))
+        drawn = ((flags & FLAG_HIDDEN) == 0) & (on_screen | ((flags & FLAG_MOVER) != 0))
+
+        for index in np.flatnonzero(drawn):
+            brush = brushes[index]
             is_selected = (brush is self.editor.state.selected_object)
             is_trigger = brush.get('is_trigger', False)
             is_subtractive = brush.get('operation') == 'subtract'
@@ -383,21 +396,18 @@ class View2D(QWidget):
         pen = QPen(QColor(139, 69, 19), 2, Qt.DotLine)
         painter.setPen(pen)
 
-        for brush in self.editor.state.brushes:
-            if brush.get('is_trigger') and brush.get('target'):
-                target_name = brush.get('target')
-                target_thing = next((t for t in self.editor.state.things if hasattr(t, 'name') and t.name == target_name), None)
+        state = self.editor.state
+        state.logic.sync(state.brushes, state.things)
+        for brush, target in state.logic.connections():
+            brush_pos_3d = brush['pos']
+            target_pos_3d = target['pos'] if isinstance(target, dict) else target.pos
 
-                if target_thing:
-                    brush_pos_3d = brush['pos']
-                    thing_pos_3d = target_thing.pos
-                    
-                    brush_pos_2d = QPointF(brush_pos_3d[ax_map[ax1]], brush_pos_3d[ax_map[ax2]])
-                    thing_pos_2d = QPointF(thing_pos_3d[ax_map[ax1]], thing_pos_3d[ax_map[ax2]])
+            brush_pos_2d = QPointF(brush_pos_3d[ax_map[ax1]], brush_pos_3d[ax_map[ax2]])
+            target_pos_2d = QPointF(target_pos_3d[ax_map[ax1]], target_pos_3d[ax_map[ax2]])
 
-                    p1 = self.world_to_screen(brush_pos_2d)
-                    p2 = self.world_to_screen(thing_pos_2d)
-                    painter.drawLine(p1, p2)
+            p1 = self.world_to_screen(brush_pos_2d)
+            p2 = self.world_to_screen(target_pos_2d)
+            painter.drawLine(p1, p2)
 
     def get_resize_handles(self, rect):
         return [
@@ -496,9 +506,14 @@ class View2D(QWidget):
                 ax1, ax2 = self.get_axes()
                 ax_map = {'x': 0, 'y': 1, 'z': 2}
                 new_obj_pos = self.snap_to_grid(world_pos + self.drag_offset)
-                pos_ref = obj['pos'] if isinstance(obj, dict) else obj.pos
-                pos_ref[ax_map[ax1]] = new_obj_pos.x()
-                pos_ref[ax_map[ax2]] = new_obj_pos.y()
+                pos = list(obj['pos'] if isinstance(obj, dict) else obj.pos)
+                pos[ax_map[ax1]] = new_obj_pos.x()
+                pos[ax_map[ax2]] = new_obj_pos.y()
+                # Written back whole so the stores note the edit.
+                if isinstance(obj, dict):
+                    obj['pos'] = pos
+                else:
+                    obj.pos = pos
         
         elif self.is_resizing_brush:
             obj = self.editor.state.selected_object
@@ -536,7 +551,7 @@ class View2D(QWidget):
                     size[ax_map[ax1]] = rect.width()
                     size[ax_map[ax2]] = rect.height()
 
-                    new_brush = {'pos': pos, 'size': size, 'textures': {f: 'default.png' for f in ['north','south','east','west','top','down']}}
+                    new_brush = Brush({'pos': pos, 'size': size, 'textures': {f: 'default.png' for f in ['north','south','east','west','top','down']}})
                     self.editor.state.brushes.append(new_brush)
                     self.editor.set_selected_object(new_brush)
             
@@ -584,25 +599,27 @@ class View2D(QWidget):
         ax1, ax2 = self.get_axes()
         ax_map = {'x': 0, 'y': 1, 'z': 2}
 
-        for thing in reversed(self.editor.state.things):
-            w_2d, h_2d = 24, 24 
-            thing_w_pos = QPointF(thing.pos[ax_map[ax1]], thing.pos[ax_map[ax2]])
-            thing_rect = QRectF(thing_w_pos.x() - w_2d/2, thing_w_pos.y() - h_2d/2, w_2d, h_2d)
-            if thing_rect.contains(world_pos):
-                return thing
+        # Things are 24x24 world units; test them all at once against the store's positions.
+        things = self.editor.state.things
+        if things:
+            pos = Thing.store.pos[Thing.store.slots(things)]
+            hits = np.flatnonzero((np.abs(pos[:, ax_map[ax1]] - world_pos.x()) <= 12) &
+                                  (np.abs(pos[:, ax_map[ax2]] - world_pos.y()) <= 12))
+            if len(hits):
+                return things[hits[-1]]
                 
-        for brush in reversed(self.editor.state.brushes):
-            # Check if the brush is locked or hidden. If so, skip it.
-            if brush.get('lock', False) or brush.get('hidden', False):
-                continue
-                
-            pos = brush['pos']
-            size = brush['size']
-            p1 = QPointF(pos[ax_map[ax1]] - size[ax_map[ax1]]/2, pos[ax_map[ax2]] - size[ax_map[ax2]]/2)
-            p2 = QPointF(pos[ax_map[ax1]] + size[ax_map[ax1]]/2, pos[ax_map[ax2]] + size[ax_map[ax2]]/2)
-            brush_rect = QRectF(p1, p2).normalized()
-            if brush_rect.contains(world_pos):
-                return brush
+        # Locked and hidden brushes can't be picked; of the rest, the last one in the list wins.
+        brushes = self.editor.state.brushes
+        if brushes:
+            slots = Brush.store.slots(brushes)
+            mins, maxs = Brush.store.bounds(slots)
+            mins, maxs = np.minimum(mins, maxs), np.maximum(mins, maxs)
+            a1, a2 = ax_map[ax1], ax_map[ax2]
+            x, y = world_pos.x(), world_pos.y()
+            pickable = (Brush.store.flags[slots] & (FLAG_LOCK | FLAG_HIDDEN)) == 0
+            hits = np.flatnonzero(pickable & (mins[:, a1] <= x) & (x <= maxs[:, a1]) & (mins[:, a2] <= y) & (y <= maxs[:, a2]))
+            if len(hits):
+                return brushes[hits[-1]]
 
         return None
 
@@ -677,10 +694,12 @@ class View2D(QWidget):
         if new_size_y < self.grid_size: new_size_y = self.grid_size
         
         # Update brush position and size
-        brush['pos'][ix1] = min_x + new_size_x / 2
-        brush['pos'][ix2] = min_y + new_size_y / 2
-        brush['size'][ix1] = new_size_x
-        brush['size'][ix2] = new_size_y
+        new_pos, new_size = old_pos, old_size
+        new_pos[ix1] = min_x + new_size_x / 2
+        new_pos[ix2] = min_y + new_size_y / 2
+        new_size[ix1] = new_size_x
+        new_size[ix2] = new_size_y
+        brush['pos'], brush['size'] = new_pos, new_size
 
     def zoom_in(self):
         self.zoom_factor *= 1.25
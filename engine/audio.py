@@ -0,0 +1,270 @@
+"""
+Software audio mixer for play mode.
+
+All sounds are mixed into one stereo stream. A mixing thread renders blocks
+of AUDIO_BLOCK_FRAMES float32 frames ahead of the output, which pulls them as
+16-bit PCM through read(). Each voice gets its volume, a distance attenuation
+and an equal-power pan from the listener's position and facing, computed for
+all voices at once in numpy.
+
+At most max_voices voices are mixed per block. The rest are still advanced,
+so loops stay in time, but are silent until they outrank a mixed voice by
+priority and loudness. Decoded samples are kept in a SampleCache, so every
+speaker playing the same file shares one buffer. Files larger than
+AUDIO_STREAM_THRESHOLD are streamed from a memory map instead (see
+engine/audio_stream.py).
+"""
+import math
+import os
+import queue
+import threading
+import wave
+import numpy as np
+from .audio_stream import pcm_to_float, WavStream, StreamReader
+from .constants import AUDIO_SAMPLE_RATE, AUDIO_BLOCK_FRAMES, AUDIO_QUEUE_BLOCKS, AUDIO_MAX_VOICES, AUDIO_STREAM_THRESHOLD
+
+
+def to_output_format(samples, channels, source_rate, rate=AUDIO_SAMPLE_RATE):
+    """Reshapes interleaved samples to (frames, 2) at the mixer's rate."""
+    samples = samples.reshape(-1, channels)
+    if channels == 1:
+        samples = np.repeat(samples, 2, axis=1)
+    elif channels > 2:
+        samples = samples[:, :2]
+    if source_rate != rate and len(samples) > 1:
+        # Linear resampling is plenty for ambience and effects.
+        frames = int(round(len(samples) * rate / source_rate))
+        source_times = np.arange(len(samples)) / source_rate
+        times = np.arange(frames) / rate
+        samples = np.stack([np.interp(times, source_times, samples[:, c]) for c in range(2)], axis=1)
+    return np.ascontiguousarray(samples, dtype=np.float32)
+
+
+def decode_wav(path, rate=AUDIO_SAMPLE_RATE):
+    """Decodes a PCM WAV file to a (frames, 2) float32 array at rate."""
+    with wave.open(path, 'rb') as f:
+        channels, width, source_rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+        raw = f.readframes(f.getnframes())
+    return to_output_format(pcm_to_float(raw, width), channels, source_rate, rate)
+
+
+class SampleCache:
+    """Decoded samples, or memory-mapped streams for long files, by path, shared by every voice playing that file."""
+
+    def __init__(self, rate=AUDIO_SAMPLE_RATE):
+        self.rate = rate
+        self._samples = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        with self._lock:
+            samples = self._samples.get(path)
+            if samples is None:
+                samples = self._samples[path] = decode_wav(path, self.rate)
+                samples.setflags(write=False)
+            return samples
+
+    def stream(self, path):
+        with self._lock:
+            stream = self._streams.get(path)
+            if stream is None:
+                stream = self._streams[path] = WavStream(path)
+            return stream
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            for stream in self._streams.values():
+                stream.close()
+            self._streams.clear()
+
+
+class Voice:
+    """A playing sound: either cached samples or, with stream set, a StreamReader."""
+    __slots__ = ('key', 'samples', 'stream', 'cursor', 'looping', 'volume', 'occlusion', 'priority', 'position', 'radius', 'finished', 'on_finished')
+
+    def __init__(self, key, samples, volume=1.0, looping=False, priority=0, position=None, radius=None, on_finished=None, stream=None):
+        self.key, self.samples, self.stream = key, samples, stream
+        self.cursor = 0
+        self.looping, self.volume, self.priority = looping, volume, priority
+        self.occlusion = 1.0 # Gain from walls between the voice and the listener, set by the game
+        # A voice with no position is global: no attenuation, centred.
+        self.position = None if position is None else np.array(position, dtype=np.float64)
+        self.radius = radius
+        self.finished = False
+        self.on_finished = on_finished
+
+    def read(self, frames):
+        """Returns the next frames of samples and advances, looping or padding with silence."""
+        if self.stream is not None:
+            chunk = self.stream.read(frames)
+            self.finished = self.stream.finished
+            return chunk
+        samples, length = self.samples, len(self.samples)
+        if self.cursor + frames <= length:
+            chunk = samples[self.cursor:self.cursor + frames]
+        elif self.looping and length:
+            chunk = samples[(self.cursor + np.arange(frames)) % length]
+        else:
+            chunk = np.zeros((frames, 2), dtype=np.float32)
+            chunk[:max(length - self.cursor, 0)] = samples[self.cursor:]
+        self.skip(frames)
+        return chunk
+
+    def skip(self, frames):
+        if self.stream is not None:
+            self.stream.skip(frames)
+            self.finished = self.stream.finished
+            return
+        length = len(self.samples)
+        self.cursor += frames
+        if self.cursor >= length:
+            if self.looping and length:
+                self.cursor %= length
+            else:
+                self.finished = True
+
+
+class AudioMixer:
+    def __init__(self, max_voices=AUDIO_MAX_VOICES, block_frames=AUDIO_BLOCK_FRAMES, rate=AUDIO_SAMPLE_RATE, cache=None):
+        self.max_voices = max_voices
+        self.block_frames = block_frames
+        self.rate = rate
+        self.cache = cache if cache is not None else SampleCache(rate)
+        self.voices = {} # key -> Voice
+        self.listener_pos = np.zeros(3)
+        self.listener_right = np.array([-1.0, 0.0, 0.0])
+        self.mixed_voices = 0 # Voices audible in the last block, for the profiler overlay
+        self._lock = threading.Lock()
+        self._blocks = queue.Queue(maxsize=AUDIO_QUEUE_BLOCKS)
+        self._pending = b''
+        self._thread = None
+        self._running = False
+
+    # --- Voices (called from the game thread) ---
+    def play(self, key, path, volume=1.0, looping=False, priority=0, position=None, radius=None, on_finished=None):
+        """Starts the file at path as voice key, replacing any voice with that key."""
+        samples = stream = None
+        try:
+            if os.path.getsize(path) > AUDIO_STREAM_THRESHOLD:
+                stream = StreamReader(self.cache.stream(path), looping, self.rate)
+                stream.fill()
+            else:
+                samples = self.cache.get(path)
+        except (OSError, EOFError, ValueError, wave.Error) as e:
+            print(f"Audio Error: Could not decode '{path}': {e}")
+            return None
+        voice = Voice(key, samples, volume, looping, priority, position, radius, on_finished, stream)
+        with self._lock:
+            self.voices[key] = voice
+        return voice
+
+    def stop(self, key):
+        with self._lock:
+            self.voices.pop(key, None)
+
+    def stop_all(self):
+        with self._lock:
+            self.voices.clear()
+
+    def set_listener(self, pos, angle):
+        """The listener faces (sin angle, 0, cos angle), like the player."""
+        with self._lock:
+            self.listener_pos = np.array(pos, dtype=np.float64)
+            self.listener_right = np.array([-math.cos(angle), 0.0, math.sin(angle)])
+
+    # --- Mixing ---
+    def _gains(self, voices):
+        """(V, 2) left/right gains for the voices, from volume, occlusion, distance and pan."""
+        volume = np.array([v.volume * v.occlusion for v in voices], dtype=np.float64)
+        gains = np.repeat((volume * math.sqrt(0.5))[:, None], 2, axis=1)
+        placed = np.array([v.position is not None for v in voices])
+        if placed.any():
+            indexes = np.flatnonzero(placed)
+            offsets = np.array([voices[i].position for i in indexes]) - self.listener_pos
+            radius = np.array([voices[i].radius or 1.0 for i in indexes], dtype=np.float64)
+            distance = np.linalg.norm(offsets, axis=1)
+            attenuation = np.clip(1.0 - distance / radius, 0.0, 1.0) ** 2
+            with np.errstate(divide='ignore', invalid='ignore'):
+                pan = np.where(distance > 0, offsets @ self.listener_right / distance, 0.0)
+            # Equal-power pan: -1 is hard left, 1 hard right.
+            angle = (pan + 1.0) * math.pi / 4
+            gains[indexes] = (volume[indexes] * attenuation)[:, None] * np.stack([np.cos(angle), np.sin(angle)], axis=1)
+        return gains
+
+    def mix_block(self):
+        """Mixes the next block_frames frames of every voice into a (frames, 2) float32 array."""
+        frames = self.block_frames
+        out = np.zeros((frames, 2), dtype=np.float32)
+        with self._lock:
+            voices = list(self.voices.values())
+            if not voices:
+                self.mixed_voices = 0
+                return out
+            gains = self._gains(voices)
+            loudness = gains.max(axis=1)
+            priority = np.array([v.priority for v in voices], dtype=np.float64)
+            # Highest priority first, loudest first within a priority; the rest are stolen.
+            order = np.lexsort((-loudness, -priority))
+            mixed = [i for i in order[:self.max_voices] if loudness[i] > 0.0]
+            for i in mixed:
+                out += voices[i].read(frames) * gains[i].astype(np.float32)
+            mixed_set = set(mixed)
+            for i, voice in enumerate(voices):
+                if i not in mixed_set:
+                    voice.skip(frames)
+            finished = [v for v in voices if v.finished]
+            for voice in finished:
+                if self.voices.get(voice.key) is voice:
+                    del self.voices[voice.key]
+            self.mixed_voices = len(mixed)
+            streams = [voices[i].stream for i in mixed if voices[i].stream is not None and not voices[i].finished]
+        # Decode the streams' read-ahead for the next block outside the lock.
+        for stream in streams:
+            stream.fill()
+        for voice in finished:
+            if voice.on_finished:
+                voice.on_finished(voice)
+        np.clip(out, -1.0, 1.0, out=out)
+        return out
+
+    # --- Mixing thread and output ---
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='AudioMixer', daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._pending = b''
+        while not self._blocks.empty():
+            self._blocks.get_nowait()
+
+    def _run(self):
+        while self._running:
+            block = (self.mix_block() * 32767.0).astype('<i2').tobytes()
+            # put() blocks while the queue is full, which paces the thread to the output.
+            while self._running:
+                try:
+                    self._blocks.put(block, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    def read(self, size):
+        """Returns size bytes of 16-bit stereo PCM for the output stream, padding underruns with silence."""
+        size -= size % 4
+        data = self._pending
+        while len(data) < size:
+            try:
+                data += self._blocks.get_nowait()
+            except queue.Empty:
+                data += bytes(size - len(data))
+        self._pending = data[size:]
+        return data[:size]
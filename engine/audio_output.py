@@ -0,0 +1,56 @@
+"""
+The mixer's single output stream: a QAudioOutput in pull mode reading from
+an AudioMixer.
+"""
+from PyQt5.QtCore import QIODevice
+from PyQt5.QtMultimedia import QAudioFormat, QAudioOutput, QAudioDeviceInfo
+from .constants import AUDIO_BLOCK_FRAMES
+
+
+class _MixerDevice(QIODevice):
+    def __init__(self, mixer, parent=None):
+        super().__init__(parent)
+        self.mixer = mixer
+
+    def readData(self, maxlen):
+        return self.mixer.read(maxlen)
+
+    def writeData(self, data):
+        return 0
+
+    def bytesAvailable(self):
+        return AUDIO_BLOCK_FRAMES * 4 + super().bytesAvailable()
+
+
+class MixerOutput:
+    def __init__(self, mixer, parent=None):
+        self.mixer = mixer
+        audio_format = QAudioFormat()
+        audio_format.setSampleRate(mixer.rate)
+        audio_format.setChannelCount(2)
+        audio_format.setSampleSize(16)
+        audio_format.setCodec("audio/pcm")
+        audio_format.setByteOrder(QAudioFormat.LittleEndian)
+        audio_format.setSampleType(QAudioFormat.SignedInt)
+        if not QAudioDeviceInfo.defaultOutputDevice().isFormatSupported(audio_format):
+            print("Audio Error: The default output device does not support 16-bit stereo PCM.")
+        self.output = QAudioOutput(audio_format, parent)
+        self.output.setBufferSize(AUDIO_BLOCK_FRAMES * 4 * 2)
+        self.device = _MixerDevice(mixer, parent)
+        self.running = False
+
+    def start(self):
+        if self.running:
+            return
+        self.mixer.start()
+        self.device.open(QIODevice.ReadOnly)
+        self.output.start(self.device)
+        self.running = True
+
+    def stop(self):
+        if not self.running:
+            return
+        self.output.stop()
+        self.device.close()
+        self.mixer.shutdown()
+        self.running = False
@@ -0,0 +1,163 @@
+"""
+Streaming playback for long WAV files.
+
+A WavStream memory-maps the file once and is shared by every voice playing
+it; nothing is decoded up front. Each voice reads through its own
+StreamReader, which decodes the frames it needs from the map into a small
+ring buffer and keeps AUDIO_STREAM_READAHEAD frames decoded ahead of the
+mixer. Memory per voice is the ring buffer, however long the file is.
+"""
+import mmap
+import struct
+import numpy as np
+from .constants import AUDIO_SAMPLE_RATE, AUDIO_STREAM_READAHEAD
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def pcm_to_float(raw, sample_width):
+    """Converts little-endian PCM bytes of 8, 16, 24 or 32 bits to float32 in [-1, 1]."""
+    if sample_width == 1:
+        return (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    if sample_width == 2:
+        return np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768.0
+    if sample_width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        values = np.where(values >= 1 << 23, values - (1 << 24), values)
+        return values.astype(np.float32) / float(1 << 23)
+    if sample_width == 4:
+        return (np.frombuffer(raw, dtype='<i4').astype(np.float64) / 2147483648.0).astype(np.float32)
+    raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+
+
+class WavStream:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data_offset, data_size = self._parse()
+        self.frame_bytes = self.channels * self.sample_width
+        self.frames = data_size // self.frame_bytes
+        # A zero-copy view of the PCM data, one row of bytes per frame.
+        self.data = np.frombuffer(self._map, dtype=np.uint8, count=self.frames * self.frame_bytes,
+                                  offset=data_offset).reshape(self.frames, self.frame_bytes)
+
+    def _parse(self):
+        m = self._map
+        if m[0:4] != b'RIFF' or m[8:12] != b'WAVE':
+            raise ValueError("Not a RIFF WAVE file")
+        offset, fmt_found = 12, False
+        while offset + 8 <= len(m):
+            chunk_id, size = m[offset:offset + 4], struct.unpack('<I', m[offset + 4:offset + 8])[0]
+            body = offset + 8
+            if chunk_id == b'fmt ':
+                tag, self.channels, self.rate, _, _, bits = struct.unpack('<HHIIHH', m[body:body + 16])
+                if tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_EXTENSIBLE):
+                    raise ValueError(f"Unsupported WAV format tag {tag:#x}")
+                self.sample_width = bits // 8
+                fmt_found = True
+            elif chunk_id == b'data':
+                if not fmt_found:
+                    raise ValueError("WAV data chunk before fmt chunk")
+                return body, min(size, len(m) - body)
+            offset = body + size + (size & 1) # Chunks are word aligned
+        raise ValueError("WAV file has no data chunk")
+
+    def decode(self, frame_indexes):
+        """Decodes the given source frames to (len, channels) float32."""
+        raw = self.data[frame_indexes].tobytes()
+        return pcm_to_float(raw, self.sample_width).reshape(-1, self.channels)
+
+    def close(self):
+        self.data = None
+        self._map.close()
+
+
+class StreamReader:
+    """One voice's position in a WavStream, with its decoded read-ahead."""
+
+    def __init__(self, stream, looping=False, rate=AUDIO_SAMPLE_RATE, readahead=AUDIO_STREAM_READAHEAD):
+        self.stream = stream
+        self.looping = looping
+        self.step = stream.rate / rate # Source frames per output frame
+        self.source_pos = 0.0
+        self.ring = np.zeros((readahead, 2), dtype=np.float32)
+        self.head = 0 # Next frame to read
+        self.count = 0 # Decoded frames waiting in the ring
+        self.exhausted = False # Every source frame has been decoded (non-looping only)
+        self.finished = False
+
+    def _decode(self, frames):
+        """Decodes the next frames output frames, resampling linearly if the rates differ."""
+        stream = self.stream
+        positions = self.source_pos + np.arange(frames) * self.step
+        if not self.looping:
+            positions = positions[positions < stream.frames]
+            if len(positions) < frames:
+                self.exhausted = True
+        self.source_pos += frames * self.step
+        if self.looping:
+            self.source_pos %= stream.frames
+        if not len(positions):
+            return np.zeros((0, 2), dtype=np.float32)
+        first = int(positions[0])
+        indexes = np.arange(first, int(positions[-1]) + 2)
+        indexes = indexes % stream.frames if self.looping else np.minimum(indexes, stream.frames - 1)
+        source = stream.decode(indexes)
+        if stream.channels == 1:
+            source = np.repeat(source, 2, axis=1)
+        elif stream.channels > 2:
+            source = source[:, :2]
+        if self.step == 1.0 and positions[0] == first:
+            return source[:len(positions)]
+        local = positions - first
+        base = local.astype(np.int64)
+        frac = (local - base)[:, None].astype(np.float32)
+        return source[base] * (1.0 - frac) + source[base + 1] * frac
+
+    def fill(self):
+        """Tops the ring buffer up with decoded frames; the mixer calls this after each block."""
+        capacity = len(self.ring)
+        while self.count < capacity and not self.exhausted:
+            frames = self._decode(capacity - self.count)
+            tail = (self.head + self.count) % capacity
+            first = min(len(frames), capacity - tail)
+            self.ring[tail:tail + first] = frames[:first]
+            self.ring[:len(frames) - first] = frames[first:]
+            self.count += len(frames)
+
+    def read(self, frames):
+        out = np.zeros((frames, 2), dtype=np.float32)
+        written = 0
+        while written < frames:
+            if not self.count:
+                self.fill()
+                if not self.count:
+                    self.finished = True
+                    break
+            capacity = len(self.ring)
+            take = min(frames - written, self.count, capacity - self.head)
+            out[written:written + take] = self.ring[self.head:self.head + take]
+            self.head = (self.head + take) % capacity
+            self.count -= take
+            written += take
+        if self.exhausted and not self.count:
+            self.finished = True
+        return out
+
+    def skip(self, frames):
+        """Advances without mixing, dropping decoded frames first and then moving the source position."""
+        dropped = min(frames, self.count)
+        self.head = (self.head + dropped) % len(self.ring)
+        self.count -= dropped
+        remaining = frames - dropped
+        if remaining:
+            self.source_pos += remaining * self.step
+            if self.looping:
+                self.source_pos %= self.stream.frames
+            elif self.source_pos >= self.stream.frames:
+                self.exhausted = True
+        if self.exhausted and not self.count:
+            self.finished = True
@@ -20,4 +20,33 @@ PORTAL_B_TILE = 4
 # --- Physics Constants ---
 GRAVITY = -275.0
 JUMP_STRENGTH = 150.0
-TERMINAL_VELOCITY = -500.0
\ No newline at end of file
+TERMINAL_VELOCITY = -500.0
+
+# --- Collision Constants ---
+BROADPHASE_CELL_SIZE = 256.0 # World units per spatial hash cell
+STEP_HEIGHT = 24.0 # Tallest ledge the player walks up without jumping
+COLLISION_SKIN = 0.01 # Gap kept between the player and surfaces it touches
+SLIDE_ITERATIONS = 4
+
+# --- Audio Constants ---
+AUDIO_SAMPLE_RATE = 44100
+AUDIO_BLOCK_FRAMES = 1024 # Frames mixed per block, about 23 ms
+AUDIO_QUEUE_BLOCKS = 4 # Mixed blocks buffered ahead of the output stream
+AUDIO_MAX_VOICES = 32 # Voices mixed at once; quieter, lower-priority ones are stolen
+SPEAKER_GRID_CELL_SIZE = 512.0 # World units per cell of the speaker audibility grid
+SPEAKER_HYSTERESIS = 0.1 # Fraction of its radius the listener must go past before a speaker stops
+AUDIO_STREAM_THRESHOLD = 512 * 1024 # WAV files larger than this many bytes are streamed, not decoded whole
+AUDIO_STREAM_READAHEAD = 8192 # Frames each streaming voice keeps decoded ahead of the mixer
+AUDIO_OCCLUSION_GAIN = 0.35 # Gain of a speaker with a wall between it and the listener
+
+# --- Voxel Constants ---
+VOXEL_SIZE = 32.0 # World units per voxel of the line-of-sight grid
+VOXEL_BRICK = 8 # Voxels per side of each stored brick
+
+# --- AI Constants ---
+MONSTER_SPEED = 150.0 # Default chase speed in world units per second
+FLOW_SMOOTHING = 0.5 # Weight of the distance gradient added to the step towards the nearest cell downhill
+
+# --- Editor Constants ---
+UNDO_MEMORY_BUDGET = 64 * 1024 * 1024 # Bytes of undo history kept; the oldest steps are dropped past this
+UNDO_COALESCE_SECONDS = 1.0 # Edits to the same fields this close together merge into one undo step
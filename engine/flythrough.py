@@ -0,0 +1,260 @@
+"""
+Scripted camera fly-throughs for finding expensive parts of a level.
+
+A CameraPath is a Catmull-Rom spline walked at constant speed, either through
+points recorded in play mode or generated through the PlayerStart and every
+Light. FlythroughBenchmark steps it at a fixed timestep in QtGameView, records
+per-frame CPU/GPU time and draw calls, and writes a JSON report plus a
+top-down heatmap of frame cost over the map's XZ extent.
+"""
+import os
+import json
+import math
+import numpy as np
+import glm
+from PIL import Image
+from editor.things import Light, PlayerStart
+from engine.render_stats import render_stats
+
+FLYTHROUGH_TIMESTEP = 1.0 / 60.0
+FLYTHROUGH_SPEED = 300.0 # World units per second
+HEATMAP_CELLS = 96 # Cells along the longest side of the map
+HEATMAP_SCALE = 6 # Output pixels per cell
+
+
+def _catmull_rom(points, samples_per_segment=16):
+    """Samples a uniform Catmull-Rom spline through points, ending exactly on the last one."""
+    if len(points) < 2:
+        return points.copy()
+    padded = np.vstack([points[:1], points, points[-1:]])
+    t = np.linspace(0.0, 1.0, samples_per_segment, endpoint=False)[:, None]
+    t2, t3 = t * t, t * t * t
+    segments = []
+    for i in range(len(points) - 1):
+        p0, p1, p2, p3 = padded[i], padded[i + 1], padded[i + 2], padded[i + 3]
+        segments.append(0.5 * ((2 * p1) + (-p0 + p2) * t + (2 * p0 - 5 * p1 + 4 * p2 - p3) * t2 + (-p0 + 3 * p1 - 3 * p2 + p3) * t3))
+    segments.append(points[-1:])
+    return np.vstack(segments)
+
+
+class CameraPath:
+    """
+    A camera path through control points (N, 3). Optional per-point yaw and
+    pitch (degrees) are interpolated; otherwise the camera looks along the path.
+    """
+
+    def __init__(self, points, yaws=None, pitches=None):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if len(self.points) == 0:
+            raise ValueError("A camera path needs at least one point.")
+        self.dense = _catmull_rom(self.points)
+        steps = np.linalg.norm(np.diff(self.dense, axis=0), axis=1)
+        self.distances = np.concatenate([[0.0], np.cumsum(steps)])
+        self.length = float(self.distances[-1])
+
+        self.orientations = None
+        if yaws is not None and pitches is not None:
+            # Unwrap yaw so interpolation never spins the long way round.
+            angles = np.column_stack([np.degrees(np.unwrap(np.radians(yaws))), pitches])
+            self.orientations = _catmull_rom(angles)
+
+    def sample(self, distance):
+        """Returns (position vec3, yaw, pitch) at distance along the path."""
+        distance = min(max(distance, 0.0), self.length)
+        position = np.array([np.interp(distance, self.distances, self.dense[:, axis]) for axis in range(3)])
+        if self.orientations is not None:
+            yaw = np.interp(distance, self.distances, self.orientations[:, 0])
+            pitch = np.interp(distance, self.distances, self.orientations[:, 1])
+        else:
+            ahead = np.array([np.interp(min(distance + 32.0, self.length), self.distances, self.dense[:, axis]) for axis in range(3)])
+            direction = ahead - position if distance + 1.0 < self.length else position - np.array(
+                [np.interp(max(distance - 32.0, 0.0), self.distances, self.dense[:, axis]) for axis in range(3)])
+            horizontal = math.hypot(direction[0], direction[2])
+            yaw = math.degrees(math.atan2(direction[2], direction[0])) if horizontal > 1e-6 else -90.0
+            pitch = math.degrees(math.atan2(direction[1], horizontal)) if horizontal > 1e-6 else 0.0
+        return glm.vec3(*position), float(yaw), float(pitch)
+
+    @classmethod
+    def through_level(cls, things):
+        """
+        Generates a path from the PlayerStart through every Light, visiting the
+        nearest unvisited one each time. Points are kept at PlayerStart eye height
+        so the camera stays below ceiling-mounted lights.
+        """
+        start = next((t for t in things if isinstance(t, PlayerStart)), None)
+        lights = [np.array(t.pos, dtype=np.float64) for t in things if isinstance(t, Light)]
+        origin = np.array(start.pos, dtype=np.float64) if start else (lights.pop(0) if lights else np.zeros(3))
+        points = [origin]
+        while lights:
+            nearest = min(range(len(lights)), key=lambda i: np.linalg.norm(lights[i] - points[-1]))
+            points.append(lights.pop(nearest))
+        points = np.array(points)
+        if start:
+            points[:, 1] = origin[1]
+        return cls(points)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        samples = np.array(data['samples'], dtype=np.float64)
+        return cls(samples[:, 0:3], samples[:, 3], samples[:, 4])
+
+
+class PathRecorder:
+    """Samples the player's position and view each tick while recording."""
+
+    def __init__(self, min_spacing=8.0):
+        self.samples = []
+        self.min_spacing = min_spacing
+
+    def record(self, player):
+        # Player angles face (sin a, cos a) in XZ; camera yaw faces (cos y, sin y).
+        sample = [player.pos.x, player.pos.y, player.pos.z, 90.0 - math.degrees(player.angle), math.degrees(player.pitch)]
+        if self.samples and math.dist(self.samples[-1][:3], sample[:3]) < self.min_spacing:
+            return
+        self.samples.append(sample)
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'samples': self.samples}, f)
+        print(f"Recorded fly-through path with {len(self.samples)} samples to {path}")
+
+
+class FlythroughBenchmark:
+    """
+    Moves QtGameView's camera along a CameraPath at a fixed timestep and
+    records the cost of every frame. Call step() before a frame is drawn and
+    record_frame() after it; finished becomes True at the end of the path.
+    """
+
+    def __init__(self, path, speed=FLYTHROUGH_SPEED, timestep=FLYTHROUGH_TIMESTEP):
+        self.path = path
+        self.speed, self.timestep = speed, timestep
+        self.tick = 0
+        self.finished = False
+        self.frames = [] # Per-frame dicts, GPU time filled in once the queries resolve
+        self._pending_gpu = [] # (frame dict, profiler frame record)
+
+    def step(self, camera):
+        distance = self.tick * self.timestep * self.speed
+        if distance > self.path.length:
+            self.finished = True
+            return
+        camera.pos, camera.yaw, camera.pitch = self.path.sample(distance)
+        self.tick += 1
+
+    def record_frame(self, camera, profiler_frame):
+        if profiler_frame is None: return
+        stats = render_stats.last_frame
+        # Sum the top-level sections rather than using the frame's wall time,
+        # which also covers the event loop idling between timer ticks.
+        cpu_ns = sum(s['cpu_ns'] for s in profiler_frame['sections'] if s['depth'] == 0)
+        frame = {
+            'tick': self.tick,
+            'pos': [camera.pos.x, camera.pos.y, camera.pos.z],
+            'cpu_ms': cpu_ns / 1e6,
+            'gpu_ms': None,
+            'draw_calls': stats['draw_calls'],
+            'triangles': stats['triangles'],
+        }
+        self.frames.append(frame)
+        self._pending_gpu.append((frame, profiler_frame))
+        self._resolve_gpu_times()
+
+    def _resolve_gpu_times(self):
+        still_pending = []
+        for frame, record in self._pending_gpu:
+            if record['gpu_pending']:
+                still_pending.append((frame, record))
+                continue
+            # Only outermost GPU sections carry a query, so these never overlap.
+            gpu_ns = [s['gpu_ns'] for s in record['sections'] if s['gpu_ns'] is not None]
+            frame['gpu_ms'] = sum(gpu_ns) / 1e6 if gpu_ns else None
+        self._pending_gpu = still_pending
+
+    def report(self):
+        """Builds the summary dict written next to the heatmap."""
+        self._resolve_gpu_times()
+        cpu = np.array([f['cpu_ms'] for f in self.frames])
+        gpu = np.array([f['gpu_ms'] for f in self.frames if f['gpu_ms'] is not None])
+        draws = np.array([f['draw_calls'] for f in self.frames])
+
+        def stats(values):
+            if len(values) == 0: return None
+            return {'mean': float(values.mean()), 'p50': float(np.percentile(values, 50)), 'p95': float(np.percentile(values, 95)),
+                    'p99': float(np.percentile(values, 99)), 'max': float(values.max())}
+
+        worst = sorted(self.frames, key=self._frame_cost, reverse=True)[:10]
+        return {
+            'frames': len(self.frames),
+            'path_length': self.path.length,
+            'speed': self.speed,
+            'timestep': self.timestep,
+            'cpu_ms': stats(cpu),
+            'gpu_ms': stats(gpu),
+            'draw_calls': stats(draws),
+            'worst_frames': worst,
+            'per_frame': self.frames,
+        }
+
+    @staticmethod
+    def _frame_cost(frame):
+        return max(frame['cpu_ms'], frame['gpu_ms'] or 0.0)
+
+    def write_heatmap(self, path, brushes):
+        """
+        Writes a top-down PNG: brush footprints in grey, overlaid with the mean
+        frame cost of the frames rendered from each cell (blue cheap, red expensive).
+        """
+        solid = [b for b in brushes if not b.get('is_trigger') and not b.get('is_fog')]
+        footprints = np.array([[b['pos'][0] - b['size'][0] / 2, b['pos'][2] - b['size'][2] / 2,
+                                b['pos'][0] + b['size'][0] / 2, b['pos'][2] + b['size'][2] / 2] for b in solid]).reshape(-1, 4)
+        positions = np.array([[f['pos'][0], f['pos'][2]] for f in self.frames]).reshape(-1, 2)
+        costs = np.array([self._frame_cost(f) for f in self.frames])
+
+        extents = np.vstack([footprints[:, :2], footprints[:, 2:], positions]) if len(footprints) else positions
+        if len(extents) == 0:
+            return
+        min_xz, max_xz = extents.min(axis=0) - 64.0, extents.max(axis=0) + 64.0
+        cell = float((max_xz - min_xz).max()) / HEATMAP_CELLS
+        width, height = (np.ceil((max_xz - min_xz) / cell).astype(int) + 1)
+
+        image = np.full((height, width, 3), 24, dtype=np.uint8)
+        for x0, z0, x1, z1 in footprints:
+            c0 = ((np.array([x0, z0]) - min_xz) / cell).astype(int)
+            c1 = ((np.array([x1, z1]) - min_xz) / cell).astype(int)
+            image[c0[1]:c1[1] + 1, c0[0]:c1[0] + 1] = 70
+
+        if len(costs):
+            cells = ((positions - min_xz) / cell).astype(int)
+            flat = cells[:, 1] * width + cells[:, 0]
+            totals = np.bincount(flat, weights=costs, minlength=width * height)
+            counts = np.bincount(flat, minlength=width * height)
+            visited = counts > 0
+            mean_cost = np.zeros(width * height)
+            mean_cost[visited] = totals[visited] / counts[visited]
+            low, high = costs.min(), max(costs.max(), costs.min() + 1e-6)
+            t = np.clip((mean_cost - low) / (high - low), 0.0, 1.0)
+            colours = np.column_stack([255 * t, 255 * (1 - np.abs(2 * t - 1)), 255 * (1 - t)]).astype(np.uint8)
+            image.reshape(-1, 3)[visited] = colours[visited]
+
+        # Image rows run +Z downwards to match the editor's top view.
+        image = np.repeat(np.repeat(image, HEATMAP_SCALE, axis=0), HEATMAP_SCALE, axis=1)
+        Image.fromarray(image, 'RGB').save(path)
+
+    def write_results(self, output_prefix, brushes):
+        report = self.report()
+        report_path, heatmap_path = output_prefix + '_report.json', output_prefix + '_heatmap.png'
+        os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=4)
+        self.write_heatmap(heatmap_path, brushes)
+
+        print(f"Fly-through: {report['frames']} frames over {report['path_length']:.0f} units")
+        for key in ('cpu_ms', 'gpu_ms', 'draw_calls'):
+            if report[key]:
+                s = report[key]
+                print(f"  {key:<10} mean {s['mean']:8.2f}  p95 {s['p95']:8.2f}  p99 {s['p99']:8.2f}  max {s['max']:8.2f}")
+        print(f"Report written to {report_path}, heatmap to {heatmap_path}")
+        return report
@@ -0,0 +1,257 @@
+"""
+Play-mode simulation with no widgets attached: the player, trigger volumes and
+the movers, lights and speakers they target. QtGameView drives a GameSession
+from its timer; engine/input_recording.py drives one headless for replays.
+"""
+import numpy as np
+import glm
+from editor.things import Monster
+from engine.player import Player
+from engine.spatial_hash import BrushSpatialHash
+from engine.movers import MoverSystem
+from engine.voxels import VoxelGrid
+from engine.tilemap import CollisionTileMap, default_floor_y
+from engine.navigation import FlowField
+from engine.triggers import TriggerSystem, PLAYER_ACTOR, ENTER, brush_bounds
+from engine.constants import TILE_SIZE
+
+
+class GameSession:
+    def __init__(self, state, player_start_pos, player_start_angle, physics_enabled=True, tile_map=None):
+        self.state = state
+        self.player = Player(
+            player_start_pos[0],
+            player_start_pos[2],
+            np.radians(player_start_angle),
+            physics_enabled=physics_enabled
+        )
+        self.player.pos.y = player_start_pos[1]
+        self.player_start_pos = list(player_start_pos)
+        # Movers animate, so they stay out of the static broadphase and are swept from the MoverSystem.
+        self.broadphase = BrushSpatialHash(skip_movers=True)
+        self.broadphase.rebuild(state.brushes)
+        self.player.broadphase = self.broadphase
+        self.movers = MoverSystem()
+        self.movers.sync(state.brushes)
+        self.player.movers = self.movers
+        # Voxel occupancy for line-of-sight and sound occlusion, built on the first query.
+        self.voxels = VoxelGrid()
+        # Optional CollisionTileMap; when set the player collides against it instead of brushes.
+        self.tile_map = tile_map
+        self.player.tile_map = tile_map
+        # Trigger volumes, with the player, monsters and movers as actors.
+        self.triggers = TriggerSystem()
+        self.trigger_events = []
+        self._actors_dirty = True
+        self.fired_once_triggers = set() # Stable trigger ids
+        # Compile the trigger -> target dispatch table up front rather than on the first trigger.
+        state.logic.sync(state.brushes, state.things)
+        self._moving_movers = {} # id(brush) -> brush, for movers that moved on the last tick
+        # Monsters chase the player along a shared flow field, built once there are monsters.
+        self.navigation = None
+        self._monsters = None
+        self._monster_starts = {} # id(monster) -> position when play started
+        self.tick_count = 0
+        # Called with a Speaker when a trigger toggles it; sound lives in the view.
+        self.on_speaker_toggled = None
+
+    def tick(self, keys, delta):
+        """Advances the simulation by one step of delta seconds."""
+        self.update_player(keys, delta)
+        self.handle_triggers()
+
+    def update_player(self, keys, delta):
+        self.broadphase.sync(self.state.brushes)
+        if self.tile_map:
+            self.tile_map.sync(self.state.brushes)
+        self.update_movers(delta)
+        self.player.update(keys, self.state.brushes, delta)
+        self.update_monsters(delta)
+        self.tick_count += 1
+
+    def update_movers(self, delta):
+        self.movers.sync(self.state.brushes)
+        was_moving = self._moving_movers
+        moved = self.movers.tick(delta)
+        for brush in moved:
+            self.triggers.move_actor(('brush', brush.entity_id), *brush_bounds(brush))
+        # The tilemap and voxels are only patched once a mover comes to rest, never while it travels.
+        self._moving_movers = {id(brush): brush for brush in moved}
+        for key, brush in was_moving.items():
+            if key not in self._moving_movers:
+                self.voxels.update_brush(brush)
+                if self.tile_map:
+                    self.tile_map.update_brush(brush)
+                if self.navigation and self.navigation.tile_map is not self.tile_map:
+                    self.navigation.tile_map.update_brush(brush)
+
+    @property
+    def monsters(self):
+        """Entity store slots of the scene's monsters."""
+        if self._monsters is None:
+            self._monsters = Monster.store.select(self.state.things, Monster)
+            for monster in Monster.store.objects(self._monsters):
+                self._monster_starts.setdefault(id(monster), (monster, list(monster.pos)))
+        return self._monsters
+
+    def update_monsters(self, delta):
+        """Refreshes the flow field if the player changed cell, then moves every monster along it."""
+        monsters = self.monsters
+        if not len(monsters):
+            return
+        if self.navigation is None:
+            # Walk the play tilemap if there is one, otherwise rasterize one just for navigation.
+            nav_map = self.tile_map or CollisionTileMap.build(
+                self.state.brushes, default_floor_y(self.state.brushes, self.player_start_pos))
+            self.navigation = FlowField(nav_map)
+        self.navigation.tile_map.sync(self.state.brushes)
+        self.navigation.update(self.player.pos.x, self.player.pos.z)
+        half = TILE_SIZE / 2
+        for monster in Monster.store.objects(self.navigation.steer(Monster.store, monsters, delta)):
+            self.triggers.move_actor(('thing', monster.entity_id), [c - half for c in monster.pos], [c + half for c in monster.pos])
+
+    def line_of_sight(self, origins, targets):
+        """True for each origin -> target segment that no solid brush blocks."""
+        self.voxels.sync(self.state.brushes)
+        return self.voxels.line_of_sight(origins, targets)
+
+    def look(self, dx, dy):
+        self.player.update_angle(dx, dy)
+
+    @property
+    def player_in_triggers(self):
+        return self.triggers.overlaps.get(PLAYER_ACTOR, set())
+
+    def _player_bounds(self):
+        player = self.player
+        half = glm.vec3(player.width, player.height, player.depth) / 2.0
+        return list(player.pos - half), list(player.pos + half)
+
+    def _sync_triggers(self):
+        self.triggers.sync(self.state.brushes)
+        if self._actors_dirty:
+            for thing in self.state.things:
+                if isinstance(thing, Monster):
+                    half = TILE_SIZE / 2
+                    self.triggers.move_actor(('thing', thing.entity_id), [c - half for c in thing.pos], [c + half for c in thing.pos])
+            for brush in self.state.brushes:
+                if brush.get('is_mover'):
+                    self.triggers.move_actor(('brush', brush.entity_id), *brush_bounds(brush))
+            self._actors_dirty = False
+        self.triggers.move_actor(PLAYER_ACTOR, *self._player_bounds())
+
+    def handle_triggers(self):
+        """Moves the actors' trigger proxies and fires targets for the player's enter events."""
+        self._sync_triggers()
+        self.trigger_events = self.triggers.update()
+        for kind, actor, trigger_id in self.trigger_events:
+            if kind == ENTER and actor == PLAYER_ACTOR:
+                self.activate_trigger(self.triggers.trigger_brushes[trigger_id], trigger_id)
+
+    def mark_dirty(self):
+        """Called after editor changes to brushes or things during play."""
+        self._monsters = None
+        if self.navigation:
+            self.navigation.tile_map.mark_dirty()
+        self.broadphase.mark_dirty()
+        self.movers.mark_dirty()
+        self.voxels.mark_dirty()
+        self.state.logic.mark_dirty()
+        if self.tile_map:
+            self.tile_map.mark_dirty()
+        self.triggers.mark_dirty()
+        self._actors_dirty = True
+
+    def brushes_moved(self, brushes):
+        """Refiles brushes the editor moved or resized during play, instead of rebuilding every index."""
+        if any(brush.get('is_mover') for brush in brushes):
+            self.mark_dirty() # Movers travel from where they were placed
+            return
+        for brush in brushes:
+            self.broadphase.update_brush(brush)
+            self.voxels.update_brush(brush)
+            if self.tile_map:
+                self.tile_map.update_brush(brush)
+            if self.navigation and self.navigation.tile_map is not self.tile_map:
+                self.navigation.tile_map.update_brush(brush)
+            if brush.get('is_trigger'):
+                self.triggers.mark_dirty()
+
+    def things_moved(self, things):
+        """Moves the trigger proxies of monsters the editor moved during play."""
+        half = TILE_SIZE / 2
+        for thing in things:
+            if isinstance(thing, Monster):
+                self.triggers.move_actor(('thing', thing.entity_id), [c - half for c in thing.pos], [c + half for c in thing.pos])
+
+    def activate_trigger(self, brush, trigger_id):
+        trigger_frequency = brush.get('trigger_type', 'multiple')
+        if trigger_frequency == 'once' and trigger_id in self.fired_once_triggers:
+            return
+        target_name = brush.get('target')
+        if not target_name:
+            return
+
+        # Actions are compiled per target name; sync() only recompiles names touched by edits.
+        logic = self.state.logic
+        logic.sync(self.state.brushes, self.state.things)
+        if not logic.fire(target_name, self):
+            print(f"Play mode warning: Trigger target '{target_name}' not found.")
+            return
+
+        if trigger_frequency == 'once':
+            self.fired_once_triggers.add(trigger_id)
+
+    def snapshot(self):
+        """The player and trigger state as plain data, for InputRecorder."""
+        player = self.player
+        return {
+            'pos': list(player.pos),
+            'velocity': list(player.velocity),
+            'angle': player.angle,
+            'pitch': player.pitch,
+            'on_ground': player.on_ground,
+            'physics_enabled': player.physics_enabled,
+            # Trigger ids depend on edit history, so store brush indexes instead.
+            'player_in_triggers': self._trigger_indexes(self.player_in_triggers),
+            'fired_once_triggers': self._trigger_indexes(self.fired_once_triggers),
+            'tile_map_floor_y': self.tile_map.floor_y if self.tile_map else None,
+            'movers': self.movers.snapshot(self.state.brushes),
+            'riding': self._brush_index(player.riding),
+        }
+
+    @classmethod
+    def from_snapshot(cls, state, snapshot):
+        tile_map = None
+        if snapshot.get('tile_map_floor_y') is not None:
+            tile_map = CollisionTileMap.build(state.brushes, snapshot['tile_map_floor_y'])
+        session = cls(state, snapshot['pos'], 0.0, snapshot['physics_enabled'], tile_map)
+        player = session.player
+        player.pos = glm.vec3(*snapshot['pos'])
+        player.velocity = glm.vec3(*snapshot['velocity'])
+        player.angle, player.pitch = snapshot['angle'], snapshot['pitch']
+        player.on_ground = snapshot['on_ground']
+        session.movers.restore_snapshot(state.brushes, snapshot.get('movers', []))
+        if snapshot.get('riding') is not None:
+            player.riding = state.brushes[snapshot['riding']]
+        # Prime the triggers so those the player was already inside do not fire again.
+        session._sync_triggers()
+        session.triggers.update()
+        session.fired_once_triggers = {session.triggers.trigger_id(state.brushes[i]) for i in snapshot['fired_once_triggers']}
+        return session
+
+    def end(self):
+        """Leaves play mode: movers and monsters go back to where they were placed."""
+        self.movers.restore()
+        for monster, pos in self._monster_starts.values():
+            monster.pos = pos
+
+    def _brush_index(self, brush):
+        if brush is None:
+            return None
+        return next(i for i, b in enumerate(self.state.brushes) if b is brush)
+
+    def _trigger_indexes(self, trigger_ids):
+        brushes = self.triggers.trigger_brushes
+        indexes = {id(brush): i for i, brush in enumerate(self.state.brushes)}
+        return sorted(indexes[id(brushes[t])] for t in trigger_ids if t in brushes)
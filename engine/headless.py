@@ -0,0 +1,186 @@
+"""
+Headless rendering: drives Renderer.render_scene into an offscreen framebuffer
+with no window, for benchmarks, CI and batch map previews.
+
+On machines without a display Qt's 'offscreen' platform is used, and Mesa's
+llvmpipe provides a software GL 3.3 core context, so no GPU is needed.
+
+    python -m engine.headless maps/Office_Corridor.json preview.png --width 1280 --height 720
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import glm
+from PIL import Image
+
+if sys.platform.startswith('linux') and not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY')):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtGui import QGuiApplication, QOpenGLContext, QOffscreenSurface, QSurfaceFormat, QOpenGLFramebufferObject, QOpenGLFramebufferObjectFormat
+from engine.render_stats import gl
+from engine.renderer import Renderer
+from engine.camera import Camera
+from editor.editor_state import EditorState
+from editor.things import PlayerStart
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPRITE_TEXTURES = {'PlayerStart': 'player.png', 'Light': 'light.png', 'Monster': 'monster.png', 'Pickup': 'pickup.png', 'Speaker': 'speaker.png'}
+
+
+class HeadlessRenderer:
+    """
+    Owns an offscreen GL 3.3 core context, a framebuffer object and a Renderer.
+    render() draws one frame of an EditorState; read_pixels() and save_png()
+    fetch the result.
+    """
+
+    def __init__(self, width=1280, height=720, grid_size=16, world_size=1024):
+        self.width, self.height = width, height
+        # Qt needs an application object before any GL context can be created.
+        self.app = QGuiApplication.instance() or QGuiApplication(sys.argv[:1])
+
+        surface_format = QSurfaceFormat()
+        surface_format.setVersion(3, 3)
+        surface_format.setProfile(QSurfaceFormat.CoreProfile)
+        surface_format.setDepthBufferSize(24)
+        surface_format.setStencilBufferSize(8)
+
+        self.context = QOpenGLContext()
+        self.context.setFormat(surface_format)
+        if not self.context.create():
+            raise RuntimeError("Could not create an offscreen OpenGL 3.3 core context.")
+        self.surface = QOffscreenSurface()
+        self.surface.setFormat(self.context.format())
+        self.surface.create()
+        if not self.context.makeCurrent(self.surface):
+            raise RuntimeError("Could not make the offscreen OpenGL context current.")
+
+        fbo_format = QOpenGLFramebufferObjectFormat()
+        fbo_format.setAttachment(QOpenGLFramebufferObject.CombinedDepthStencil)
+        fbo_format.setInternalTextureFormat(gl.GL_RGBA8)
+        self.fbo = QOpenGLFramebufferObject(width, height, fbo_format)
+        self.fbo.bind()
+
+        gl.glClearColor(0.1, 0.1, 0.15, 1.0)
+        self.renderer = Renderer(lambda name, subfolder: self.renderer.load_texture(name, subfolder), grid_size, world_size)
+        if not hasattr(self.renderer, 'vaos'):
+            raise RuntimeError("Renderer failed to initialise (shader compilation error).")
+        self.renderer.set_sprite_textures({cls: self.renderer.load_texture(f, '') for cls, f in SPRITE_TEXTURES.items()})
+        self.start_time = time.perf_counter()
+
+    def render(self, state, camera, config=None, finish=False):
+        """
+        Renders state as seen from camera. config overrides the render settings
+        the 3D view would pass. finish=True blocks until the GPU is done, which
+        makes wall-clock timings include GPU work.
+        """
+        self.context.makeCurrent(self.surface)
+        self.fbo.bind()
+        gl.glViewport(0, 0, self.width, self.height)
+
+        render_config = {
+            "culling_enabled": False,
+            "brush_display_mode": "Textured",
+            "show_triggers_as_solid": False,
+            "show_caulk": True,
+            "play_mode": False,
+            "selected_object": None,
+            "time": time.perf_counter() - self.start_time,
+            "show_sprites_in_play_mode": False,
+        }
+        render_config.update(config or {})
+
+        projection = glm.perspective(glm.radians(camera.fov), self.width / self.height, 0.1, 10000.0)
+        self.renderer.render_scene(projection, camera.get_view_matrix(), camera.pos,
+                                   state.brushes, state.things, render_config.get('selected_object'), render_config)
+        if finish:
+            gl.glFinish()
+
+    def read_pixels(self):
+        """Returns the last frame as an (height, width, 4) uint8 RGBA array, top row first."""
+        self.context.makeCurrent(self.surface)
+        self.fbo.bind()
+        gl.glPixelStorei(gl.GL_PACK_ALIGNMENT, 1)
+        data = gl.glReadPixels(0, 0, self.width, self.height, gl.GL_RGBA, gl.GL_UNSIGNED_BYTE)
+        pixels = np.frombuffer(data, dtype=np.uint8).reshape(self.height, self.width, 4)
+        return np.flipud(pixels).copy()
+
+    def save_png(self, path):
+        Image.fromarray(self.read_pixels(), 'RGBA').save(path)
+
+    def cleanup(self):
+        self.context.makeCurrent(self.surface)
+        self.renderer.model_renderer.cleanup()
+        self.renderer.profiler.cleanup()
+        self.fbo.release()
+        self.fbo = None
+        self.context.doneCurrent()
+
+
+def load_state(map_path):
+    """Loads a level JSON file into a fresh EditorState."""
+    with open(map_path, 'r') as f:
+        level_data = json.load(f)
+    state = EditorState()
+    state.load_from_data(level_data)
+    return state
+
+
+def default_camera(state):
+    """Places a camera at the map's PlayerStart, or where the 3D view starts."""
+    camera = Camera()
+    camera.pos = glm.vec3(0, 150, 400)
+    player_start = next((t for t in state.things if isinstance(t, PlayerStart)), None)
+    if player_start:
+        camera.pos = glm.vec3(player_start.pos)
+        # Player angles face (sin a, cos a) in XZ; camera yaw faces (cos y, sin y).
+        camera.yaw = 90.0 - player_start.get_angle()
+    return camera
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a map to an image without opening a window.")
+    parser.add_argument('map', help="Level JSON file")
+    parser.add_argument('output', help="Output file (.png, or .npy for a raw RGBA array)")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--camera', type=float, nargs=3, metavar=('X', 'Y', 'Z'), help="Camera position (default: PlayerStart)")
+    parser.add_argument('--yaw', type=float)
+    parser.add_argument('--pitch', type=float, default=0.0)
+    parser.add_argument('--fov', type=float, default=90.0)
+    parser.add_argument('--mode', choices=['Textured', 'Lit', 'Wireframe'], default='Textured')
+    parser.add_argument('--frames', type=int, default=1, help="Render this many frames and report timings")
+    args = parser.parse_args()
+
+    map_path, output_path = os.path.abspath(args.map), os.path.abspath(args.output)
+    os.chdir(PROJECT_ROOT) # Asset and shader paths are relative to the project root
+
+    state = load_state(map_path)
+    camera = default_camera(state)
+    if args.camera: camera.pos = glm.vec3(*args.camera)
+    if args.yaw is not None: camera.yaw = args.yaw
+    camera.pitch, camera.fov = args.pitch, args.fov
+
+    headless = HeadlessRenderer(args.width, args.height)
+    frame_times = []
+    for _ in range(max(1, args.frames)):
+        start = time.perf_counter()
+        headless.render(state, camera, {"brush_display_mode": args.mode}, finish=True)
+        frame_times.append(time.perf_counter() - start)
+
+    if output_path.endswith('.npy'):
+        np.save(output_path, headless.read_pixels())
+    else:
+        headless.save_png(output_path)
+    print(f"Wrote {output_path} ({args.width}x{args.height})")
+    if args.frames > 1:
+        frame_ms = np.array(frame_times[1:] or frame_times) * 1000.0
+        print(f"Frame time: mean {frame_ms.mean():.2f} ms, median {np.median(frame_ms):.2f} ms, max {frame_ms.max():.2f} ms")
+    headless.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Entity logic graph: trigger -> target links compiled into a name-indexed
+dispatch table of typed actions.
+
+Firing a target name costs one dict lookup and running its precompiled
+actions. After edits, sync() diffs each object's name and logic flags
+against the last compile and recompiles only the names that changed.
+Action classes carry a `kind`, which is also the node type the visual
+scripting editor on the roadmap is meant to build on.
+"""
+from editor.things import Light, Speaker
+
+
+class MoverAction:
+    """Sends a move_once mover to its other end, or starts or stops a looping one."""
+    kind = 'mover'
+    __slots__ = ('brush',)
+
+    def __init__(self, brush):
+        self.brush = brush
+
+    def run(self, session):
+        session.movers.sync(session.state.brushes)
+        session.movers.toggle(self.brush)
+
+
+class LightToggleAction:
+    kind = 'light_toggle'
+    __slots__ = ('light',)
+
+    def __init__(self, light):
+        self.light = light
+
+    def run(self, session):
+        current_state = self.light.properties.get('state', 'on')
+        self.light.properties['state'] = 'off' if current_state == 'on' else 'on'
+
+
+class SpeakerToggleAction:
+    kind = 'speaker_toggle'
+    __slots__ = ('speaker',)
+
+    def __init__(self, speaker):
+        self.speaker = speaker
+
+    def run(self, session):
+        # Sound playback lives in the view; headless sessions have no callback.
+        if session.on_speaker_toggled:
+            session.on_speaker_toggled(self.speaker)
+
+
+def _signature(obj):
+    """The fields the graph depends on; positions and other properties are read live."""
+    if isinstance(obj, dict):
+        return (obj.get('name'), bool(obj.get('is_mover')), bool(obj.get('is_trigger')), obj.get('target'))
+    return (getattr(obj, 'name', None), type(obj))
+
+
+class LogicGraph:
+    def __init__(self):
+        self.by_name = {} # name -> object ids in scene order
+        self.actions = {} # name -> list of compiled actions
+        self.links = {} # trigger brush id -> (trigger brush, target name)
+        self._entries = {} # object id -> (object, signature, scene index)
+        self._brushes = None
+        self._things = None
+        self._counts = (0, 0)
+        self._dirty = True
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def sync(self, brushes, things):
+        """Brings the table up to date; cheap when nothing was marked dirty."""
+        counts = (len(brushes), len(things))
+        if not self._dirty and brushes is self._brushes and things is self._things and counts == self._counts:
+            return
+        if brushes is not self._brushes or things is not self._things:
+            self._entries.clear()
+            self.by_name.clear()
+            self.actions.clear()
+            self.links.clear()
+        self._brushes, self._things, self._counts = brushes, things, counts
+        self._dirty = False
+
+        changed_names = set()
+        seen = set()
+        for index, obj in enumerate(brushes + things):
+            key = id(obj)
+            seen.add(key)
+            signature = _signature(obj)
+            old = self._entries.get(key)
+            if old is not None and old[1] == signature:
+                if old[2] != index:
+                    self._entries[key] = (obj, signature, index)
+                continue
+            if old is not None:
+                self._unindex(key, old, changed_names)
+            self._entries[key] = (obj, signature, index)
+            self._index(key, obj, signature, changed_names)
+        for key in [k for k in self._entries if k not in seen]:
+            self._unindex(key, self._entries.pop(key), changed_names)
+
+        for name in changed_names:
+            self._compile(name)
+
+    def _index(self, key, obj, signature, changed_names):
+        name = signature[0]
+        if name:
+            self.by_name.setdefault(name, []).append(key)
+            changed_names.add(name)
+        if isinstance(obj, dict) and obj.get('is_trigger') and obj.get('target'):
+            self.links[key] = (obj, obj['target'])
+
+    def _unindex(self, key, entry, changed_names):
+        name = entry[1][0]
+        bucket = self.by_name.get(name)
+        if bucket and key in bucket:
+            bucket.remove(key)
+            if not bucket:
+                del self.by_name[name]
+            changed_names.add(name)
+        self.links.pop(key, None)
+
+    def _compile(self, name):
+        """Resolves a name to its first brush and first thing, as activation always has."""
+        keys = sorted(self.by_name.get(name, ()), key=lambda k: self._entries[k][2])
+        objects = [self._entries[k][0] for k in keys]
+        if not objects:
+            self.actions.pop(name, None)
+            return
+        actions = []
+        target_brush = next((o for o in objects if isinstance(o, dict)), None)
+        target_thing = next((o for o in objects if not isinstance(o, dict)), None)
+        if target_brush is not None and target_brush.get('is_mover'):
+            actions.append(MoverAction(target_brush))
+        if isinstance(target_thing, Light):
+            actions.append(LightToggleAction(target_thing))
+        elif isinstance(target_thing, Speaker):
+            actions.append(SpeakerToggleAction(target_thing))
+        self.actions[name] = actions
+
+    def targets(self, name):
+        """Objects named name, in scene order."""
+        keys = sorted(self.by_name.get(name, ()), key=lambda k: self._entries[k][2])
+        return [self._entries[k][0] for k in keys]
+
+    def fire(self, name, session):
+        """Runs the actions compiled for name. Returns False if nothing has that name."""
+        actions = self.actions.get(name)
+        if actions is None:
+            return False
+        for action in actions:
+            action.run(session)
+        return True
+
+    def connections(self):
+        """Yields (trigger brush, target object) for every trigger with a resolvable target."""
+        for trigger, name in self.links.values():
+            for key in self.by_name.get(name, ()):
+                yield trigger, self._entries[key][0]
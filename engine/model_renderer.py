@@ -0,0 +1,215 @@
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import glm
+from engine.render_stats import gl
+from editor.obj_loader import OBJ, OBJLoadError, load_mesh_data
+from editor.mesh_lod import lod_levels, select_lods
+
+# Imported meshes are normalized to a unit cube, so this bounds every mesh at scale 1.
+MESH_BOUNDING_RADIUS = 0.8660254
+# Projected size (fraction of viewport height) below which LOD1, LOD2 and LOD3 are used.
+LOD_SCREEN_FRACTIONS = (0.2, 0.08, 0.03)
+
+
+def resolve_model_path(model_path):
+    """Resolves a Model's model_path against the working dir and the assets folder."""
+    if not model_path: return None
+    if os.path.exists(model_path): return os.path.normpath(model_path)
+    asset_path = os.path.join('assets', model_path)
+    if os.path.exists(asset_path): return os.path.normpath(asset_path)
+    return None
+
+
+def build_instance_matrices(positions, rotations, scales):
+    """
+    Builds model matrices for N instances in one go.
+    positions, rotations (degrees, applied X then Y then Z) and scales are (N, 3)
+    arrays. Returns an (N, 4, 4) float32 array laid out column-major for GL.
+    """
+    positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+    rotations = np.radians(np.asarray(rotations, dtype=np.float32).reshape(-1, 3))
+    scales = np.asarray(scales, dtype=np.float32).reshape(-1, 3)
+
+    cx, cy, cz = np.cos(rotations).T
+    sx, sy, sz = np.sin(rotations).T
+
+    # R = Rz * Ry * Rx
+    rot = np.empty((len(positions), 3, 3), dtype=np.float32)
+    rot[:, 0, 0] = cy * cz
+    rot[:, 0, 1] = sx * sy * cz - cx * sz
+    rot[:, 0, 2] = cx * sy * cz + sx * sz
+    rot[:, 1, 0] = cy * sz
+    rot[:, 1, 1] = sx * sy * sz + cx * cz
+    rot[:, 1, 2] = cx * sy * sz - sx * cz
+    rot[:, 2, 0] = -sy
+    rot[:, 2, 1] = sx * cy
+    rot[:, 2, 2] = cx * cy
+
+    matrices = np.zeros((len(positions), 4, 4), dtype=np.float32)
+    matrices[:, :3, :3] = rot * scales[:, None, :]
+    matrices[:, :3, 3] = positions
+    matrices[:, 3, 3] = 1.0
+    # Row-major (N, 4, 4) -> column-major so each instance's columns are contiguous.
+    return np.ascontiguousarray(matrices.transpose(0, 2, 1))
+
+
+class ModelRenderer:
+    """
+    Draws Model things. Every model_path is loaded once into a VAO-backed mesh
+    that is shared by all Models using it, and all instances of a mesh are
+    drawn with a single instanced draw call.
+
+    Parsing happens on a worker thread so large OBJs never stall the GL
+    thread; a mesh is uploaded and drawn on the first frame after it is ready.
+    Each instance is drawn at the LOD matching its projected screen size.
+
+    Grouping, resolved paths and each mesh's instance matrices are kept
+    between frames and only rebuilt for meshes whose Models were added,
+    removed or reported through models_changed().
+    """
+
+    def __init__(self, shader):
+        self.shader = shader
+        self.meshes = {}  # resolved model path -> list of OBJ per LOD (finest first), or None if loading failed
+        self.import_progress = {}  # resolved model path -> (fraction, stage) while importing
+        self._pending = {}  # resolved model path -> Future of load_mesh_data()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mesh-import')
+        self._uploaded_instances = {}  # (resolved model path, lod) -> (batch version, instance indexes) last uploaded
+        self._resolved_paths = {}  # model_path -> resolved path or None, until a Model's properties change
+        self._model_paths = weakref.WeakKeyDictionary()  # Model -> resolved path it was last grouped under
+        self._groups = None  # resolved model path -> Models, for the models list in _grouped
+        self._grouped = []
+        self._batches = {}  # resolved model path -> (Models, positions, scales, matrices, version)
+        self._stale_paths = set()  # Resolved paths whose batches hold a changed Model
+        self._batch_version = 0
+        self._instance_lods = weakref.WeakKeyDictionary()  # Model -> LOD it was last drawn at
+
+    def _set_progress(self, path, fraction, stage):
+        self.import_progress[path] = (fraction, stage)
+
+    def _resolve(self, model_path):
+        if model_path not in self._resolved_paths:
+            self._resolved_paths[model_path] = resolve_model_path(model_path)
+        return self._resolved_paths[model_path]
+
+    def models_changed(self, models):
+        """Call with Models whose position or properties changed; their meshes' instances are rebuilt."""
+        for model in models:
+            self._stale_paths.add(self._model_paths.get(model))
+        self._resolved_paths.clear() # A model_path may now point at a file that has since appeared
+        self._groups = None
+
+    def get_mesh(self, model_path):
+        """Returns the uploaded LOD meshes, or None while importing or if loading failed."""
+        path = self._resolve(model_path)
+        if path is None: return None
+        if path in self.meshes:
+            return self.meshes[path]
+
+        future = self._pending.get(path)
+        if future is None:
+            self.import_progress[path] = (0.0, "Queued")
+            self._pending[path] = self._executor.submit(
+                load_mesh_data, path, lambda fraction, stage, p=path: self._set_progress(p, fraction, stage))
+            return None
+        if not future.done():
+            return None
+
+        del self._pending[path]
+        self.import_progress.pop(path, None)
+        try:
+            levels = [OBJ(mesh_data=level) for level in lod_levels(future.result())]
+        except OBJLoadError as e:
+            print(f"Model Error: {e}")
+            levels = None
+        if levels and all(level.is_loaded for level in levels):
+            for level in levels:
+                level.upload()
+        else:
+            levels = None
+        self.meshes[path] = levels
+        return levels
+
+    def select_instance_lods(self, instances, positions, scales, camera_pos, projection, level_count):
+        """Picks an LOD index for each instance from its projected size on screen."""
+        if level_count <= 1:
+            return np.zeros(len(instances), dtype=np.int64)
+        radius = MESH_BOUNDING_RADIUS * np.abs(scales).max(axis=1)
+        distance = np.maximum(np.linalg.norm(positions - np.array(list(camera_pos), dtype=np.float32), axis=1), 1e-3)
+        # projection[1][1] is cot(fov / 2), which turns radius / distance into a
+        # fraction of the viewport height.
+        fractions = radius * projection[1][1] / distance
+        current = np.array([self._instance_lods.get(m, -1) for m in instances])
+        lods = np.minimum(select_lods(fractions, current, LOD_SCREEN_FRACTIONS), level_count - 1)
+        for model, lod in zip(instances, lods):
+            self._instance_lods[model] = int(lod)
+        return lods
+
+    def group_by_mesh(self, models):
+        """Groups Model things by resolved model path, reusing the last grouping while the models are the same."""
+        if self._groups is not None and self._grouped == models:
+            return self._groups
+        groups = {}
+        for model in models:
+            path = self._resolve(model.properties.get('model_path', ''))
+            self._model_paths[model] = path
+            if path is None: continue
+            groups.setdefault(path, []).append(model)
+        self._groups, self._grouped = groups, list(models)
+        return groups
+
+    def _instance_batch(self, path, instances):
+        """(positions, scales, matrices, version) of a mesh's instances, rebuilt only when they changed."""
+        batch = self._batches.get(path)
+        if batch is None or path in self._stale_paths or batch[0] != instances:
+            positions = np.array([m.pos for m in instances], dtype=np.float32).reshape(-1, 3)
+            scales = np.array([m.properties.get('scale', [1, 1, 1]) for m in instances], dtype=np.float32).reshape(-1, 3)
+            rotations = [m.properties.get('rotation', [0, 0, 0]) for m in instances]
+            self._batch_version += 1
+            batch = (instances, positions, scales, build_instance_matrices(positions, rotations, scales), self._batch_version)
+            self._batches[path] = batch
+            self._stale_paths.discard(path)
+        return batch[1:]
+
+    def draw(self, projection, view, camera_pos, models, set_light_uniforms, lights):
+        if not models: return
+        groups = self.group_by_mesh(models)
+        if not groups: return
+
+        shader = self.shader
+        gl.glUseProgram(shader)
+        set_light_uniforms(shader, lights)
+        gl.glUniformMatrix4fv(gl.glGetUniformLocation(shader, "projection"), 1, gl.GL_FALSE, glm.value_ptr(projection))
+        gl.glUniformMatrix4fv(gl.glGetUniformLocation(shader, "view"), 1, gl.GL_FALSE, glm.value_ptr(view))
+        gl.glUniform3fv(gl.glGetUniformLocation(shader, "object_color"), 1, [0.8, 0.8, 0.8])
+        gl.glUniform1f(gl.glGetUniformLocation(shader, "alpha"), 1.0)
+
+        for path, instances in groups.items():
+            levels = self.get_mesh(path)
+            if levels is None: continue
+            positions, scales, matrices, version = self._instance_batch(path, instances)
+            lods = self.select_instance_lods(instances, positions, scales, camera_pos, projection, len(levels))
+
+            for lod in np.unique(lods):
+                selected = np.flatnonzero(lods == lod)
+                # Static props keep their transforms between frames, so skip the re-upload.
+                uploaded = self._uploaded_instances.get((path, lod))
+                if uploaded is None or uploaded[0] != version or not np.array_equal(uploaded[1], selected):
+                    levels[lod].set_instances(np.ascontiguousarray(matrices[selected]))
+                    self._uploaded_instances[(path, lod)] = (version, selected)
+                levels[lod].render(len(selected))
+
+    def cleanup(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._pending.clear()
+        self.import_progress.clear()
+        for levels in self.meshes.values():
+            for level in levels or []:
+                level.cleanup()
+        self.meshes.clear()
+        self._uploaded_instances.clear()
+        self._resolved_paths.clear()
+        self._batches.clear()
+        self._groups = None
@@ -0,0 +1,156 @@
+"""
+Mover kinematics for play mode.
+
+Every mover brush is a row in a set of numpy arrays (origin, unit direction,
+travel distance, speed, phase), and tick() advances all of them at once.
+Looping movers (start_on) ping-pong between their endpoints while active;
+move_once movers glide toward whichever end a trigger last sent them to.
+
+Movers are kept out of the static collision structures. The player sweeps
+against bounds() on top of the static brushes, and only rows that actually
+moved are written back to their brush dicts, so a moving platform never
+forces the broadphase or the collision tilemap to rebuild.
+"""
+import numpy as np
+from .physics import is_solid_brush
+
+
+class MoverSystem:
+    def __init__(self):
+        self.brushes = []
+        self._rows = {} # id(brush) -> row
+        self.origin = np.empty((0, 3))
+        self.direction = np.empty((0, 3))
+        self.half = np.empty((0, 3))
+        self.distance = np.empty(0)
+        self.speed = np.empty(0)
+        self.phase = np.empty(0) # Distance travelled; looping movers run 0..2*distance
+        self.goal = np.empty(0) # move_once target offset, 0 or distance
+        self.active = np.empty(0, dtype=bool)
+        self.once = np.empty(0, dtype=bool)
+        self.solid = np.empty(0, dtype=bool)
+        self.offset = np.empty(0)
+        self.position = np.empty((0, 3))
+        self.displacement = np.empty((0, 3)) # Movement during the last tick
+        self._source = None
+        self._source_len = 0
+        self._dirty = True
+
+    def __len__(self):
+        return len(self.brushes)
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def sync(self, brushes):
+        """Re-reads the mover brushes after edits, keeping the state of movers that already had a row."""
+        if not self._dirty and brushes is self._source and len(brushes) == self._source_len:
+            return
+        movers = [b for b in brushes if b.get('is_mover')]
+        old_rows, old = self._rows, self._columns()
+        count = len(movers)
+        self.origin, self.direction, self.half = np.zeros((count, 3)), np.zeros((count, 3)), np.zeros((count, 3))
+        self.distance, self.speed, self.phase, self.goal = np.zeros(count), np.zeros(count), np.zeros(count), np.zeros(count)
+        self.active, self.once, self.solid = np.zeros(count, dtype=bool), np.zeros(count, dtype=bool), np.zeros(count, dtype=bool)
+
+        for row, brush in enumerate(movers):
+            direction = np.array(brush.get('direction', [0, 1, 0]), dtype=np.float64)
+            length = np.linalg.norm(direction)
+            self.direction[row] = direction / length if length > 0 else 0.0
+            self.distance[row] = max(brush.get('distance', 128), 0)
+            self.speed[row] = brush.get('speed', 32)
+            self.half[row] = np.array(brush['size'], dtype=np.float64) / 2.0
+            self.once[row] = brush.get('move_once', False)
+            self.solid[row] = is_solid_brush(brush)
+            previous = old_rows.get(id(brush))
+            if previous is not None:
+                for name, column in old.items():
+                    getattr(self, name)[row] = column[previous]
+            elif 'original_pos' in brush:
+                # Levels saved after an older build teleported a move_once mover
+                self.origin[row] = brush['original_pos']
+                at_start = list(brush['pos']) == list(brush['original_pos'])
+                self.phase[row] = self.goal[row] = 0.0 if at_start else self.distance[row]
+            else:
+                self.origin[row] = brush['pos']
+                self.active[row] = brush.get('start_on', False)
+
+        self.brushes = movers
+        self._rows = {id(b): row for row, b in enumerate(movers)}
+        self.offset = self._offsets()
+        self.position = self.origin + self.direction * self.offset[:, None]
+        self.displacement = np.zeros((count, 3))
+        self._source, self._source_len = brushes, len(brushes)
+        self._dirty = False
+
+    def _columns(self):
+        return {'origin': self.origin, 'phase': self.phase, 'goal': self.goal, 'active': self.active}
+
+    def _offsets(self):
+        # Looping movers fold their phase into a triangle wave over [0, distance].
+        looping = np.abs(self.distance - np.abs(self.distance - self.phase))
+        return np.where(self.once, self.phase, looping)
+
+    def row(self, brush):
+        return self._rows.get(id(brush))
+
+    def toggle(self, brush):
+        """Trigger response: move_once movers head for the other end, looping movers start or stop."""
+        row = self.row(brush)
+        if row is None:
+            return
+        if self.once[row]:
+            self.goal[row] = self.distance[row] - self.goal[row]
+        else:
+            self.active[row] = not self.active[row]
+
+    def tick(self, delta):
+        """Advances every mover by delta seconds. Returns the brushes that moved."""
+        if not len(self.brushes):
+            return []
+        step = np.where(self.speed > 0, self.speed * delta, np.inf)
+        looping = self.active & ~self.once & (self.distance > 0) & (self.speed > 0)
+        period = np.where(looping, 2.0 * self.distance, 1.0)
+        self.phase = np.where(looping, np.mod(self.phase + step, period), self.phase)
+        self.phase = np.where(self.once, self.phase + np.clip(self.goal - self.phase, -step, step), self.phase)
+
+        self.offset = self._offsets()
+        position = self.origin + self.direction * self.offset[:, None]
+        self.displacement = position - self.position
+        self.position = position
+
+        moved = np.flatnonzero(np.any(self.displacement != 0.0, axis=1))
+        for row in moved:
+            self.brushes[row]['pos'] = self.position[row].tolist()
+        return [self.brushes[row] for row in moved]
+
+    def bounds(self):
+        """(mins, maxs) of the solid movers, and the row each bound belongs to."""
+        rows = np.flatnonzero(self.solid)
+        position, half = self.position[rows], self.half[rows]
+        return position - half, position + half, rows
+
+    def displacement_of(self, brush):
+        row = self.row(brush)
+        return self.displacement[row] if row is not None else np.zeros(3)
+
+    def restore(self):
+        """Puts every mover back where it was placed, for leaving play mode."""
+        for row, brush in enumerate(self.brushes):
+            brush['pos'] = self.origin[row].tolist()
+
+    def snapshot(self, brushes):
+        """Mover state as [brush index, origin, phase, goal, active] rows, for InputRecorder."""
+        indexes = {id(b): i for i, b in enumerate(brushes)}
+        return [[indexes[id(b)], self.origin[row].tolist(), float(self.phase[row]), float(self.goal[row]), bool(self.active[row])]
+                for row, b in enumerate(self.brushes)]
+
+    def restore_snapshot(self, brushes, snapshot):
+        for index, origin, phase, goal, active in snapshot:
+            row = self.row(brushes[index])
+            if row is None:
+                continue
+            self.origin[row], self.phase[row], self.goal[row], self.active[row] = origin, phase, goal, active
+        self.offset = self._offsets()
+        self.position = self.origin + self.direction * self.offset[:, None]
+        self.displacement = np.zeros_like(self.position)
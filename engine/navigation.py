@@ -0,0 +1,143 @@
+"""
+Flow-field navigation shared by every Monster.
+
+The walkable grid is a CollisionTileMap's FLOOR_TILE cells. When the player
+enters a new cell (or the tiles change), a breadth-first search from that
+cell fills in the step distance of every reachable cell, one whole frontier
+per numpy operation. The flow at each cell points at its neighbour with the
+lowest distance, bent a little along the distance gradient so paths round
+corners smoothly; the gradient alone vanishes at saddles (e.g. a wall
+straight ahead), where monsters would stop. Monsters then steer by reading the flow under them, so any number
+of them costs one field update plus an array lookup each.
+"""
+import numpy as np
+from .constants import WALL_TILE, FLOW_SMOOTHING
+
+UNREACHABLE = -1
+
+
+class FlowField:
+    def __init__(self, tile_map):
+        self.tile_map = tile_map
+        self.distance = None # (depth, width) int32 steps to the goal, UNREACHABLE if none
+        self.flow = None # (depth, width, 2) unit (dx, dz) steering vectors
+        self.goal = None # (row, col) of the goal cell
+        self._version = None
+
+    def update(self, x, z):
+        """Recomputes the field towards world (x, z) if its cell or the tiles changed. Returns True if it did."""
+        goal = self.tile_map.cell(x, z)
+        if goal == self.goal and self._version == self.tile_map.version:
+            return False
+        self.goal, self._version = goal, self.tile_map.version
+        self.distance = self._search(goal)
+        self.flow = self._flow(self.distance)
+        return True
+
+    def _search(self, goal):
+        tiles = self.tile_map.tiles
+        depth, width = tiles.shape
+        walkable = (tiles != WALL_TILE).ravel()
+        distance = np.full(depth * width, UNREACHABLE, dtype=np.int32)
+        row, col = goal
+        if not (0 <= row < depth and 0 <= col < width) or not walkable[row * width + col]:
+            return distance.reshape(depth, width)
+
+        frontier = np.array([row * width + col])
+        distance[frontier] = 0
+        steps = 0
+        while len(frontier):
+            steps += 1
+            rows, cols = np.divmod(frontier, width)
+            neighbours = np.concatenate((
+                frontier[rows > 0] - width, frontier[rows < depth - 1] + width,
+                frontier[cols > 0] - 1, frontier[cols < width - 1] + 1))
+            neighbours = neighbours[walkable[neighbours] & (distance[neighbours] == UNREACHABLE)]
+            frontier = np.unique(neighbours)
+            distance[frontier] = steps
+        return distance.reshape(depth, width)
+
+    # Neighbour offsets (drow, dcol) in tie-break order, and the (dx, dz) step to each.
+    NEIGHBOURS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+
+    @classmethod
+    def _flow(cls, distance):
+        """Unit steering vectors towards the lowest neighbour, smoothed by the gradient; zero at the goal and where unreachable."""
+        reachable = distance != UNREACHABLE
+        depth, width = distance.shape
+        padded = np.pad(np.where(reachable, distance, np.iinfo(np.int32).max), 1,
+                        constant_values=np.iinfo(np.int32).max)
+        candidates = np.stack([padded[1 + dr:1 + dr + depth, 1 + dc:1 + dc + width] for dr, dc in cls.NEIGHBOURS])
+        # argmin keeps the first of equal neighbours, so ties always break the same way.
+        best = np.argmin(candidates, axis=0)
+        steps = np.array([(dc, dr) for dr, dc in cls.NEIGHBOURS], dtype=np.float32)
+        flow = steps[best] + FLOW_SMOOTHING * cls._gradient(distance)
+        # The downhill step has length 1 and the gradient at most FLOW_SMOOTHING, so this is never zero.
+        flow /= np.linalg.norm(flow, axis=-1, keepdims=True)
+        flow[~reachable | (distance == 0)] = 0.0
+        return flow.astype(np.float32)
+
+    @staticmethod
+    def _gradient(distance):
+        """Steering vectors pointing down the distance field, zero at the goal, at saddles and where unreachable."""
+        reachable = distance != UNREACHABLE
+        # Walls and unreachable cells count as one step further out, so the flow leans away from them.
+        padded = np.pad(np.where(reachable, distance, 0).astype(np.float32), 1, mode='edge')
+        padded_ok = np.pad(reachable, 1, constant_values=False)
+        centre = padded[1:-1, 1:-1]
+
+        def neighbour(rows, cols):
+            value, ok = padded[rows, cols], padded_ok[rows, cols]
+            return np.where(ok, value, centre + 1.0)
+
+        dx = neighbour(slice(1, -1), slice(2, None)) - neighbour(slice(1, -1), slice(0, -2))
+        dz = neighbour(slice(2, None), slice(1, -1)) - neighbour(slice(0, -2), slice(1, -1))
+        flow = -np.stack((dx, dz), axis=-1)
+        length = np.linalg.norm(flow, axis=-1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            flow = np.where(length > 0, flow / length, 0.0)
+        flow[~reachable | (distance == 0)] = 0.0
+        return flow.astype(np.float32)
+
+    def sample(self, positions):
+        """Steering vectors for (M, 2) world XZ positions; zero outside the grid or out of reach."""
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        directions = np.zeros((len(positions), 2), dtype=np.float32)
+        if self.flow is None:
+            return directions
+        rows, cols, inside = self._cells(positions)
+        directions[inside] = self.flow[rows[inside], cols[inside]]
+        return directions
+
+    def _cells(self, positions):
+        tile_map = self.tile_map
+        cols = np.floor(positions[:, 0] / tile_map.tile_size).astype(np.int64) - tile_map.origin_x
+        rows = np.floor(positions[:, 1] / tile_map.tile_size).astype(np.int64) - tile_map.origin_z
+        depth, width = tile_map.tiles.shape
+        inside = (rows >= 0) & (rows < depth) & (cols >= 0) & (cols < width)
+        return rows, cols, inside
+
+    def walkable(self, positions):
+        rows, cols, inside = self._cells(np.asarray(positions, dtype=np.float64).reshape(-1, 2))
+        result = np.zeros(len(rows), dtype=bool)
+        result[inside] = self.tile_map.tiles[rows[inside], cols[inside]] != WALL_TILE
+        return result
+
+    def steer(self, store, slots, delta):
+        """Moves the monsters in the entity store slots along the field for delta seconds. Returns the slots that moved."""
+        if not len(slots) or self.flow is None:
+            return slots[:0]
+        positions = store.pos[slots]
+        speeds = store.speed[slots].astype(np.float64)
+        xz = positions[:, [0, 2]]
+        step = self.sample(xz) * (speeds * delta)[:, None]
+        # Each axis is tried on its own so monsters slide along walls instead of sticking.
+        for axis in (0, 1):
+            moved = xz.copy()
+            moved[:, axis] += step[:, axis]
+            ok = self.walkable(moved)
+            xz[ok, axis] = moved[ok, axis]
+        changed = np.any(xz != positions[:, [0, 2]], axis=1)
+        positions[:, [0, 2]] = xz
+        store.write_rows('pos', slots[changed], positions[changed])
+        return slots[changed]
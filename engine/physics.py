@@ -0,0 +1,157 @@
+# engine/physics.py
+"""
+Continuous collision for axis-aligned boxes against brushes.
+
+Brushes are passed in as (N, 3) numpy arrays of AABB minimum and maximum
+corners. The moving box is swept through them in one vectorized slab test, so
+it never tunnels through a thin brush however large the step. move_and_slide()
+resolves a whole move: it slides along contact planes, reports ground and
+ceiling contacts, and steps up ledges no taller than STEP_HEIGHT.
+"""
+import numpy as np
+from editor.brush_store import Brush
+from .constants import STEP_HEIGHT, COLLISION_SKIN, SLIDE_ITERATIONS
+
+
+def is_solid_brush(brush):
+    """True for brushes that block movement: not triggers, fog volumes, subtractions or non-solid movers."""
+    if brush.get('is_trigger') or brush.get('is_fog') or brush.get('operation') == 'subtract':
+        return False
+    return not brush.get('is_mover') or brush.get('solid', True)
+
+
+def brush_aabbs(brushes):
+    """Returns (mins, maxs) as (N, 3) float arrays for a list of brush dicts."""
+    if not brushes:
+        empty = np.empty((0, 3))
+        return empty, empty
+    if isinstance(brushes[0], Brush):
+        # Gather straight from the brush store's columns.
+        return Brush.store.bounds(Brush.store.slots(brushes, cache=False))
+    pos = np.array([b['pos'] for b in brushes], dtype=np.float64)
+    half = np.array([b['size'] for b in brushes], dtype=np.float64) / 2.0
+    return pos - half, pos + half
+
+
+def sweep_aabb(center, half_extents, displacement, mins, maxs):
+    """
+    Sweeps a box (center, half_extents) by displacement against every AABB.
+    Returns (time of impact in [0, 1], contact normal, index of the box hit),
+    or (1.0, None, -1) when the move is clear. Boxes the mover already
+    overlaps are ignored here; depenetrate() deals with those.
+    """
+    if len(mins) == 0:
+        return 1.0, None, -1
+    # Expanding each brush by the mover's half extents reduces the test to a ray.
+    lo = mins - half_extents
+    hi = maxs + half_extents
+    moving = displacement != 0.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv = np.where(moving, 1.0 / np.where(moving, displacement, 1.0), 0.0)
+        t1 = (lo - center) * inv
+        t2 = (hi - center) * inv
+    t_near = np.minimum(t1, t2)
+    t_far = np.maximum(t1, t2)
+    # On axes with no motion the slab either always or never contains the ray.
+    inside = (lo < center) & (center < hi)
+    t_near = np.where(moving, t_near, np.where(inside, -np.inf, np.inf))
+    t_far = np.where(moving, t_far, np.where(inside, np.inf, -np.inf))
+
+    t_enter = t_near.max(axis=1)
+    t_exit = t_far.min(axis=1)
+    hits = (t_enter < t_exit) & (t_enter >= 0.0) & (t_enter <= 1.0)
+    if not hits.any():
+        return 1.0, None, -1
+    candidates = np.flatnonzero(hits)
+    index = int(candidates[np.argmin(t_enter[candidates])])
+    axis = int(np.argmax(t_near[index]))
+    normal = np.zeros(3)
+    normal[axis] = -np.sign(displacement[axis])
+    return float(t_enter[index]), normal, index
+
+
+def depenetrate(center, half_extents, mins, maxs):
+    """
+    Pushes center out of any box it overlaps along the axis of least
+    penetration. Returns (center, pushed_up) where pushed_up means the box
+    was lifted onto something, i.e. is standing on it.
+    """
+    lo = mins - half_extents
+    hi = maxs + half_extents
+    pushed_up = False
+    for index in np.flatnonzero(np.all((lo < center) & (center < hi), axis=1)):
+        # Re-test, an earlier push may already have cleared this box.
+        if not np.all((lo[index] < center) & (center < hi[index])):
+            continue
+        below, above = center - lo[index], hi[index] - center
+        depths = np.minimum(below, above)
+        axis = int(np.argmin(depths))
+        if above[axis] <= below[axis]:
+            center[axis] = hi[index][axis] + COLLISION_SKIN
+            pushed_up = pushed_up or axis == 1
+        else:
+            center[axis] = lo[index][axis] - COLLISION_SKIN
+    return center, pushed_up
+
+
+def _clear_above(center, half_extents, height, mins, maxs):
+    toi, _, _ = sweep_aabb(center, half_extents, np.array([0.0, height, 0.0]), mins, maxs)
+    return toi >= 1.0
+
+
+def move_and_slide(center, half_extents, velocity, delta, mins, maxs, grounded=False, step_height=STEP_HEIGHT, iterations=SLIDE_ITERATIONS):
+    """
+    Moves a box by velocity * delta through the AABBs (mins, maxs).
+
+    Each hit stops the box a skin width short of the contact plane. The rest
+    of the move is projected onto that plane and swept again, up to
+    `iterations` times. A wall hit while grounded (standing on something at
+    the start of the move) whose top is within step_height of the feet lifts
+    the box onto it instead.
+
+    Returns (center, velocity, contacts). contacts is a dict with on_ground,
+    hit_ceiling, stepped and ground_index, the index of the box stood on or -1.
+    """
+    center = np.array(center, dtype=np.float64)
+    velocity = np.array(velocity, dtype=np.float64)
+    half_extents = np.asarray(half_extents, dtype=np.float64)
+    contacts = {'on_ground': False, 'hit_ceiling': False, 'stepped': False, 'ground_index': -1}
+
+    center, pushed_up = depenetrate(center, half_extents, mins, maxs)
+    contacts['on_ground'] = pushed_up
+    grounded = grounded or pushed_up
+    remaining = velocity * delta
+
+    for _ in range(iterations):
+        if not remaining.any():
+            break
+        toi, normal, index = sweep_aabb(center, half_extents, remaining, mins, maxs)
+        if index < 0:
+            center += remaining
+            break
+
+        center += remaining * toi
+        axis = int(np.argmax(np.abs(normal)))
+        side = maxs if normal[axis] > 0 else mins
+        center[axis] = side[index][axis] + normal[axis] * (half_extents[axis] + COLLISION_SKIN)
+        remaining = remaining * (1.0 - toi)
+
+        if axis != 1 and grounded:
+            rise = maxs[index][1] - (center[1] - half_extents[1]) + COLLISION_SKIN
+            if 0.0 < rise <= step_height and _clear_above(center, half_extents, rise, mins, maxs):
+                center[1] += rise
+                contacts['stepped'] = True
+                continue
+
+        if normal[1] > 0:
+            contacts['on_ground'] = True
+            contacts['ground_index'] = index
+        elif normal[1] < 0:
+            contacts['hit_ceiling'] = True
+        # Slide: drop the part of the move and the velocity that points into the plane.
+        remaining -= normal * np.dot(remaining, normal)
+        into = np.dot(velocity, normal)
+        if into < 0.0:
+            velocity -= normal * into
+
+    return center, velocity, contacts
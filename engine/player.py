@@ -1,10 +1,10 @@
 # engine/player.py
-import pygame
 import math
 import glm
 import numpy as np
 
 from PyQt5.QtCore import Qt
+from . import physics
 from .constants import TILE_SIZE, WALL_TILE, GRAVITY, JUMP_STRENGTH, TERMINAL_VELOCITY
 
 class Player:
@@ -17,6 +17,10 @@ class Player:
         self.width, self.height, self.depth = TILE_SIZE, TILE_SIZE * 2, TILE_SIZE
         self.on_ground = False
         self.physics_enabled = physics_enabled
+        self.broadphase = None # Optional BrushSpatialHash; without one every brush is tested
+        self.tile_map = None # Optional CollisionTileMap, replaces brush collision when set
+        self.movers = None # Optional MoverSystem; its movers are swept on top of the static brushes
+        self.riding = None # Mover brush stood on at the end of the last update
 
     def update_angle(self, dx, dy):
         self.angle = (self.angle - dx * self.mouse_sensitivity) % (2 * math.pi)
@@ -54,46 +58,58 @@ class Player:
             self.velocity.z = move_dir.z * speed
 
             new_pos = self.pos + self.velocity * delta
-            self.handle_collision(new_pos, brushes)
+            self.handle_collision(new_pos, brushes, delta)
         else:
             self.pos += move_dir * speed * delta
 
 
-    def handle_collision(self, new_pos, brushes):
-        self.on_ground = False
-        player_rect = pygame.Rect(new_pos.x - self.width / 2, new_pos.z - self.depth / 2, self.width, self.depth)
-
-        mover_velocity = glm.vec3(0,0,0)
-
-        for brush in brushes:
-            if brush.get('is_trigger'):
-                continue
-
-            brush_rect = pygame.Rect(
-                brush['pos'][0] - brush['size'][0] / 2,
-                brush['pos'][2] - brush['size'][2] / 2,
-                brush['size'][0],
-                brush['size'][2]
-            )
-
-            if player_rect.colliderect(brush_rect):
-                brush_top = brush['pos'][1] + brush['size'][1] / 2
-                player_bottom = new_pos.y - self.height / 2
-
-                if self.velocity.y <= 0 and player_bottom < brush_top and self.pos.y - self.height / 2 >= brush_top - 1.0:
-                    new_pos.y = brush_top + self.height / 2
-                    self.velocity.y = 0
-                    self.on_ground = True
-                    
-                    if brush.get('is_mover') and brush.get('solid', True):
-                        direction = np.array(brush.get('direction', [0,1,0]))
-                        speed = brush.get('speed', 32)
-                        if np.linalg.norm(direction) > 0:
-                            mover_velocity = glm.vec3(*(direction / np.linalg.norm(direction) * speed))
-
-
-        self.pos = new_pos + mover_velocity * (1/60)
-
+    def handle_collision(self, new_pos, brushes, delta):
+        """Moves towards new_pos with swept collision against the solid brushes, sliding along walls."""
+        if self.tile_map is not None:
+            self.handle_tile_collision(new_pos)
+            return
+        if self.riding is not None and self.movers is not None:
+            # Riders are carried by their mover's last step before sweeping their own move.
+            carry = glm.vec3(*self.movers.displacement_of(self.riding))
+            self.pos += carry
+            new_pos += carry
+        if self.broadphase is not None:
+            # Sliding and stepping never leave the XZ box swept from the old to the new position.
+            brushes = self.broadphase.query(
+                min(self.pos.x, new_pos.x) - self.width / 2 - 1, min(self.pos.z, new_pos.z) - self.depth / 2 - 1,
+                max(self.pos.x, new_pos.x) + self.width / 2 + 1, max(self.pos.z, new_pos.z) + self.depth / 2 + 1)
+        solid = [brush for brush in brushes if physics.is_solid_brush(brush)]
+        mins, maxs = physics.brush_aabbs(solid)
+        mover_rows = np.empty(0, dtype=np.int64)
+        if self.movers is not None and len(self.movers):
+            mover_mins, mover_maxs, mover_rows = self.movers.bounds()
+            mins, maxs = np.concatenate((mins, mover_mins)), np.concatenate((maxs, mover_maxs))
+
+        half_extents = (self.width / 2, self.height / 2, self.depth / 2)
+        center, velocity, contacts = physics.move_and_slide(
+            self.pos, half_extents, self.velocity, delta, mins, maxs, grounded=self.on_ground)
+
+        self.on_ground = contacts['on_ground']
+        self.velocity = glm.vec3(*velocity)
+        if self.on_ground and self.velocity.y < 0:
+            self.velocity.y = 0
+
+        ground = contacts['ground_index'] - len(solid)
+        self.riding = self.movers.brushes[mover_rows[ground]] if ground >= 0 else None
+        self.pos = glm.vec3(*center)
+
+
+    def handle_tile_collision(self, new_pos):
+        """Tilemap collision: walls from the tilemap's cells, a flat floor at its floor_y."""
+        x, z = self.tile_map.move_box(self.pos.x, self.pos.z, self.width / 2, self.depth / 2,
+                                      new_pos.x - self.pos.x, new_pos.z - self.pos.z)
+        y = new_pos.y
+        floor_center = self.tile_map.floor_y + self.height / 2
+        self.on_ground = y <= floor_center
+        if self.on_ground:
+            y = floor_center
+            self.velocity.y = max(self.velocity.y, 0)
+        self.pos = glm.vec3(x, y, z)
 
     def get_position(self):
         return self.pos
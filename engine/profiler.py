@@ -0,0 +1,168 @@
+import json
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+import OpenGL.GL as gl
+
+# Number of frames kept in the ring buffer.
+PROFILER_HISTORY_FRAMES = 300
+# GPU timer queries are read back this many frames after they were issued so
+# the CPU never stalls waiting for the GPU to catch up.
+GPU_QUERY_LATENCY = 3
+
+
+class FrameProfiler:
+    """
+    Records CPU and GPU time for named sections of each frame.
+
+    CPU time comes from perf_counter_ns. GPU time comes from GL_TIME_ELAPSED
+    queries, which cannot nest, so only the outermost GPU-timed section open at
+    any moment gets a query. Does nothing unless enabled.
+    """
+
+    def __init__(self, history=PROFILER_HISTORY_FRAMES):
+        self.enabled = False
+        self.frames = deque(maxlen=history)
+        self.gpu_supported = True
+        self._frame = None
+        self._frame_index = 0
+        self._depth = 0
+        self._gpu_query_open = False
+        self._frame_queries = []  # (section record, query id) issued this frame
+        self._in_flight = deque()  # (frame record, [(section record, query id)])
+        self._free_queries = []
+
+    def begin_frame(self):
+        """Starts a new frame record, closing the previous one if still open."""
+        if self._frame is not None:
+            self.end_frame()
+        self._frame = {'index': self._frame_index, 'start_ns': time.perf_counter_ns(), 'cpu_ns': 0, 'gpu_pending': 0, 'sections': []}
+        self._frame_index += 1
+        return self._frame
+
+    def end_frame(self):
+        frame = self._frame
+        if frame is None: return
+        frame['cpu_ns'] = time.perf_counter_ns() - frame['start_ns']
+        self.frames.append(frame)
+        if self._frame_queries:
+            frame['gpu_pending'] = len(self._frame_queries)
+            self._in_flight.append((frame, self._frame_queries))
+            self._frame_queries = []
+        self._frame = None
+
+    def section(self, name, gpu=False):
+        """
+        Context manager timing a block of the current frame. Pass gpu=True for
+        blocks that issue GL commands; this needs a current GL context.
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._section(name, gpu)
+
+    @contextmanager
+    def _section(self, name, gpu):
+        frame = self._frame if self._frame is not None else self.begin_frame()
+        record = {'name': name, 'depth': self._depth, 'start_ns': time.perf_counter_ns(), 'cpu_ns': 0, 'gpu_ns': None}
+        frame['sections'].append(record)
+        query = self._begin_gpu_query() if gpu and not self._gpu_query_open else None
+        self._depth += 1
+        try:
+            yield record
+        finally:
+            self._depth -= 1
+            if query is not None:
+                gl.glEndQuery(gl.GL_TIME_ELAPSED)
+                self._gpu_query_open = False
+                self._frame_queries.append((record, query))
+            record['cpu_ns'] = time.perf_counter_ns() - record['start_ns']
+
+    def _begin_gpu_query(self):
+        if not self.gpu_supported: return None
+        try:
+            query = self._free_queries.pop() if self._free_queries else gl.glGenQueries(1)
+            gl.glBeginQuery(gl.GL_TIME_ELAPSED, query)
+        except Exception as e:
+            print(f"Profiler: GPU timer queries unavailable, recording CPU time only ({e})")
+            self.gpu_supported = False
+            return None
+        self._gpu_query_open = True
+        return query
+
+    def collect_gpu_timings(self, wait=False):
+        """
+        Reads back finished GPU queries. Call once per frame with the GL context
+        current. wait=True blocks until every outstanding query has a result.
+        """
+        while self._in_flight and (wait or self._frame_index - self._in_flight[0][0]['index'] > GPU_QUERY_LATENCY):
+            frame, queries = self._in_flight[0]
+            # Queries finish in order, so the last one being ready means they all are.
+            if not wait and not gl.glGetQueryObjectiv(queries[-1][1], gl.GL_QUERY_RESULT_AVAILABLE):
+                return
+            self._in_flight.popleft()
+            for record, query in queries:
+                record['gpu_ns'] = int(gl.glGetQueryObjectui64v(query, gl.GL_QUERY_RESULT))
+                self._free_queries.append(query)
+            frame['gpu_pending'] = 0
+
+    def summary(self, frame_count=60):
+        """
+        Averages the last frame_count frames. Returns (frame_ms, rows) where rows
+        are (name, depth, cpu_ms, gpu_ms or None) in the order of the latest frame.
+        """
+        frames = list(self.frames)[-frame_count:]
+        if not frames: return 0.0, []
+        frame_ms = sum(f['cpu_ns'] for f in frames) / len(frames) / 1e6
+
+        order, cpu, gpu = {}, {}, {}
+        for frame in frames:
+            for record in frame['sections']:
+                key = (record['name'], record['depth'])
+                order.setdefault(key, len(order))
+                cpu.setdefault(key, []).append(record['cpu_ns'])
+                if record['gpu_ns'] is not None:
+                    gpu.setdefault(key, []).append(record['gpu_ns'])
+
+        # Sections that repeat within a frame are reported as per-frame totals.
+        rows = []
+        for key in sorted(order, key=order.get):
+            cpu_ms = sum(cpu[key]) / len(frames) / 1e6
+            gpu_ms = sum(gpu[key]) / len(frames) / 1e6 if key in gpu else None
+            rows.append((key[0], key[1], cpu_ms, gpu_ms))
+        return frame_ms, rows
+
+    def to_chrome_trace(self):
+        """
+        Converts the ring buffer to Chrome trace_event JSON (chrome://tracing,
+        Perfetto). GPU durations are drawn on their own track at the CPU time the
+        commands were submitted, as the GPU clock is not sampled.
+        """
+        frames = list(self.frames)
+        if not frames: return {'traceEvents': []}
+        origin_ns = frames[0]['start_ns']
+        events = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': 1, 'args': {'name': 'CPU'}},
+            {'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': 2, 'args': {'name': 'GPU'}},
+        ]
+        for frame in frames:
+            events.append({'name': f"Frame {frame['index']}", 'cat': 'frame', 'ph': 'X', 'pid': 1, 'tid': 1,
+                           'ts': (frame['start_ns'] - origin_ns) / 1000.0, 'dur': frame['cpu_ns'] / 1000.0})
+            for record in frame['sections']:
+                ts = (record['start_ns'] - origin_ns) / 1000.0
+                events.append({'name': record['name'], 'cat': 'cpu', 'ph': 'X', 'pid': 1, 'tid': 1,
+                               'ts': ts, 'dur': record['cpu_ns'] / 1000.0})
+                if record['gpu_ns'] is not None:
+                    events.append({'name': record['name'], 'cat': 'gpu', 'ph': 'X', 'pid': 1, 'tid': 2,
+                                   'ts': ts, 'dur': record['gpu_ns'] / 1000.0})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def cleanup(self):
+        queries = self._free_queries + [q for _, qs in self._in_flight for _, q in qs] + [q for _, q in self._frame_queries]
+        if queries:
+            gl.glDeleteQueries(len(queries), queries)
+        self._free_queries, self._frame_queries = [], []
+        self._in_flight.clear()
@@ -3,16 +3,22 @@ import os
 import numpy as np
 import ctypes
 from PyQt5.QtWidgets import QOpenGLWidget, QApplication
-from PyQt5.QtCore import Qt, QTimer, QPoint, QUrl
+from PyQt5.QtCore import Qt, QTimer, QPoint
 from PyQt5.QtGui import QPainter, QColor, QFont, QCursor
-from PyQt5.QtMultimedia import QSoundEffect
-import OpenGL.GL as gl
+from engine.render_stats import gl, render_stats
 import glm
 from engine.camera import Camera
-from editor.things import Thing, Light, PlayerStart, Monster, Pickup, Speaker
-from engine.player import Player
+from editor.things import Thing, Light, PlayerStart, Monster, Pickup, Speaker, Model
+from editor.scene_events import CHANGED_ALL, CHANGED_POS, CHANGED_SIZE, CHANGED_TEXTURES
+from engine.game_session import GameSession
+from engine.input_recording import InputRecorder
+from engine.audio import AudioMixer
+from engine.audio_output import MixerOutput
+from engine.speaker_index import SpeakerIndex
+from engine.constants import AUDIO_OCCLUSION_GAIN
 from PIL import Image
 from .renderer import Renderer
+from .profiler import FrameProfiler
 from engine import shaders
 
 def perspective_projection(fov, aspect, near, far):
@@ -48,11 +54,14 @@ class QtGameView(QOpenGLWidget):
 
         # Game mode state
         self.play_mode = False
-        self.player = None
+        self.session = None
         self.tile_map = None
-        self.player_in_triggers = set()
-        self.fired_once_triggers = set()
-        self.active_sounds = {}
+        self.input_recorder = None
+        # One mixer and output stream for every speaker; created on first play.
+        self.audio = AudioMixer()
+        self.audio_output = None
+        self.active_sounds = {} # Speaker name -> Voice
+        self.speaker_index = SpeakerIndex()
         self.played_once_sounds = set()
         
         # Performance tracking
@@ -61,6 +70,13 @@ class QtGameView(QOpenGLWidget):
         self.last_time = time.time()
         self.last_fps_time = time.time()
         self.start_time = time.time()
+        self.profiler = FrameProfiler()
+        self.show_profiler = False
+        self.show_render_stats = False
+        self.flythrough = None
+        self.flythrough_output = None
+        self.on_flythrough_finished = None
+        self.path_recorder = None
 
         # Gizmo dragging state
         self.is_dragging_gizmo = False
@@ -81,8 +97,15 @@ class QtGameView(QOpenGLWidget):
     def initializeGL(self):
         """Initializes OpenGL and the Renderer."""
         gl.glClearColor(0.1, 0.1, 0.15, 1.0)
-        self.renderer = Renderer(self.load_texture, self.grid_size, self.world_size)
+        self.renderer = Renderer(self.load_texture, self.grid_size, self.world_size, self.profiler)
         self.load_all_sprite_textures()
+        self.context().aboutToBeDestroyed.connect(self.cleanup_gl)
+
+    def cleanup_gl(self):
+        """Frees the profiler's GPU timer queries while the context can still be made current."""
+        self.makeCurrent()
+        self.profiler.cleanup()
+        self.doneCurrent()
         
     def paintGL(self):
         """The main drawing callback. Delegates all rendering to the Renderer."""
@@ -110,26 +133,42 @@ class QtGameView(QOpenGLWidget):
             "brush_display_mode": self.brush_display_mode,
             "show_triggers_as_solid": self.show_triggers_as_solid,
             "show_caulk": self.editor.config.getboolean('Display', 'show_caulk', fallback=True),
-            "play_mode": self.play_mode,
+            "play_mode": self.play_mode or self.flythrough is not None,
             "selected_object": self.selected_object,
             "time": time.time() - self.start_time,
             "show_sprites_in_play_mode": self.show_sprites_in_play_mode,
         }
 
         # --- 3. Render the Scene ---
+        render_stats.begin_frame()
         self.renderer.render_scene(
             self.projection_matrix, self.view_matrix, camera_pos,
             self.editor.state.brushes, self.editor.state.things,
             self.selected_object,
             render_config
         )
+        render_stats.end_frame()
 
         # --- 4. Draw UI Overlays ---
-        if self.editor.config.getboolean('Display', 'show_fps', fallback=False):
-            self._draw_fps_counter()
+        with self.profiler.section('hud'):
+            if self.editor.config.getboolean('Display', 'show_fps', fallback=False):
+                self._draw_fps_counter()
+
+            if self.play_mode and self.show_sprites_in_play_mode:
+                self._draw_sprites_text()
+
+            if self.renderer.model_renderer.import_progress:
+                self._draw_import_progress()
+
+            if self.show_profiler:
+                self._draw_profiler_hud()
 
-        if self.play_mode and self.show_sprites_in_play_mode:
-            self._draw_sprites_text()
+            if self.show_render_stats:
+                self._draw_render_stats()
+        self.profiler.end_frame()
+
+        if self.flythrough and self.profiler.frames:
+            self.flythrough.record_frame(self.camera, self.profiler.frames[-1])
 
     def _draw_sprites_text(self):
         """Renders the "Sprites" text using QPainter."""
@@ -150,6 +189,85 @@ class QtGameView(QOpenGLWidget):
         painter.drawText(text_x, 20, "Sprites")
         painter.end()
 
+    def _draw_import_progress(self):
+        """Lists the model imports running in the background."""
+        painter = QPainter(self)
+        font = QFont()
+        font.setPointSize(8)
+        painter.setFont(font)
+        painter.setPen(QColor(255, 255, 255))
+
+        padding, line_height = 5, 16
+        progress = list(self.renderer.model_renderer.import_progress.items())
+        rect_y = self.height() - padding - line_height * len(progress) - 4
+        painter.fillRect(padding, rect_y, 320, line_height * len(progress) + 4, QColor(0, 0, 0, 128))
+        for i, (path, (fraction, stage)) in enumerate(progress):
+            painter.drawText(padding + 5, rect_y + line_height * (i + 1), f"Importing {os.path.basename(path)}: {stage} ({fraction * 100:.0f}%)")
+        painter.end()
+
+    def _draw_profiler_hud(self):
+        """Lists the per-pass CPU and GPU times averaged over the last second."""
+        frame_ms, rows = self.profiler.summary()
+        painter = QPainter(self)
+        font = QFont("Consolas")
+        font.setStyleHint(QFont.Monospace)
+        font.setPointSize(8)
+        painter.setFont(font)
+        painter.setPen(QColor(255, 255, 255))
+
+        padding, line_height, rect_width = 5, 14, 260
+        rect_x = self.width() - rect_width - padding
+        rect_y = padding + 25 # Below the FPS counter
+        painter.fillRect(rect_x, rect_y, rect_width, line_height * (len(rows) + 2) + 4, QColor(0, 0, 0, 160))
+        text_x = rect_x + 5
+        painter.drawText(text_x, rect_y + line_height, f"{'frame':<20}{frame_ms:6.2f} ms")
+        painter.drawText(text_x, rect_y + line_height * 2, f"{'pass':<20}{'cpu':>6}  {'gpu':>6}")
+        for i, (name, depth, cpu_ms, gpu_ms) in enumerate(rows):
+            label = ('  ' * depth + name)[:20]
+            gpu_text = f"{gpu_ms:6.2f}" if gpu_ms is not None else f"{'-':>6}"
+            painter.drawText(text_x, rect_y + line_height * (i + 3), f"{label:<20}{cpu_ms:6.2f}  {gpu_text}")
+        painter.end()
+
+    def _draw_render_stats(self):
+        """Lists last frame's GL call counters and GPU memory, left of the FPS counter."""
+        frame = render_stats.last_frame
+        lines = [
+            f"Draw calls: {frame['draw_calls']}",
+            f"Triangles: {frame['triangles']:,}",
+            f"Vertices: {frame['vertices']:,}",
+            f"Program binds: {frame['program_binds']}",
+            f"VAO binds: {frame['vao_binds']}",
+            f"Texture binds: {frame['texture_binds']}",
+            f"Uniforms: {frame['uniform_uploads']}",
+            f"Uploaded: {frame['bytes_uploaded'] / 1024:.1f} KB",
+            f"GPU memory: {render_stats.total_memory / (1024 * 1024):.1f} MB",
+        ]
+        for category, size in sorted(render_stats.memory.items()):
+            lines.append(f"  {category}: {size / (1024 * 1024):.1f} MB")
+
+        painter = QPainter(self)
+        font = QFont()
+        font.setPointSize(8)
+        painter.setFont(font)
+        painter.setPen(QColor(255, 255, 255))
+
+        padding, line_height, rect_width = 5, 14, 170
+        rect_x = self.width() - 70 - padding * 2 - rect_width # Left of the FPS counter
+        painter.fillRect(rect_x, padding, rect_width, line_height * len(lines) + 6, QColor(0, 0, 0, 128))
+        for i, line in enumerate(lines):
+            painter.drawText(rect_x + 5, padding + line_height * (i + 1), line)
+        painter.end()
+
+    def set_render_stats_enabled(self, enabled):
+        self.show_render_stats = enabled
+        render_stats.enabled = enabled
+        self.update()
+
+    def set_profiler_enabled(self, enabled):
+        self.show_profiler = enabled
+        self.profiler.enabled = enabled
+        self.update()
+
     def _draw_fps_counter(self):
         """Renders the FPS counter using QPainter."""
         painter = QPainter(self)
@@ -169,6 +287,25 @@ class QtGameView(QOpenGLWidget):
         painter.drawText(text_x, 20, f"FPS: {self.fps:.0f}")
         painter.end()
 
+    def start_flythrough(self, benchmark, output_prefix, on_finished=None):
+        """Runs a FlythroughBenchmark, writing its report and heatmap to output_prefix when done."""
+        self.flythrough = benchmark
+        self.flythrough_output = output_prefix
+        self.on_flythrough_finished = on_finished
+        self.profiler.enabled = True
+        render_stats.enabled = True
+
+    def finish_flythrough(self):
+        benchmark, self.flythrough = self.flythrough, None
+        self.makeCurrent()
+        self.profiler.collect_gpu_timings(wait=True)
+        self.doneCurrent()
+        benchmark.write_results(self.flythrough_output, self.editor.state.brushes)
+        self.profiler.enabled = self.show_profiler
+        render_stats.enabled = self.show_render_stats
+        if self.on_flythrough_finished:
+            self.on_flythrough_finished(benchmark)
+
     def update_grid(self):
         self.grid_dirty = True
         self.update()
@@ -209,6 +346,8 @@ class QtGameView(QOpenGLWidget):
         self.renderer.set_sprite_textures(self.sprite_textures)
 
     def update_loop(self):
+        if self.profiler.enabled:
+            self.profiler.begin_frame()
         current_time = time.time()
         delta = current_time - self.last_time
         self.last_time = current_time
@@ -217,17 +356,33 @@ class QtGameView(QOpenGLWidget):
             self.fps = self.frame_count / (current_time - self.last_fps_time)
             self.frame_count = 0
             self.last_fps_time = current_time
-        if self.play_mode and self.player:
-            self.player.update(self.editor.keys_pressed, self.editor.state.brushes, delta)
-            self.handle_triggers()
-            self.update_speaker_sounds()
-        elif self.hasFocus():
-            self.handle_keyboard_input(delta)
+        with self.profiler.section('update'):
+            if self.flythrough:
+                self.flythrough.step(self.camera)
+            elif self.play_mode and self.player:
+                if self.input_recorder:
+                    self.input_recorder.record_tick(self.editor.keys_pressed, delta)
+                with self.profiler.section('player'):
+                    self.session.update_player(self.editor.keys_pressed, delta)
+                if self.path_recorder:
+                    self.path_recorder.record(self.player)
+                with self.profiler.section('triggers'):
+                    self.session.handle_triggers()
+                with self.profiler.section('sounds'):
+                    self.update_speaker_sounds()
+            elif self.hasFocus():
+                self.handle_keyboard_input(delta)
+        if self.flythrough and self.flythrough.finished:
+            self.finish_flythrough()
         self.update()
 
     def set_tile_map(self, tile_map):
         self.tile_map = tile_map
 
+    @property
+    def player(self):
+        return self.session.player if self.session else None
+
     def toggle_play_mode(self, player_start_pos, player_start_angle, physics_enabled=True):
         self.play_mode = not self.play_mode
         if self.play_mode:
@@ -235,94 +390,78 @@ class QtGameView(QOpenGLWidget):
             self.editor.set_selected_object(None)
             self.mouselook_active = True
             self.setCursor(Qt.BlankCursor)
-            self.player = Player(
-                player_start_pos[0],
-                player_start_pos[2],
-                np.radians(player_start_angle),
-                physics_enabled=physics_enabled
-            )
-            self.player.pos.y = player_start_pos[1]
-            self.player_in_triggers.clear()
-            self.fired_once_triggers.clear()
+            self.session = GameSession(self.editor.state, player_start_pos, player_start_angle, physics_enabled, self.tile_map)
+            self.session.on_speaker_toggled = self.toggle_speaker_sound
             self.played_once_sounds.clear()
+            self.speaker_index = SpeakerIndex()
             self.initialize_sounds()
         else:
             self.mouselook_active = False
             self.setCursor(Qt.ArrowCursor)
-            self.player = None
+            if self.input_recorder:
+                self.stop_input_recording()
+            self.session.end()
+            self.session = None
             self.stop_all_sounds()
 
+    def start_input_recording(self):
+        if self.session:
+            self.input_recorder = InputRecorder(self.editor.state, self.session)
+            print("Recording input... press F8 again to stop.")
+
+    def stop_input_recording(self, path=None):
+        """Saves the recording to path, or recordings/session_<time>.json."""
+        path = path or os.path.join('recordings', f"session_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        self.input_recorder.save(path)
+        self.input_recorder = None
+        return path
+
+    def toggle_input_recording(self):
+        if self.input_recorder:
+            self.stop_input_recording()
+        else:
+            self.start_input_recording()
+
     def set_culling(self, enabled):
         self.culling_enabled = enabled
         self.update()
         
-    def handle_triggers(self):
-        if not self.player:
-            return
-        player_pos = self.player.pos
-        currently_colliding_triggers = set()
-        for i, brush in enumerate(self.editor.state.brushes):
-            if not isinstance(brush, dict) or not brush.get('is_trigger'):
-                continue
-            pos = glm.vec3(brush['pos'])
-            size = glm.vec3(brush['size'])
-            half_size = size / 2.0
-            min_bounds = pos - half_size
-            max_bounds = pos + half_size
-            if (min_bounds.x <= player_pos.x <= max_bounds.x and
-                min_bounds.y <= player_pos.y <= max_bounds.y and
-                min_bounds.z <= player_pos.z <= max_bounds.z):
-                trigger_id = i
-                currently_colliding_triggers.add(trigger_id)
-                if trigger_id not in self.player_in_triggers:
-                    self.activate_trigger(brush, trigger_id)
-        self.player_in_triggers = currently_colliding_triggers
-        
-    def activate_trigger(self, brush, trigger_id):
-        trigger_frequency = brush.get('trigger_type', 'multiple')
-        if trigger_frequency == 'once' and trigger_id in self.fired_once_triggers:
+    def brushes_changed(self):
+        """Called after editor changes to brushes so play-mode collision picks them up."""
+        if self.session:
+            self.session.mark_dirty()
+        self.speaker_index.mark_dirty()
+
+    def scene_changed(self, changes):
+        """Applies a batch of editor changes, refiling moved brushes rather than rebuilding every index."""
+        # Models added or removed are picked up by the model renderer itself; edited ones it has to be told of.
+        models = [thing for thing in changes.modified_things() if isinstance(thing, Model)]
+        if models and self.renderer:
+            self.renderer.model_renderer.models_changed(models)
+        # Anything but a move, resize or retexture can change what blocks, triggers or moves.
+        if changes.membership_changed or changes.modified_brushes(CHANGED_ALL & ~(CHANGED_POS | CHANGED_SIZE | CHANGED_TEXTURES)):
+            self.brushes_changed()
             return
-        target_name = brush.get('target')
-        if not target_name:
-            return
-
-        target_brush = next((b for b in self.editor.state.brushes if b.get('name') == target_name), None)
-
-        if target_brush and target_brush.get('is_mover'):
-            if target_brush.get('move_once', False):
-                # Toggle between start and end positions
-                if 'original_pos' not in target_brush:
-                    target_brush['original_pos'] = list(target_brush['pos'])
-                
-                direction = np.array(target_brush.get('direction', [0, 1, 0]))
-                distance = target_brush.get('distance', 128)
-                
-                if list(target_brush['pos']) == target_brush['original_pos']:
-                    target_brush['pos'] = (np.array(target_brush['original_pos']) + direction * distance).tolist()
-                else:
-                    target_brush['pos'] = target_brush['original_pos']
-            else: # Original mover behavior
-                target_brush['start_on'] = not target_brush.get('start_on', False)
-        
-        target_thing = next((t for t in self.editor.state.things if hasattr(t, 'name') and t.name == target_name), None)
-        if not target_thing and not target_brush:
-            print(f"Play mode warning: Trigger target '{target_name}' not found.")
-            return
-
-        if isinstance(target_thing, Light):
-            current_state = target_thing.properties.get('state', 'on')
-            new_state = 'off' if current_state == 'on' else 'on'
-            target_thing.properties['state'] = new_state
-        elif isinstance(target_thing, Speaker):
-            if target_thing.name in self.active_sounds:
-                self.stop_sound_for_speaker(target_thing.name)
-            else:
-                self.play_sound_for_speaker(target_thing)
-
-        if trigger_frequency == 'once':
-            self.fired_once_triggers.add(trigger_id)
+        things = changes.modified_things()
+        if things:
+            self.speaker_index.mark_dirty()
+        if self.session:
+            moved = changes.modified_brushes(CHANGED_POS | CHANGED_SIZE)
+            if moved:
+                self.session.brushes_moved(moved)
+            if things:
+                self.session.things_moved(things)
+
+    def toggle_speaker_sound(self, speaker):
+        if speaker.name in self.active_sounds:
+            self.stop_sound_for_speaker(speaker.name)
+        else:
+            self.play_sound_for_speaker(speaker)
 
     def initialize_sounds(self):
+        if self.audio_output is None:
+            self.audio_output = MixerOutput(self.audio, self)
+        self.audio_output.start()
         for thing in self.editor.state.things:
             if isinstance(thing, Speaker):
                 is_global = thing.properties.get('global', False)
@@ -330,50 +469,62 @@ class QtGameView(QOpenGLWidget):
                 if is_global and play_on_start:
                     self.play_sound_for_speaker(thing)
     def stop_all_sounds(self):
-        for sound in self.active_sounds.values():
-            sound.stop()
+        self.audio.stop_all()
         self.active_sounds.clear()
+        if self.audio_output:
+            self.audio_output.stop()
     def play_sound_for_speaker(self, speaker):
         if speaker.name in self.played_once_sounds or speaker.name in self.active_sounds: return
         sound_file_rel = speaker.properties.get('sound_file')
         if not sound_file_rel: return
         sound_path = os.path.join('assets', sound_file_rel)
         if not os.path.exists(sound_path): print(f"Audio Error: Sound file not found at '{sound_path}'"); return
-        sound_effect = QSoundEffect(self)
-        sound_effect.setSource(QUrl.fromLocalFile(sound_path))
-        sound_effect.setLoopCount(QSoundEffect.Infinite if speaker.properties.get('looping', False) else 1)
-        sound_effect.setVolume(speaker.properties.get('volume', 1.0))
+        on_finished = None
         if speaker.properties.get('play_once', False):
-            def on_status_changed(status):
-                if status == QSoundEffect.StoppedState:
-                    self.played_once_sounds.add(speaker.name)
-                    try: sound_effect.statusChanged.disconnect()
-                    except TypeError: pass
-            sound_effect.statusChanged.connect(on_status_changed)
-        self.active_sounds[speaker.name] = sound_effect
-        sound_effect.play()
+            # Runs on the mixing thread once the sound reaches its end.
+            on_finished = lambda voice: self.played_once_sounds.add(speaker.name)
+        is_global = speaker.properties.get('global', False)
+        voice = self.audio.play(
+            speaker.name, sound_path,
+            volume=float(speaker.properties.get('volume', 1.0)),
+            looping=speaker.properties.get('looping', False),
+            priority=float(speaker.properties.get('priority', 0)),
+            position=None if is_global else speaker.pos,
+            radius=speaker.get_radius(),
+            on_finished=on_finished)
+        if voice:
+            self.active_sounds[speaker.name] = voice
     def stop_sound_for_speaker(self, speaker_name):
         if speaker_name in self.active_sounds:
-            self.active_sounds[speaker_name].stop()
+            self.audio.stop(speaker_name)
             del self.active_sounds[speaker_name]
     def update_speaker_sounds(self):
         if not self.player: return
         player_pos = self.player.pos
-        for thing in self.editor.state.things:
-            if isinstance(thing, Speaker) and not thing.properties.get('global', False):
-                speaker_pos, radius = glm.vec3(thing.pos), thing.get_radius()
-                distance = glm.distance(player_pos, speaker_pos)
-                is_playing = thing.name in self.active_sounds
-                if distance <= radius:
-                    if not is_playing and thing.properties.get('play_on_start', True):
-                        self.play_sound_for_speaker(thing)
-                        is_playing = thing.name in self.active_sounds
-                    if is_playing:
-                        attenuation = (1.0 - (distance / radius))**2
-                        final_volume = thing.properties.get('volume', 1.0) * attenuation
-                        self.active_sounds[thing.name].setVolume(final_volume)
-                elif is_playing:
-                    self.stop_sound_for_speaker(thing.name)
+        # Gains and panning are worked out by the mixer; here voices are only started and stopped.
+        self.audio.set_listener(player_pos, self.player.angle)
+        for name in [name for name, voice in self.active_sounds.items() if voice.finished]:
+            del self.active_sounds[name]
+        self.speaker_index.sync(self.editor.state.things)
+        entered, left = self.speaker_index.update(player_pos)
+        for speaker in entered:
+            if speaker.properties.get('play_on_start', True):
+                self.play_sound_for_speaker(speaker)
+        for speaker in left:
+            self.stop_sound_for_speaker(speaker.name)
+        self.update_sound_occlusion(player_pos)
+
+    def update_sound_occlusion(self, player_pos):
+        """Muffles speakers with a wall between them and the player, one batch of rays for all of them."""
+        placed = [voice for voice in self.active_sounds.values() if voice.position is not None]
+        if not placed:
+            return
+        listener = np.repeat([list(player_pos)], len(placed), axis=0)
+        clear = self.session.line_of_sight([voice.position for voice in placed], listener)
+        for voice, is_clear in zip(placed, clear):
+            target = 1.0 if is_clear else AUDIO_OCCLUSION_GAIN
+            # Ease towards the new gain so a wall edge doesn't click.
+            voice.occlusion += (target - voice.occlusion) * 0.25
 
     def get_selected_object_pos(self):
         if not self.editor.state.selected_object: return None
@@ -526,7 +677,9 @@ class QtGameView(QOpenGLWidget):
             return
         dx, dy = event.x() - self.last_mouse_pos.x(), event.y() - self.last_mouse_pos.y()
         if self.play_mode and self.player:
-            self.player.update_angle(dx, dy)
+            self.session.look(dx, dy)
+            if self.input_recorder:
+                self.input_recorder.record_look(dx, dy)
         else:
             self.camera.rotate(dx, dy)
         center_pos = self.mapToGlobal(self.rect().center())
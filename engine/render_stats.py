@@ -0,0 +1,176 @@
+import OpenGL.GL as _gl
+
+# Bytes per texel for the internal formats the engine uploads.
+_BYTES_PER_TEXEL = {
+    _gl.GL_RGBA: 4, _gl.GL_RGBA8: 4, _gl.GL_RGB: 3, _gl.GL_RGB8: 3,
+    _gl.GL_RED: 1, _gl.GL_R8: 1, _gl.GL_DEPTH24_STENCIL8: 4,
+}
+_BUFFER_CATEGORIES = {_gl.GL_ARRAY_BUFFER: 'vertex_buffers', _gl.GL_ELEMENT_ARRAY_BUFFER: 'index_buffers'}
+_TEXTURE_CATEGORIES = {_gl.GL_TEXTURE_2D: 'textures_2d', _gl.GL_TEXTURE_3D: 'textures_3d'}
+
+
+class RenderStats:
+    """
+    Per-frame GL call counters plus running totals of GPU memory by category.
+
+    Counters are only gathered while enabled; memory is always tracked, since
+    most allocations happen at load time before anyone opens the overlay.
+    Benchmark scripts can read last_frame, memory or snapshot() directly.
+    """
+    COUNTERS = ('draw_calls', 'program_binds', 'vao_binds', 'texture_binds',
+                'uniform_uploads', 'vertices', 'triangles', 'bytes_uploaded')
+
+    def __init__(self):
+        self.enabled = False
+        self.frame = dict.fromkeys(self.COUNTERS, 0)
+        self.last_frame = dict(self.frame)
+        self.frame_count = 0
+        self.memory = {}  # category -> bytes currently allocated
+        self._allocations = {}  # ('buffer' | 'texture', id) -> (category, bytes)
+        self._base_sizes = {}  # ('texture', id) -> bytes of its level 0, before any mipmaps
+        self._bound_buffers = {}  # target -> buffer id
+        self._bound_textures = {}  # (texture unit, target) -> texture id
+        self._active_texture = _gl.GL_TEXTURE0
+
+    def begin_frame(self):
+        self.frame = dict.fromkeys(self.COUNTERS, 0)
+
+    def end_frame(self):
+        self.last_frame = self.frame
+        self.frame_count += 1
+
+    @property
+    def total_memory(self):
+        return sum(self.memory.values())
+
+    def snapshot(self):
+        """Returns the last frame's counters and current memory totals as plain dicts."""
+        return {'frame': dict(self.last_frame), 'memory': dict(self.memory), 'total_memory': self.total_memory}
+
+    def _allocate(self, key, category, size):
+        self._free(key)
+        self._allocations[key] = (category, size)
+        self.memory[category] = self.memory.get(category, 0) + size
+
+    def _free(self, key):
+        old = self._allocations.pop(key, None)
+        if old:
+            self.memory[old[0]] -= old[1]
+
+    def _count_draw(self, mode, vertex_count, instance_count=1):
+        frame = self.frame
+        frame['draw_calls'] += 1
+        frame['vertices'] += vertex_count * instance_count
+        if mode == _gl.GL_TRIANGLES:
+            frame['triangles'] += vertex_count // 3 * instance_count
+
+    def wrap(self, name, func):
+        """Returns func wrapped with the bookkeeping for GL entry point name, or func unchanged."""
+        if name.startswith('glUniform'):
+            def counted(*args):
+                if self.enabled: self.frame['uniform_uploads'] += 1
+                return func(*args)
+            return counted
+        hook = getattr(self, '_on_' + name, None)
+        if hook is None:
+            return func
+        def tracked(*args):
+            hook(*args)
+            return func(*args)
+        return tracked
+
+    # --- Bookkeeping hooks, called with the GL call's arguments ---
+    def _on_glDrawArrays(self, mode, first, count):
+        if self.enabled: self._count_draw(mode, count)
+
+    def _on_glDrawArraysInstanced(self, mode, first, count, instance_count):
+        if self.enabled: self._count_draw(mode, count, instance_count)
+
+    def _on_glDrawElements(self, mode, count, index_type, indices):
+        if self.enabled: self._count_draw(mode, count)
+
+    def _on_glDrawElementsInstanced(self, mode, count, index_type, indices, instance_count):
+        if self.enabled: self._count_draw(mode, count, instance_count)
+
+    def _on_glUseProgram(self, program):
+        if self.enabled: self.frame['program_binds'] += 1
+
+    def _on_glBindVertexArray(self, vao):
+        if self.enabled: self.frame['vao_binds'] += 1
+
+    def _on_glActiveTexture(self, unit):
+        self._active_texture = unit
+
+    def _on_glBindTexture(self, target, texture):
+        self._bound_textures[(self._active_texture, target)] = int(texture)
+        if self.enabled: self.frame['texture_binds'] += 1
+
+    def _on_glBindBuffer(self, target, buffer):
+        self._bound_buffers[target] = int(buffer)
+
+    def _on_glBufferData(self, target, *args):
+        # PyOpenGL accepts (target, size, data, usage) or (target, data, usage).
+        size = args[0] if len(args) == 3 else getattr(args[0], 'nbytes', 0)
+        size = int(size)
+        buffer = self._bound_buffers.get(target, 0)
+        if buffer:
+            self._allocate(('buffer', buffer), _BUFFER_CATEGORIES.get(target, 'other_buffers'), size)
+        data = args[1] if len(args) == 3 else args[0]
+        if self.enabled and data is not None: self.frame['bytes_uploaded'] += size
+
+    def _on_glBufferSubData(self, target, offset, size, data=None):
+        if self.enabled: self.frame['bytes_uploaded'] += int(getattr(size, 'nbytes', size))
+
+    def _on_glTexImage2D(self, target, level, internal_format, width, height, border, data_format, data_type, data):
+        self._texture_upload(target, level, internal_format, width * height, data)
+
+    def _on_glTexImage3D(self, target, level, internal_format, width, height, depth, border, data_format, data_type, data):
+        self._texture_upload(target, level, internal_format, width * height * depth, data)
+
+    def _texture_upload(self, target, level, internal_format, texels, data):
+        size = texels * _BYTES_PER_TEXEL.get(internal_format, 4)
+        texture = self._bound_textures.get((self._active_texture, target), 0)
+        if texture and level == 0:
+            self._allocate(('texture', texture), _TEXTURE_CATEGORIES.get(target, 'other_textures'), size)
+            self._base_sizes[('texture', texture)] = size
+        if self.enabled and data is not None: self.frame['bytes_uploaded'] += size
+
+    def _on_glGenerateMipmap(self, target):
+        # A full mip chain adds a third on top of the base level, however often it is regenerated.
+        key = ('texture', self._bound_textures.get((self._active_texture, target), 0))
+        if key in self._allocations and key in self._base_sizes:
+            base = self._base_sizes[key]
+            self._allocate(key, self._allocations[key][0], base + base // 3)
+
+    def _on_glDeleteBuffers(self, count, buffers):
+        for buffer in buffers:
+            self._free(('buffer', int(buffer)))
+
+    def _on_glDeleteTextures(self, *args):
+        textures = args[-1]
+        for texture in (textures if hasattr(textures, '__iter__') else [textures]):
+            self._free(('texture', int(texture)))
+            self._base_sizes.pop(('texture', int(texture)), None)
+
+
+class InstrumentedGL:
+    """
+    Drop-in stand-in for the OpenGL.GL module. Entry points RenderStats cares
+    about are wrapped on first use; everything else is passed straight through.
+    """
+
+    def __init__(self, module, stats):
+        self._module = module
+        self._stats = stats
+
+    def __getattr__(self, name):
+        value = getattr(self._module, name)
+        if name.startswith('gl') and callable(value):
+            value = self._stats.wrap(name, value)
+        # Cache on the instance so later lookups skip __getattr__ entirely.
+        setattr(self, name, value)
+        return value
+
+
+render_stats = RenderStats()
+gl = InstrumentedGL(_gl, render_stats)
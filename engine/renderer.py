@@ -1,9 +1,12 @@
 import glm
 import numpy as np
-import OpenGL.GL as gl
+from engine.render_stats import gl
 import ctypes
-from editor.things import Thing, Light
+from editor.things import Thing, Light, Model
+from editor.brush_store import Brush, NO_TEXTURE, FLAG_HIDDEN, FLAG_TRIGGER, FLAG_FOG, FLAG_MOVER, FLAG_NON_SOLID, FLAG_SUBTRACT, FLAG_LOCK
 from engine import shaders
+from engine.model_renderer import ModelRenderer
+from engine.profiler import FrameProfiler
 from OpenGL.GL.shaders import compileProgram, compileShader
 from PIL import Image
 import os
@@ -12,9 +15,10 @@ import time
 class Renderer:
     """Handles all modern OpenGL drawing operations for the editor."""
 
-    def __init__(self, texture_loader, initial_grid_size, initial_world_size):
+    def __init__(self, texture_loader, initial_grid_size, initial_world_size, profiler=None):
         self.texture_manager = {}
         self.load_texture_callback = texture_loader
+        self.profiler = profiler if profiler is not None else FrameProfiler()
 
         # 1. Compile Shaders
         try:
@@ -24,6 +28,7 @@ class Renderer:
             shader_sprite = compileProgram(compileShader(shaders.VERTEX_SHADER_SPRITE, gl.GL_VERTEX_SHADER), compileShader(shaders.FRAGMENT_SHADER_SPRITE, gl.GL_FRAGMENT_SHADER))
             shader_shadow_volume = compileProgram(compileShader(shaders.SHADOW_VOLUME_VERTEX_SHADER, gl.GL_VERTEX_SHADER), compileShader(shaders.SHADOW_VOLUME_FRAGMENT_SHADER, gl.GL_FRAGMENT_SHADER))
             shader_fog = compileProgram(compileShader(shaders.VERTEX_SHADER_FOG, gl.GL_VERTEX_SHADER), compileShader(shaders.FRAGMENT_SHADER_FOG, gl.GL_FRAGMENT_SHADER))
+            shader_model = compileProgram(compileShader(shaders.VERTEX_SHADER_MODEL, gl.GL_VERTEX_SHADER), compileShader(shaders.FRAGMENT_SHADER_LIT, gl.GL_FRAGMENT_SHADER))
             self.shaders = {
                 'simple': shader_simple,
                 'lit': shader_lit,
@@ -31,6 +36,7 @@ class Renderer:
                 'sprite': shader_sprite,
                 'shadow_volume': shader_shadow_volume,
                 'fog': shader_fog,
+                'model': shader_model,
             }
         except Exception as e:
             print(f"FATAL: Shader Compilation Error: {e}")
@@ -45,6 +51,7 @@ class Renderer:
         self.grid_indices_count = 0
         self._create_gizmo_buffers()
         self.update_grid_buffers(initial_world_size, initial_grid_size)
+        self.model_renderer = ModelRenderer(self.shaders['model'])
 
         # 3. Load Essential Textures
         self.noise_texture_id = self._load_3d_texture('assets/noise_3d.bin')
@@ -136,77 +143,89 @@ class Renderer:
     
     def render_scene(self, projection, view, camera_pos, brushes, things, selected_object, config):
         """Main entry point to render a complete scene."""
-        gl.glEnable(gl.GL_DEPTH_TEST)
-        gl.glDepthFunc(gl.GL_LESS)
-        gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT | gl.GL_STENCIL_BUFFER_BIT)
-
-        # Draw Grid
-        self.draw_grid(projection, view, self.grid_indices_count)
-
-        # --- Prepare object lists for rendering ---
-        opaque_brushes, transparent_brushes, sprites, fog_volumes = self._sort_objects(brushes, things, config)
-        
-        # Correctly get the play_mode from the config dictionary
-        is_play_mode = config.get('play_mode', False)
-
-        # --- 1. Opaque Pass ---
-        gl.glDepthMask(gl.GL_TRUE)
-        gl.glDisable(gl.GL_BLEND)
-        if config.get('culling_enabled', False):
-            gl.glEnable(gl.GL_CULL_FACE)
-        else:
-            gl.glDisable(gl.GL_CULL_FACE)
-
-        lights = [t for t in things if isinstance(t, Light) and t.properties.get('state', 'on') == 'on']
-        
-        display_mode = config.get('brush_display_mode', 'Textured')
-        if display_mode == "Textured":
-            self.draw_textured_brushes(projection, view, opaque_brushes, lights, config)
-        else: # Lit or Wireframe
-            self.draw_lit_brushes(projection, view, opaque_brushes, lights, config)
-
-        # --- Shadow Pass ---
-        shadow_casting_lights = [light for light in lights if light.properties.get('casts_shadows')]
-        if shadow_casting_lights:
-            self.render_shadows(projection, view, opaque_brushes, shadow_casting_lights)
-
-        # --- 2. Transparent Pass ---
-        # Sort transparent objects from back to front
-        transparent_brushes.sort(key=lambda b: -glm.distance(glm.vec3(b['pos']), camera_pos))
-        sprites.sort(key=lambda s: -glm.distance(glm.vec3(s.pos), camera_pos))
-        fog_volumes.sort(key=lambda b: -glm.distance(glm.vec3(b['pos']), camera_pos))
-
-        
-        gl.glEnable(gl.GL_BLEND)
-        gl.glDepthMask(gl.GL_FALSE) # Don't write to depth buffer
-
-        self.draw_sprites(projection, view, sprites, self.sprite_textures)
-        self.draw_lit_brushes(projection, view, transparent_brushes, lights, config, is_transparent_pass=True)
-        self.draw_fog_volumes(projection, view, fog_volumes, lights, camera_pos, config)
-
-        # --- 3. Overlays (Gizmo, selection outline) ---
-        gl.glDepthMask(gl.GL_TRUE) # Restore depth mask for gizmo/outlines
-        gl.glDisable(gl.GL_DEPTH_TEST) # Draw on top of everything
+        profiler = self.profiler
+        profiler.collect_gpu_timings()
+        with profiler.section('render_scene'):
+            gl.glEnable(gl.GL_DEPTH_TEST)
+            gl.glDepthFunc(gl.GL_LESS)
+            gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT | gl.GL_STENCIL_BUFFER_BIT)
+
+            # Draw Grid
+            with profiler.section('grid', gpu=True):
+                self.draw_grid(projection, view, self.grid_indices_count)
+
+            # --- Prepare object lists for rendering ---
+            with profiler.section('sort'):
+                opaque_brushes, transparent_brushes, sprites, fog_volumes = self._sort_objects(brushes, things, config)
+                store = Thing.store
+                lights = store.objects(store.select(things, Light, active=True))
+                models = store.objects(store.select(things, Model))
+
+            # --- 1. Opaque Pass ---
+            display_mode = config.get('brush_display_mode', 'Textured')
+            with profiler.section('opaque', gpu=True):
+                gl.glDepthMask(gl.GL_TRUE)
+                gl.glDisable(gl.GL_BLEND)
+                if config.get('culling_enabled', False):
+                    gl.glEnable(gl.GL_CULL_FACE)
+                else:
+                    gl.glDisable(gl.GL_CULL_FACE)
 
-        if selected_object:
-            if isinstance(selected_object, dict): # It's a brush
-                # Draw wireframe for textured mode, as lit mode handles selection color
                 if display_mode == "Textured":
-                    self.draw_selected_brush_outline(projection, view, selected_object)
-                
-                # Draw gizmo ONLY if the selected brush is NOT locked
-                if not selected_object.get('lock', False):
-                    self.render_gizmo(projection, view, selected_object['pos'])
-            
-            elif isinstance(selected_object, Thing): # It's a Thing
-                # Things don't have a wireframe outline, just the gizmo
-                self.render_gizmo(projection, view, selected_object.pos)
+                    self.draw_textured_brushes(projection, view, opaque_brushes, lights, config)
+                else: # Lit or Wireframe
+                    self.draw_lit_brushes(projection, view, opaque_brushes, lights, config)
+
+            with profiler.section('models', gpu=True):
+                self.draw_models(projection, view, camera_pos, models, lights, config)
+
+            # --- Shadow Pass ---
+            shadow_casting_lights = [light for light in lights if light.properties.get('casts_shadows')]
+            if shadow_casting_lights:
+                with profiler.section('shadows'):
+                    self.render_shadows(projection, view, opaque_brushes, shadow_casting_lights)
+
+            # --- 2. Transparent Pass ---
+            # Sort transparent objects from back to front
+            with profiler.section('depth_sort'):
+                transparent_brushes.sort(key=lambda b: -glm.distance(glm.vec3(b['pos']), camera_pos))
+                sprites.sort(key=lambda s: -glm.distance(glm.vec3(s.pos), camera_pos))
+                fog_volumes.sort(key=lambda b: -glm.distance(glm.vec3(b['pos']), camera_pos))
 
-        # --- Reset GL State ---
-        gl.glEnable(gl.GL_DEPTH_TEST)
-        gl.glPolygonMode(gl.GL_FRONT_AND_BACK, gl.GL_FILL)
-        gl.glDisable(gl.GL_BLEND)
-        gl.glUseProgram(0)
+            gl.glEnable(gl.GL_BLEND)
+            gl.glDepthMask(gl.GL_FALSE) # Don't write to depth buffer
+
+            with profiler.section('sprites', gpu=True):
+                self.draw_sprites(projection, view, sprites, self.sprite_textures)
+            with profiler.section('transparent', gpu=True):
+                self.draw_lit_brushes(projection, view, transparent_brushes, lights, config, is_transparent_pass=True)
+            with profiler.section('fog', gpu=True):
+                self.draw_fog_volumes(projection, view, fog_volumes, lights, camera_pos, config)
+
+            # --- 3. Overlays (Gizmo, selection outline) ---
+            with profiler.section('overlays', gpu=True):
+                gl.glDepthMask(gl.GL_TRUE) # Restore depth mask for gizmo/outlines
+                gl.glDisable(gl.GL_DEPTH_TEST) # Draw on top of everything
+
+                if selected_object:
+                    if isinstance(selected_object, dict): # It's a brush
+                        # Draw wireframe for textured mode, as lit mode handles selection color
+                        if display_mode == "Textured":
+                            self.draw_selected_brush_outline(projection, view, selected_object)
+
+                        # Draw gizmo ONLY if the selected brush is NOT locked
+                        if not selected_object.get('lock', False):
+                            self.render_gizmo(projection, view, selected_object['pos'])
+
+                    elif isinstance(selected_object, Thing): # It's a Thing
+                        # Things don't have a wireframe outline, just the gizmo
+                        self.render_gizmo(projection, view, selected_object.pos)
+
+            # --- Reset GL State ---
+            gl.glEnable(gl.GL_DEPTH_TEST)
+            gl.glPolygonMode(gl.GL_FRONT_AND_BACK, gl.GL_FILL)
+            gl.glDisable(gl.GL_BLEND)
+            gl.glUseProgram(0)
 
     def draw_fog_volumes(self, projection, view, brushes, lights, camera_pos, config):
         """Draws brushes as fog volumes."""
@@ -273,54 +292,56 @@ class Renderer:
         gl.glDisable(gl.GL_CULL_FACE)
 
         for light in lights:
-            gl.glClear(gl.GL_STENCIL_BUFFER_BIT)
+            with self.profiler.section(f"shadow {light.name or 'light'}", gpu=True):
+                gl.glClear(gl.GL_STENCIL_BUFFER_BIT)
             
-            gl.glColorMask(gl.GL_FALSE, gl.GL_FALSE, gl.GL_FALSE, gl.GL_FALSE)
-            gl.glDepthMask(gl.GL_FALSE)
-            gl.glStencilFunc(gl.GL_ALWAYS, 0, 0xFF)
-            gl.glStencilOpSeparate(gl.GL_BACK, gl.GL_KEEP, gl.GL_INCR_WRAP, gl.GL_KEEP)
-            gl.glStencilOpSeparate(gl.GL_FRONT, gl.GL_KEEP, gl.GL_DECR_WRAP, gl.GL_KEEP)
-
-            shader = self.shaders['shadow_volume']
-            gl.glUseProgram(shader)
-            gl.glUniformMatrix4fv(gl.glGetUniformLocation(shader, "projection"), 1, gl.GL_FALSE, glm.value_ptr(projection))
-            gl.glUniformMatrix4fv(gl.glGetUniformLocation(shader, "view"), 1, gl.GL_FALSE, glm.value_ptr(view))
+                gl.glColorMask(gl.GL_FALSE, gl.GL_FALSE, gl.GL_FALSE, gl.GL_FALSE)
+                gl.glDepthMask(gl.GL_FALSE)
+                gl.glStencilFunc(gl.GL_ALWAYS, 0, 0xFF)
+                gl.glStencilOpSeparate(gl.GL_BACK, gl.GL_KEEP, gl.GL_INCR_WRAP, gl.GL_KEEP)
+                gl.glStencilOpSeparate(gl.GL_FRONT, gl.GL_KEEP, gl.GL_DECR_WRAP, gl.GL_KEEP)
+
+                shader = self.shaders['shadow_volume']
+                gl.glUseProgram(shader)
+                gl.glUniformMatrix4fv(gl.glGetUniformLocation(shader, "projection"), 1, gl.GL_FALSE, glm.value_ptr(projection))
+                gl.glUniformMatrix4fv(gl.glGetUniformLocation(shader, "view"), 1, gl.GL_FALSE, glm.value_ptr(view))
             
-            light_pos_vec3 = glm.vec3(light.pos)
-            gl.glUniform3fv(gl.glGetUniformLocation(shader, "light_pos"), 1, glm.value_ptr(light_pos_vec3))
+                light_pos_vec3 = glm.vec3(light.pos)
+                gl.glUniform3fv(gl.glGetUniformLocation(shader, "light_pos"), 1, glm.value_ptr(light_pos_vec3))
             
-            gl.glBindVertexArray(self.vaos['cube'])
-            shadow_casters = [b for b in brushes if not b.get('is_trigger', False)]
-            for brush in shadow_casters:
-                model_matrix = glm.translate(glm.mat4(1.0), glm.vec3(brush['pos'])) * glm.scale(glm.mat4(1.0), glm.vec3(brush['size']))
-                gl.glUniformMatrix4fv(gl.glGetUniformLocation(shader, "model"), 1, gl.GL_FALSE, glm.value_ptr(model_matrix))
-                gl.glDrawArrays(gl.GL_TRIANGLES, 0, 36)
+                gl.glBindVertexArray(self.vaos['cube'])
+                slots = Brush.store.slots(brushes, cache=False)
+                casters = self._brush_model_matrices(slots[(Brush.store.flags[slots] & FLAG_TRIGGER) == 0])
+                model_loc = gl.glGetUniformLocation(shader, "model")
+                for model_matrix in casters:
+                    gl.glUniformMatrix4fv(model_loc, 1, gl.GL_FALSE, model_matrix)
+                    gl.glDrawArrays(gl.GL_TRIANGLES, 0, 36)
             
-            gl.glDepthMask(gl.GL_TRUE)
-            gl.glColorMask(gl.GL_TRUE, gl.GL_TRUE, gl.GL_TRUE, gl.GL_TRUE)
-            gl.glStencilFunc(gl.GL_NOTEQUAL, 0, 0xFF)
-            gl.glStencilOp(gl.GL_KEEP, gl.GL_KEEP, gl.GL_KEEP)
-
-            gl.glEnable(gl.GL_BLEND)
-            gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
-            gl.glDepthFunc(gl.GL_LEQUAL)
-
-            shader = self.shaders['lit']
-            gl.glUseProgram(shader)
-            gl.glUniform1i(gl.glGetUniformLocation(shader, "active_lights"), 0)
-            gl.glUniformMatrix4fv(gl.glGetUniformLocation(shader, "projection"), 1, gl.GL_FALSE, glm.value_ptr(projection))
-            gl.glUniformMatrix4fv(gl.glGetUniformLocation(shader, "view"), 1, gl.GL_FALSE, glm.value_ptr(view))
-
-            gl.glBindVertexArray(self.vaos['cube'])
-            for brush in shadow_casters:
-                model_matrix = glm.translate(glm.mat4(1.0), glm.vec3(brush['pos'])) * glm.scale(glm.mat4(1.0), glm.vec3(brush['size']))
-                gl.glUniformMatrix4fv(gl.glGetUniformLocation(shader, "model"), 1, gl.GL_FALSE, glm.value_ptr(model_matrix))
-                gl.glUniform3fv(gl.glGetUniformLocation(shader, "object_color"), 1, [0.0, 0.0, 0.0])
-                gl.glUniform1f(gl.glGetUniformLocation(shader, "alpha"), 0.5)
-                gl.glDrawArrays(gl.GL_TRIANGLES, 0, 36)
+                gl.glDepthMask(gl.GL_TRUE)
+                gl.glColorMask(gl.GL_TRUE, gl.GL_TRUE, gl.GL_TRUE, gl.GL_TRUE)
+                gl.glStencilFunc(gl.GL_NOTEQUAL, 0, 0xFF)
+                gl.glStencilOp(gl.GL_KEEP, gl.GL_KEEP, gl.GL_KEEP)
+
+                gl.glEnable(gl.GL_BLEND)
+                gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
+                gl.glDepthFunc(gl.GL_LEQUAL)
+
+                shader = self.shaders['lit']
+                gl.glUseProgram(shader)
+                gl.glUniform1i(gl.glGetUniformLocation(shader, "active_lights"), 0)
+                gl.glUniformMatrix4fv(gl.glGetUniformLocation(shader, "projection"), 1, gl.GL_FALSE, glm.value_ptr(projection))
+                gl.glUniformMatrix4fv(gl.glGetUniformLocation(shader, "view"), 1, gl.GL_FALSE, glm.value_ptr(view))
+
+                gl.glBindVertexArray(self.vaos['cube'])
+                model_loc = gl.glGetUniformLocation(shader, "model")
+                for model_matrix in casters:
+                    gl.glUniformMatrix4fv(model_loc, 1, gl.GL_FALSE, model_matrix)
+                    gl.glUniform3fv(gl.glGetUniformLocation(shader, "object_color"), 1, [0.0, 0.0, 0.0])
+                    gl.glUniform1f(gl.glGetUniformLocation(shader, "alpha"), 0.5)
+                    gl.glDrawArrays(gl.GL_TRIANGLES, 0, 36)
                 
-            gl.glDepthFunc(gl.GL_LESS)
-            gl.glDisable(gl.GL_BLEND)
+                gl.glDepthFunc(gl.GL_LESS)
+                gl.glDisable(gl.GL_BLEND)
 
         gl.glDisable(gl.GL_STENCIL_TEST)
         gl.glDisable(gl.GL_DEPTH_CLAMP)
@@ -331,23 +352,34 @@ class Renderer:
         is_play_mode = config.get('play_mode', False)
         show_sprites_in_play_mode = config.get('show_sprites_in_play_mode', False)
 
-        for brush in brushes:
-            if brush.get('hidden', False): continue
-            
-            is_non_solid_mover = brush.get('is_mover', False) and not brush.get('solid', True)
-
-            if brush.get('is_fog', False):
-                 fog_volumes.append(brush)
-            elif brush.get('is_trigger', False) or is_non_solid_mover:
-                if not is_play_mode: transparent_brushes.append(brush)
-            else: 
-                opaque_brushes.append(brush)
+        # Classify every brush from the store's flag bits in one pass.
+        flags = Brush.store.flags[Brush.store.slots(brushes)]
+        visible = (flags & FLAG_HIDDEN) == 0
+        is_fog = visible & ((flags & FLAG_FOG) != 0)
+        is_non_solid_mover = ((flags & FLAG_MOVER) != 0) & ((flags & FLAG_NON_SOLID) != 0)
+        is_transparent = visible & ~is_fog & (((flags & FLAG_TRIGGER) != 0) | is_non_solid_mover)
+        is_opaque = visible & ~is_fog & ~is_transparent
+
+        fog_volumes = [brushes[i] for i in np.flatnonzero(is_fog)]
+        if not is_play_mode: transparent_brushes = [brushes[i] for i in np.flatnonzero(is_transparent)]
+        opaque_brushes = [brushes[i] for i in np.flatnonzero(is_opaque)]
         
         if not is_play_mode or show_sprites_in_play_mode:
             sprites.extend([t for t in things if isinstance(t, Thing)])
             
         return opaque_brushes, transparent_brushes, sprites, fog_volumes
 
+    @staticmethod
+    def _brush_model_matrices(slots):
+        """Column-major translate * scale model matrices for brush store slots, as (N, 16) float32."""
+        store = Brush.store
+        matrices = np.zeros((len(slots), 16), dtype=np.float32)
+        size = store.size[slots]
+        matrices[:, 0], matrices[:, 5], matrices[:, 10] = size[:, 0], size[:, 1], size[:, 2]
+        matrices[:, 12:15] = store.pos[slots]
+        matrices[:, 15] = 1.0
+        return matrices
+
     def draw_grid(self, projection, view, grid_indices_count):
         shader = self.shaders['simple']
         gl.glUseProgram(shader)
@@ -360,6 +392,14 @@ class Renderer:
         gl.glDrawArrays(gl.GL_LINES, 0, grid_indices_count)
         gl.glBindVertexArray(0)
 
+    def draw_models(self, projection, view, camera_pos, models, lights, config):
+        """Draws Model things, one instanced draw per distinct mesh."""
+        if not models: return
+        display_mode = config.get('brush_display_mode', 'Textured')
+        gl.glPolygonMode(gl.GL_FRONT_AND_BACK, gl.GL_LINE if display_mode == "Wireframe" else gl.GL_FILL)
+        self.model_renderer.draw(projection, view, camera_pos, models, self._set_light_uniforms, lights)
+        gl.glPolygonMode(gl.GL_FRONT_AND_BACK, gl.GL_FILL)
+
     def draw_lit_brushes(self, projection, view, brushes, lights, config, is_transparent_pass=False):
         if not brushes: return
         shader = self.shaders['lit']
@@ -374,19 +414,24 @@ class Renderer:
         display_mode = config.get('brush_display_mode', 'Textured')
         show_triggers_solid = config.get('show_triggers_as_solid', False)
 
-        for brush in brushes:
+        slots = Brush.store.slots(brushes, cache=False)
+        matrices = self._brush_model_matrices(slots)
+        flags = Brush.store.flags[slots].tolist()
+        model_loc = gl.glGetUniformLocation(shader, "model")
+        selected_object = config.get('selected_object')
+
+        for brush, model_matrix, brush_flags in zip(brushes, matrices, flags):
             if is_transparent_pass:
                 gl.glPolygonMode(gl.GL_FRONT_AND_BACK, gl.GL_FILL if show_triggers_solid else gl.GL_LINE)
             else:
                 gl.glPolygonMode(gl.GL_FRONT_AND_BACK, gl.GL_FILL if display_mode != "Wireframe" else gl.GL_LINE)
 
-            model_matrix = glm.translate(glm.mat4(1.0), glm.vec3(brush['pos'])) * glm.scale(glm.mat4(1.0), glm.vec3(brush['size']))
-            gl.glUniformMatrix4fv(gl.glGetUniformLocation(shader, "model"), 1, gl.GL_FALSE, glm.value_ptr(model_matrix))
+            gl.glUniformMatrix4fv(model_loc, 1, gl.GL_FALSE, model_matrix)
 
-            is_selected, is_subtract = (brush is config.get('selected_object')), (brush.get('operation') == 'subtract')
-            is_locked = brush.get('lock', False)
+            is_selected, is_subtract = (brush is selected_object), bool(brush_flags & FLAG_SUBTRACT)
+            is_locked = brush_flags & FLAG_LOCK
             color, alpha = [0.8, 0.8, 0.8], 1.0
-            if brush.get('is_trigger', False): color, alpha = [0.0, 1.0, 1.0], 0.3
+            if brush_flags & FLAG_TRIGGER: color, alpha = [0.0, 1.0, 1.0], 0.3
             elif is_selected:
                 color = [1.0, 0.0, 0.0] if is_locked else [1.0, 1.0, 0.0]
             elif is_subtract: color = [1.0, 0.0, 0.0]
@@ -415,17 +460,23 @@ class Renderer:
         show_caulk = config.get('show_caulk', True)
         face_keys = ['south', 'north', 'west', 'east', 'bottom', 'top']
 
-        for brush in brushes:
-            model_matrix = glm.translate(glm.mat4(1.0), glm.vec3(brush['pos'])) * glm.scale(glm.mat4(1.0), glm.vec3(brush['size']))
-            gl.glUniformMatrix4fv(gl.glGetUniformLocation(shader, "model"), 1, gl.GL_FALSE, glm.value_ptr(model_matrix))
-
-            textures = brush.get('textures', {})
-            for i, face_key in enumerate(face_keys):
-                tex_name = textures.get(face_key, 'default.png')
-                if tex_name == 'caulk.jpg':
+        # Per-face interned texture ids for every brush, straight from the brush store.
+        store = Brush.store
+        slots = store.slots(brushes, cache=False)
+        matrices = self._brush_model_matrices(slots)
+        face_textures = store.textures[slots][:, store.face_columns(face_keys)]
+        face_textures[face_textures == NO_TEXTURE] = store.intern('default.png')
+        caulk = store.intern('caulk.jpg')
+        gl_textures = {texture: self.load_texture_callback(store.texture_names[texture], 'textures')
+                       for texture in np.unique(face_textures).tolist() if texture != caulk}
+        model_loc = gl.glGetUniformLocation(shader, "model")
+
+        for model_matrix, textures in zip(matrices, face_textures.tolist()):
+            gl.glUniformMatrix4fv(model_loc, 1, gl.GL_FALSE, model_matrix)
+            for i, texture in enumerate(textures):
+                if texture == caulk:
                     continue # Skip rendering this face
-                tex_id = self.load_texture_callback(tex_name, 'textures')
-                gl.glBindTexture(gl.GL_TEXTURE_2D, tex_id)
+                gl.glBindTexture(gl.GL_TEXTURE_2D, gl_textures[texture])
                 gl.glDrawArrays(gl.GL_TRIANGLES, i * 6, 6)
         gl.glBindVertexArray(0)
 
@@ -32,4 +32,6 @@ SHADOW_VOLUME_VERTEX_SHADER = load_shader_from_file(os.path.join(shader_dir, 'sh
 SHADOW_VOLUME_FRAGMENT_SHADER = load_shader_from_file(os.path.join(shader_dir, 'shadow_volume_fragment_shader.glsl'))
 
 VERTEX_SHADER_FOG = load_shader_from_file(os.path.join(shader_dir, 'vertex_shader_fog.glsl'))
-FRAGMENT_SHADER_FOG = load_shader_from_file(os.path.join(shader_dir, 'fragment_shader_fog.glsl'))
\ No newline at end of file
+FRAGMENT_SHADER_FOG = load_shader_from_file(os.path.join(shader_dir, 'fragment_shader_fog.glsl'))
+
+VERTEX_SHADER_MODEL = load_shader_from_file(os.path.join(shader_dir, 'vertex_shader_model.glsl'))
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+Uniform-grid spatial hash over brush XZ footprints, the broadphase for
+player-vs-brush collision. Each brush is filed under every grid cell its
+footprint overlaps, so a query only visits brushes near the box asked about.
+"""
+import math
+import numpy as np
+from .constants import BROADPHASE_CELL_SIZE
+from .physics import brush_aabbs
+
+
+class BrushSpatialHash:
+    """
+    Brushes are dicts, so entries are keyed by id(). update_brush() refiles a
+    single brush after it moves; sync() rebuilds everything when the brush
+    list itself was replaced or resized, or after mark_dirty(). With
+    skip_movers the hash holds only static brushes, for when a MoverSystem
+    supplies the mover bounds instead.
+    """
+
+    def __init__(self, cell_size=BROADPHASE_CELL_SIZE, skip_movers=False):
+        self.cell_size = cell_size
+        self.skip_movers = skip_movers
+        self.cells = {} # (cx, cz) -> set of brush ids
+        self._entries = {} # brush id -> (brush, index in the list, (cx0, cz0, cx1, cz1))
+        self._source = None
+        self._source_len = 0
+        self._dirty = True
+
+    def _cell_range(self, min_x, min_z, max_x, max_z):
+        size = self.cell_size
+        return (math.floor(min_x / size), math.floor(min_z / size),
+                math.floor(max_x / size), math.floor(max_z / size))
+
+    @staticmethod
+    def _footprint(brush):
+        pos, size = brush['pos'], brush['size']
+        return (pos[0] - size[0] / 2, pos[2] - size[2] / 2,
+                pos[0] + size[0] / 2, pos[2] + size[2] / 2)
+
+    def _file(self, key, cells):
+        cx0, cz0, cx1, cz1 = cells
+        for cx in range(cx0, cx1 + 1):
+            for cz in range(cz0, cz1 + 1):
+                self.cells.setdefault((cx, cz), set()).add(key)
+
+    def _unfile(self, key, cells):
+        cx0, cz0, cx1, cz1 = cells
+        for cx in range(cx0, cx1 + 1):
+            for cz in range(cz0, cz1 + 1):
+                bucket = self.cells.get((cx, cz))
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self.cells[(cx, cz)]
+
+    def rebuild(self, brushes):
+        self.cells.clear()
+        self._entries.clear()
+        # Cell ranges for every brush at once; the list is only walked to file them.
+        mins, maxs = brush_aabbs(brushes)
+        cell_ranges = np.floor(np.concatenate((mins[:, [0, 2]], maxs[:, [0, 2]]), axis=1) / self.cell_size)
+        for index, (brush, cells) in enumerate(zip(brushes, cell_ranges.astype(np.int64).tolist())):
+            # Triggers are volumes, not collision; everything else blocks the player.
+            if brush.get('is_trigger') or (self.skip_movers and brush.get('is_mover')):
+                continue
+            cells = tuple(cells)
+            self._entries[id(brush)] = (brush, index, cells)
+            self._file(id(brush), cells)
+        self._source, self._source_len = brushes, len(brushes)
+        self._dirty = False
+
+    def mark_dirty(self):
+        """Forces a rebuild on the next sync(), after edits made outside the session."""
+        self._dirty = True
+
+    def sync(self, brushes):
+        if self._dirty or brushes is not self._source or len(brushes) != self._source_len:
+            self.rebuild(brushes)
+
+    def update_brush(self, brush):
+        """Refiles one brush after its position or size changed."""
+        entry = self._entries.get(id(brush))
+        if entry is None:
+            return
+        cells = self._cell_range(*self._footprint(brush))
+        if cells != entry[2]:
+            self._unfile(id(brush), entry[2])
+            self._file(id(brush), cells)
+            self._entries[id(brush)] = (brush, entry[1], cells)
+
+    def query(self, min_x, min_z, max_x, max_z):
+        """Returns the brushes filed in any cell overlapping the box, in brush-list order."""
+        cx0, cz0, cx1, cz1 = self._cell_range(min_x, min_z, max_x, max_z)
+        found = set()
+        for cx in range(cx0, cx1 + 1):
+            for cz in range(cz0, cz1 + 1):
+                bucket = self.cells.get((cx, cz))
+                if bucket:
+                    found |= bucket
+        # Keep list order so results match a full scan over every brush.
+        entries = sorted((self._entries[key] for key in found), key=lambda entry: entry[1])
+        return [entry[0] for entry in entries]
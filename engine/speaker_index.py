@@ -0,0 +1,86 @@
+"""
+Audibility queries for positional Speakers.
+
+Each speaker is filed in a uniform XZ grid under every cell its radius can
+reach, so a query only looks at the bucket holding the listener. A speaker
+becomes audible inside its radius and stays audible until the listener is
+SPEAKER_HYSTERESIS of the radius further out, so sounds don't start and stop
+repeatedly while the player stands on the boundary.
+"""
+import math
+import numpy as np
+from editor.things import Speaker
+from .constants import SPEAKER_GRID_CELL_SIZE, SPEAKER_HYSTERESIS
+
+
+class SpeakerIndex:
+    def __init__(self, cell_size=SPEAKER_GRID_CELL_SIZE, hysteresis=SPEAKER_HYSTERESIS):
+        self.cell_size = cell_size
+        self.hysteresis = hysteresis
+        self.speakers = []
+        self.positions = np.empty((0, 3))
+        self.radii = np.empty(0)
+        self.cells = {} # (cx, cz) -> array of speaker indexes
+        self.audible = set() # Indexes into speakers
+        self._dropped = [] # Audible speakers a rebuild dropped (deleted or made global), reported as left by update()
+        self._layout = None # Positions and radii the grid was built from
+        self._source = None
+        self._source_len = 0
+        self._dirty = True
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def sync(self, things):
+        """
+        Rebuilds the grid if speakers were added, removed or moved since the
+        last build. Audible speakers that are gone are reported as left by
+        the next update().
+        """
+        if not self._dirty and things is self._source and len(things) == self._source_len:
+            return
+        self._source, self._source_len = things, len(things)
+        self._dirty = False
+        store = Speaker.store
+        slots = store.select(things, Speaker, is_global=False)
+        positions = store.pos[slots]
+        radii = store.radius[slots].astype(np.float64)
+        layout = (store.ids[slots], positions, radii)
+        if self._layout is not None and all(np.array_equal(a, b) for a, b in zip(layout, self._layout)):
+            return
+        speakers = store.objects(slots)
+        audible = {id(self.speakers[i]): self.speakers[i] for i in self.audible}
+        self._layout = layout
+        self.speakers = speakers
+        self.positions = positions
+        self.radii = radii
+        self.audible = {i for i, s in enumerate(speakers) if id(s) in audible}
+        kept = {id(speakers[i]) for i in self.audible}
+        self._dropped.extend(s for key, s in audible.items() if key not in kept)
+
+        cells = {}
+        size = self.cell_size
+        for index, (pos, radius) in enumerate(zip(self.positions, self.radii)):
+            # File under the outer, leaving radius so audible speakers are always found.
+            reach = radius * (1.0 + self.hysteresis)
+            for cx in range(math.floor((pos[0] - reach) / size), math.floor((pos[0] + reach) / size) + 1):
+                for cz in range(math.floor((pos[2] - reach) / size), math.floor((pos[2] + reach) / size) + 1):
+                    cells.setdefault((cx, cz), []).append(index)
+        self.cells = {cell: np.array(indexes) for cell, indexes in cells.items()}
+
+    def update(self, listener_pos):
+        """Returns (entered, left) lists of Speakers for the listener's new position."""
+        size = self.cell_size
+        candidates = self.cells.get((math.floor(listener_pos[0] / size), math.floor(listener_pos[2] / size)))
+        now = set()
+        if candidates is not None:
+            distance = np.linalg.norm(self.positions[candidates] - np.asarray(listener_pos, dtype=np.float64), axis=1)
+            radius = self.radii[candidates]
+            was_audible = np.array([i in self.audible for i in candidates.tolist()], dtype=bool)
+            limit = np.where(was_audible, radius * (1.0 + self.hysteresis), radius)
+            now = set(candidates[distance <= limit].tolist())
+        entered = [self.speakers[i] for i in sorted(now - self.audible)]
+        left = self._dropped + [self.speakers[i] for i in sorted(self.audible - now)]
+        self._dropped = []
+        self.audible = now
+        return entered, left
@@ -0,0 +1,293 @@
+"""
+Collision tilemap: solid brushes rasterized into a TILE_SIZE grid of
+WALL_TILE / FLOOR_TILE cells over the level's XZ extent.
+
+A brush counts as wall where it blocks a player standing on floor_y: its
+bottom is below head height and its top is above a step. Lookups are O(1)
+array reads; update_brush() and sync() re-rasterize only the cells a changed
+brush covered before or covers now.
+
+Precompute a map's tilemap next to it, memory-mapped when played:
+
+    python -m engine.tilemap maps/Office_Corridor.json
+"""
+import os
+import sys
+import json
+import math
+import hashlib
+import argparse
+import numpy as np
+from .constants import TILE_SIZE, WALL_TILE, FLOOR_TILE, STEP_HEIGHT, COLLISION_SKIN
+from .physics import is_solid_brush
+
+TILEMAP_PADDING = 2 # Tiles of floor kept around the level's extent
+TILEMAP_CLEARANCE = TILE_SIZE * 2 # Height a cell must be free for, the player's height
+
+
+def _footprints(brushes):
+    """Returns (brushes kept, (N, 6) array of min x, min y, min z, max x, max y, max z)."""
+    solid = [b for b in brushes if is_solid_brush(b)]
+    if not solid:
+        return solid, np.empty((0, 6))
+    pos = np.array([b['pos'] for b in solid], dtype=np.float64)
+    half = np.array([b['size'] for b in solid], dtype=np.float64) / 2.0
+    return solid, np.hstack([pos - half, pos + half])
+
+
+def default_floor_y(brushes, start_pos):
+    """The top of the highest solid brush under start_pos, which the player lands on."""
+    _, boxes = _footprints(brushes)
+    x, y, z = start_pos
+    under = (boxes[:, 0] <= x) & (x <= boxes[:, 3]) & (boxes[:, 2] <= z) & (z <= boxes[:, 5]) & (boxes[:, 4] <= y)
+    return float(boxes[under, 4].max()) if under.any() else float(y) - TILE_SIZE
+
+
+class CollisionTileMap:
+    def __init__(self, tiles, origin_x, origin_z, floor_y, clearance=TILEMAP_CLEARANCE, tile_size=TILE_SIZE):
+        self.tiles = tiles # (depth, width) array indexed [z, x]
+        self.origin_x, self.origin_z = origin_x, origin_z # Tile index of tiles[0, 0]
+        self.floor_y, self.clearance = floor_y, clearance
+        self.tile_size = tile_size
+        self.version = 0 # Bumped whenever tiles change, for caches built from them
+        self._brushes = []
+        self._boxes = np.empty((0, 6))
+        self._rows = {} # brush id -> row in _boxes
+        self._source = None
+        self._source_len = 0
+        self._dirty = False
+
+    # --- Building ---
+    @classmethod
+    def build(cls, brushes, floor_y, clearance=TILEMAP_CLEARANCE, tile_size=TILE_SIZE):
+        solid, boxes = _footprints(brushes)
+        if len(boxes):
+            min_x, min_z = boxes[:, 0].min(), boxes[:, 2].min()
+            max_x, max_z = boxes[:, 3].max(), boxes[:, 5].max()
+        else:
+            min_x = min_z = max_x = max_z = 0.0
+        origin_x = math.floor(min_x / tile_size) - TILEMAP_PADDING
+        origin_z = math.floor(min_z / tile_size) - TILEMAP_PADDING
+        width = max(1, math.ceil(max_x / tile_size) + TILEMAP_PADDING - origin_x)
+        depth = max(1, math.ceil(max_z / tile_size) + TILEMAP_PADDING - origin_z)
+
+        tile_map = cls(np.full((depth, width), FLOOR_TILE, dtype=np.int8), origin_x, origin_z, floor_y, clearance, tile_size)
+        tile_map._track(brushes, solid, boxes)
+        tile_map._rasterize(0, 0, depth, width)
+        return tile_map
+
+    def _track(self, brushes, solid, boxes):
+        self._brushes, self._boxes = solid, boxes
+        self._rows = {id(brush): row for row, brush in enumerate(solid)}
+        self._source, self._source_len = brushes, len(brushes)
+        self._dirty = False
+
+    def _cell_ranges(self, boxes):
+        """Half-open [z0, z1) x [x0, x1) tile ranges of boxes, relative to the array."""
+        size = self.tile_size
+        x0 = np.floor(boxes[:, 0] / size).astype(np.int64) - self.origin_x
+        z0 = np.floor(boxes[:, 2] / size).astype(np.int64) - self.origin_z
+        x1 = np.ceil(boxes[:, 3] / size).astype(np.int64) - self.origin_x
+        z1 = np.ceil(boxes[:, 5] / size).astype(np.int64) - self.origin_z
+        return z0, x0, z1, x1
+
+    def _blocking(self, boxes):
+        return (boxes[:, 1] < self.floor_y + self.clearance) & (boxes[:, 4] > self.floor_y + STEP_HEIGHT)
+
+    def _rasterize(self, z0, x0, z1, x1):
+        """Recomputes tiles[z0:z1, x0:x1] from every blocking brush overlapping it."""
+        region = self.tiles[z0:z1, x0:x1]
+        if region.size == 0:
+            return
+        boxes = self._boxes[self._blocking(self._boxes)]
+        bz0, bx0, bz1, bx1 = self._cell_ranges(boxes)
+        bz0, bx0 = np.clip(bz0, z0, z1) - z0, np.clip(bx0, x0, x1) - x0
+        bz1, bx1 = np.clip(bz1, z0, z1) - z0, np.clip(bx1, x0, x1) - x0
+        keep = (bz0 < bz1) & (bx0 < bx1)
+        bz0, bx0, bz1, bx1 = bz0[keep], bx0[keep], bz1[keep], bx1[keep]
+
+        # Summed-area rasterization: +1/-1 at each rectangle's corners, then prefix sums.
+        coverage = np.zeros((region.shape[0] + 1, region.shape[1] + 1), dtype=np.int32)
+        np.add.at(coverage, (bz0, bx0), 1)
+        np.add.at(coverage, (bz0, bx1), -1)
+        np.add.at(coverage, (bz1, bx0), -1)
+        np.add.at(coverage, (bz1, bx1), 1)
+        coverage = coverage.cumsum(axis=0).cumsum(axis=1)[:-1, :-1]
+        region[:] = np.where(coverage > 0, WALL_TILE, FLOOR_TILE)
+        self.version += 1
+
+    # --- Keeping in sync with brush edits ---
+    def _patch(self, old_box, new_box):
+        ranges = self._cell_ranges(np.vstack([old_box, new_box]))
+        depth, width = self.tiles.shape
+        z0, x0 = max(0, int(ranges[0].min())), max(0, int(ranges[1].min()))
+        z1, x1 = min(depth, int(ranges[2].max())), min(width, int(ranges[3].max()))
+        self._rasterize(z0, x0, z1, x1)
+
+    def update_brush(self, brush):
+        """Re-rasterizes the cells under one brush after it moved or resized."""
+        row = self._rows.get(id(brush))
+        if row is None:
+            return
+        _, boxes = _footprints([brush])
+        if len(boxes) == 0 or np.array_equal(boxes[0], self._boxes[row]):
+            return
+        old_box = self._boxes[row].copy()
+        self._boxes[row] = boxes[0]
+        self._patch(old_box, boxes[0])
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def sync(self, brushes):
+        """
+        After mark_dirty() or a change to the brush list, diffs every brush's
+        box against the cached ones and patches only those that changed.
+        """
+        if not self._dirty and brushes is self._source and len(brushes) == self._source_len:
+            return
+        solid, boxes = _footprints(brushes)
+        old_boxes = self._boxes
+        if len(solid) == len(self._brushes) and all(a is b for a, b in zip(solid, self._brushes)):
+            changed = np.flatnonzero(np.any(boxes != old_boxes, axis=1))
+            self._track(brushes, solid, boxes)
+            for row in changed:
+                self._patch(old_boxes[row], boxes[row])
+            return
+        # Brushes were added, removed or replaced (e.g. by undo).
+        self._track(brushes, solid, boxes)
+        self._rasterize(0, 0, *self.tiles.shape)
+
+    # --- Queries ---
+    def cell(self, x, z):
+        """Array (row, column) of the tile containing world (x, z)."""
+        return math.floor(z / self.tile_size) - self.origin_z, math.floor(x / self.tile_size) - self.origin_x
+
+    def is_wall(self, x, z):
+        row, col = self.cell(x, z)
+        depth, width = self.tiles.shape
+        # Everything outside the grid is solid, so nothing walks off the map.
+        if not (0 <= row < depth and 0 <= col < width):
+            return True
+        return self.tiles[row, col] == WALL_TILE
+
+    def box_blocked(self, min_x, min_z, max_x, max_z):
+        row0, col0 = self.cell(min_x, min_z)
+        row1, col1 = self.cell(max_x, max_z)
+        depth, width = self.tiles.shape
+        if row0 < 0 or col0 < 0 or row1 >= depth or col1 >= width:
+            return True
+        return bool((self.tiles[row0:row1 + 1, col0:col1 + 1] == WALL_TILE).any())
+
+    def move_box(self, x, z, half_x, half_z, dx, dz):
+        """
+        Moves an XZ box centered on (x, z) by (dx, dz), one axis at a time so it
+        slides along walls. Steps are at most half a tile, so nothing tunnels.
+        Returns the new (x, z).
+        """
+        steps = max(1, math.ceil(max(abs(dx), abs(dz)) / (self.tile_size / 2)))
+        step_x, step_z = dx / steps, dz / steps
+        size = self.tile_size
+        for _ in range(steps):
+            if step_x:
+                new_x = x + step_x
+                if self.box_blocked(new_x - half_x, z - half_z, new_x + half_x, z + half_z):
+                    # Stop against the boundary of the tile the leading edge entered.
+                    if step_x > 0:
+                        new_x = math.floor((new_x + half_x) / size) * size - half_x - COLLISION_SKIN
+                    else:
+                        new_x = (math.floor((new_x - half_x) / size) + 1) * size + half_x + COLLISION_SKIN
+                    step_x = 0.0
+                x = new_x
+            if step_z:
+                new_z = z + step_z
+                if self.box_blocked(x - half_x, new_z - half_z, x + half_x, new_z + half_z):
+                    if step_z > 0:
+                        new_z = math.floor((new_z + half_z) / size) * size - half_z - COLLISION_SKIN
+                    else:
+                        new_z = (math.floor((new_z - half_z) / size) + 1) * size + half_z + COLLISION_SKIN
+                    step_z = 0.0
+                z = new_z
+        return x, z
+
+    # --- Precomputed tilemaps ---
+    @staticmethod
+    def path_for_level(level_path):
+        return os.path.splitext(level_path)[0] + '.collision.npy'
+
+    @staticmethod
+    def _digest(boxes, floor_y, clearance, tile_size):
+        header = np.array([floor_y, clearance, tile_size], dtype=np.float64)
+        return hashlib.sha1(header.tobytes() + np.ascontiguousarray(boxes).tobytes()).hexdigest()
+
+    def save(self, path):
+        """Writes the tiles as .npy plus a .json sidecar with the origin and a digest of the brushes."""
+        np.save(path, np.asarray(self.tiles))
+        meta = {
+            'origin': [self.origin_x, self.origin_z],
+            'floor_y': self.floor_y,
+            'clearance': self.clearance,
+            'tile_size': self.tile_size,
+            'digest': self._digest(self._boxes, self.floor_y, self.clearance, self.tile_size),
+        }
+        with open(os.path.splitext(path)[0] + '.json', 'w') as f:
+            json.dump(meta, f, indent=4)
+
+    @classmethod
+    def load(cls, path, brushes, floor_y, clearance=TILEMAP_CLEARANCE, tile_size=TILE_SIZE):
+        """
+        Memory-maps a saved tilemap copy-on-write, so pages are read on first
+        touch and patches stay private. Returns None when the file is missing
+        or was built from different brushes or settings.
+        """
+        meta_path = os.path.splitext(path)[0] + '.json'
+        if not (os.path.exists(path) and os.path.exists(meta_path)):
+            return None
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        solid, boxes = _footprints(brushes)
+        if meta.get('digest') != cls._digest(boxes, floor_y, clearance, tile_size):
+            return None
+        tile_map = cls(np.load(path, mmap_mode='c'), meta['origin'][0], meta['origin'][1], floor_y, clearance, tile_size)
+        tile_map._track(brushes, solid, boxes)
+        return tile_map
+
+    @classmethod
+    def for_level(cls, brushes, level_path, floor_y):
+        """Loads the level's precomputed tilemap if it is current, otherwise builds one."""
+        if level_path:
+            tile_map = cls.load(cls.path_for_level(level_path), brushes, floor_y)
+            if tile_map is not None:
+                return tile_map
+        return cls.build(brushes, floor_y)
+
+
+def main():
+    # Run as a module so the relative imports resolve: python -m engine.tilemap
+    from editor.editor_state import EditorState
+    from editor.things import PlayerStart
+    parser = argparse.ArgumentParser(description="Precompute a level's collision tilemap for play mode.")
+    parser.add_argument('map', help="Level JSON file")
+    parser.add_argument('--floor-y', type=float, help="Floor height (default: the floor under the PlayerStart)")
+    args = parser.parse_args()
+
+    with open(args.map, 'r') as f:
+        level_data = json.load(f)
+    state = EditorState()
+    state.load_from_data(level_data)
+    floor_y = args.floor_y
+    if floor_y is None:
+        start = next((t for t in state.things if isinstance(t, PlayerStart)), None)
+        if not start:
+            sys.exit("No PlayerStart in the map; pass --floor-y.")
+        floor_y = default_floor_y(state.brushes, start.pos)
+
+    tile_map = CollisionTileMap.build(state.brushes, floor_y)
+    path = CollisionTileMap.path_for_level(args.map)
+    tile_map.save(path)
+    walls = int((tile_map.tiles == WALL_TILE).sum())
+    print(f"Wrote {path}: {tile_map.tiles.shape[1]}x{tile_map.tiles.shape[0]} tiles, {walls} wall, floor at y={floor_y:g}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""
+Trigger volumes with incremental sweep-and-prune.
+
+The min and max endpoints of every trigger and actor box are kept sorted on
+each axis. When a box moves, its endpoints are bubbled to their new places;
+each time one passes an endpoint of the other kind, the pair's count of
+overlapping axes goes up or down. A trigger and an actor overlap when that
+count is 3. Per-tick cost is the number of endpoints crossed plus the
+overlaps reported, not the number of brushes.
+
+Triggers get stable integer IDs that survive edits to the brush list. Actors
+are keyed by any other hashable value, such as PLAYER_ACTOR or ('thing', entity id).
+"""
+from bisect import bisect_left
+
+PLAYER_ACTOR = 'player'
+ENTER, STAY, EXIT = 'enter', 'stay', 'exit'
+
+
+class _Endpoint:
+    __slots__ = ('value', 'is_max', 'owner', 'index')
+
+    def __init__(self, value, is_max, owner):
+        self.value, self.is_max, self.owner = value, is_max, owner
+        self.index = 0
+
+    def sort_key(self):
+        # Mins sort before maxes at equal values, so touching boxes overlap.
+        return (self.value, self.is_max)
+
+
+class _Proxy:
+    __slots__ = ('key', 'is_trigger', 'ends')
+
+    def __init__(self, key, is_trigger, box_min, box_max):
+        self.key, self.is_trigger = key, is_trigger
+        self.ends = [(_Endpoint(box_min[a], False, self), _Endpoint(box_max[a], True, self)) for a in range(3)]
+
+
+def brush_bounds(brush):
+    pos, size = brush['pos'], brush['size']
+    return ([pos[a] - size[a] / 2 for a in range(3)], [pos[a] + size[a] / 2 for a in range(3)])
+
+
+class TriggerSystem:
+    def __init__(self):
+        self.axes = ([], [], [])
+        self._proxies = {}
+        self._axis_counts = {} # (actor key, trigger id) -> number of axes overlapping
+        self._touched = set() # Pairs whose counts changed since the last update()
+        self.overlaps = {} # actor key -> set of trigger ids
+        self.trigger_brushes = {} # trigger id -> brush dict
+        self._trigger_ids = {} # id(brush) -> trigger id
+        self._next_id = 1
+        self._source = None
+        self._source_len = 0
+        self._dirty = True
+
+    # --- Proxies ---
+    def _add(self, key, is_trigger, box_min, box_max):
+        proxy = _Proxy(key, is_trigger, box_min, box_max)
+        self._proxies[key] = proxy
+        for axis, (lo, hi) in enumerate(proxy.ends):
+            endpoints = self.axes[axis]
+            keys = [e.sort_key() for e in endpoints]
+            endpoints.insert(bisect_left(keys, hi.sort_key()), hi)
+            endpoints.insert(bisect_left(keys, lo.sort_key()), lo)
+            self._reindex(axis)
+        # New proxies start with their overlap counts computed directly.
+        for other in self._proxies.values():
+            if other.is_trigger == is_trigger:
+                continue
+            count = sum(1 for a in range(3)
+                        if proxy.ends[a][0].value <= other.ends[a][1].value and other.ends[a][0].value <= proxy.ends[a][1].value)
+            if count:
+                pair = self._pair(proxy, other)
+                self._axis_counts[pair] = count
+                self._touched.add(pair)
+
+    def _remove(self, key):
+        proxy = self._proxies.pop(key)
+        for axis, (lo, hi) in enumerate(proxy.ends):
+            endpoints = self.axes[axis]
+            del endpoints[hi.index]
+            del endpoints[lo.index]
+            self._reindex(axis)
+        for pair in [p for p in self._axis_counts if key in p]:
+            del self._axis_counts[pair]
+            self._touched.add(pair)
+
+    def _reindex(self, axis):
+        for index, end in enumerate(self.axes[axis]):
+            end.index = index
+
+    @staticmethod
+    def _pair(a, b):
+        return (b.key, a.key) if a.is_trigger else (a.key, b.key)
+
+    def _move(self, key, box_min, box_max):
+        proxy = self._proxies[key]
+        for axis, (lo, hi) in enumerate(proxy.ends):
+            if lo.value == box_min[axis] and hi.value == box_max[axis]:
+                continue
+            # Bubble the leading end first so the other never stops against it early.
+            order = (hi, lo) if box_max[axis] > hi.value else (lo, hi)
+            lo.value, hi.value = box_min[axis], box_max[axis]
+            for end in order:
+                self._bubble(axis, end)
+
+    def _bubble(self, axis, end):
+        endpoints = self.axes[axis]
+        i, key = end.index, end.sort_key()
+        while i > 0 and endpoints[i - 1].sort_key() > key:
+            other = endpoints[i - 1]
+            self._crossed(end, other, moving_left=True)
+            endpoints[i], other.index = other, i
+            i -= 1
+        while i < len(endpoints) - 1 and endpoints[i + 1].sort_key() < key:
+            other = endpoints[i + 1]
+            self._crossed(end, other, moving_left=False)
+            endpoints[i], other.index = other, i
+            i += 1
+        endpoints[i], end.index = end, i
+
+    def _crossed(self, end, other, moving_left):
+        if end.is_max == other.is_max or end.owner.is_trigger == other.owner.is_trigger:
+            return
+        # A min moving left past a max, or a max moving right past a min, starts an overlap.
+        delta = 1 if moving_left != end.is_max else -1
+        pair = self._pair(end.owner, other.owner)
+        count = self._axis_counts.get(pair, 0) + delta
+        if count:
+            self._axis_counts[pair] = count
+        else:
+            self._axis_counts.pop(pair, None)
+        self._touched.add(pair)
+
+    # --- Actors ---
+    def add_actor(self, key, box_min, box_max):
+        self._add(key, False, box_min, box_max)
+
+    def move_actor(self, key, box_min, box_max):
+        if key in self._proxies:
+            self._move(key, box_min, box_max)
+        else:
+            self.add_actor(key, box_min, box_max)
+
+    def remove_actor(self, key):
+        if key in self._proxies:
+            self._remove(key)
+
+    # --- Triggers ---
+    def mark_dirty(self):
+        self._dirty = True
+
+    def sync(self, brushes):
+        """Adds, moves and removes trigger volumes to match the brush list after edits."""
+        if not self._dirty and brushes is self._source and len(brushes) == self._source_len:
+            return
+        current = {}
+        for brush in brushes:
+            if brush.get('is_trigger'):
+                current[id(brush)] = brush
+        for brush_key in [k for k in self._trigger_ids if k not in current]:
+            trigger_id = self._trigger_ids.pop(brush_key)
+            del self.trigger_brushes[trigger_id]
+            self._remove(trigger_id)
+        for brush_key, brush in current.items():
+            box_min, box_max = brush_bounds(brush)
+            trigger_id = self._trigger_ids.get(brush_key)
+            if trigger_id is None:
+                trigger_id = self._trigger_ids[brush_key] = self._next_id
+                self._next_id += 1
+                self.trigger_brushes[trigger_id] = brush
+                self._add(trigger_id, True, box_min, box_max)
+            else:
+                self._move(trigger_id, box_min, box_max)
+        self._source, self._source_len = brushes, len(brushes)
+        self._dirty = False
+
+    def trigger_id(self, brush):
+        return self._trigger_ids.get(id(brush))
+
+    def update(self):
+        """
+        Returns this step's events as (ENTER | STAY | EXIT, actor key, trigger id),
+        in a stable order so replays fire targets identically.
+        """
+        events = []
+        for actor, trigger_id in sorted(self._touched, key=repr):
+            inside = self._axis_counts.get((actor, trigger_id), 0) == 3
+            current = self.overlaps.setdefault(actor, set())
+            if inside and trigger_id not in current:
+                current.add(trigger_id)
+                events.append((ENTER, actor, trigger_id))
+            elif not inside and trigger_id in current:
+                current.discard(trigger_id)
+                events.append((EXIT, actor, trigger_id))
+        entered = {(actor, trigger_id) for kind, actor, trigger_id in events if kind == ENTER}
+        for actor, trigger_ids in self.overlaps.items():
+            events.extend((STAY, actor, t) for t in sorted(trigger_ids) if (actor, t) not in entered)
+        self._touched.clear()
+        return events
@@ -1,17 +1,23 @@
 import configparser
 import sys
+import os
 import json
+import argparse
 import numpy as np
 import math # Import math for floor/ceil
 from PyQt5.QtWidgets import QApplication, QMainWindow
 from PyQt5.QtCore import Qt
 from engine.qt_game_view import QtGameView
+from engine.tilemap import CollisionTileMap, default_floor_y
+from engine.flythrough import CameraPath, FlythroughBenchmark, PathRecorder, FLYTHROUGH_SPEED
 from editor.things import Light, PlayerStart, Thing
+from editor.editor_state import EditorState
 from engine.constants import TILE_SIZE, WALL_TILE, FLOOR_TILE
 
 class GameWindow(QMainWindow):
-    def __init__(self, level_file):
+    def __init__(self, level_file, flythrough=None, flythrough_speed=FLYTHROUGH_SPEED, flythrough_output=None):
         super().__init__()
+        self.level_file = level_file
         self.setWindowTitle("Game")
         self.setGeometry(100, 100, 1280, 720)
 
@@ -19,6 +25,7 @@ class GameWindow(QMainWindow):
         self.config = configparser.ConfigParser()
         self.config.read('settings.ini')
 
+        self.state = EditorState()
         self.brushes = []
         self.things = []
         self.selected_object = None
@@ -29,7 +36,11 @@ class GameWindow(QMainWindow):
 
         # Load the level data
         self.load_level(level_file)
-        
+
+        if flythrough:
+            self.start_flythrough(flythrough, flythrough_speed, flythrough_output)
+            return
+
         # Find player start and launch into play mode
         player_start = None
         for thing in self.things:
@@ -43,8 +54,47 @@ class GameWindow(QMainWindow):
             print("Warning: No Player Start found in the map.")
 
 
+    def set_selected_object(self, obj):
+        self.state.set_selected_object(obj)
+
+    def update_views(self):
+        self.game_view.update()
+
+    def flythrough_path_file(self):
+        return os.path.splitext(self.level_file)[0] + '.flythrough.json'
+
+    def start_flythrough(self, source, speed, output_prefix):
+        """Flies the camera along a recorded path file, or 'auto' for PlayerStart -> Lights."""
+        if source == 'auto':
+            path = CameraPath.through_level(self.things)
+        else:
+            path = CameraPath.load(source)
+        output_prefix = output_prefix or os.path.splitext(self.level_file)[0] + '_flythrough'
+        print(f"Starting fly-through over {path.length:.0f} units at {speed:.0f} units/s")
+        self.game_view.start_flythrough(FlythroughBenchmark(path, speed), output_prefix, lambda benchmark: self.close())
+
+    def toggle_path_recording(self):
+        """Starts or stops recording the player's route as a fly-through path (F9)."""
+        if self.game_view.path_recorder is None:
+            self.game_view.path_recorder = PathRecorder()
+            print("Recording fly-through path... press F9 again to stop.")
+        else:
+            self.game_view.path_recorder.save(self.flythrough_path_file())
+            self.game_view.path_recorder = None
+
+    def closeEvent(self, event):
+        if self.game_view.input_recorder:
+            self.game_view.stop_input_recording()
+        super().closeEvent(event)
+
     def keyPressEvent(self, event):
         """Track pressed keys for the game view and handle mode switching."""
+        if event.key() == Qt.Key_F9:
+            self.toggle_path_recording()
+            return
+        if event.key() == Qt.Key_F8:
+            self.game_view.toggle_input_recording()
+            return
         self.keys_pressed.add(event.key())
         
         # Toggle game mode on 'G' press
@@ -73,18 +123,17 @@ class GameWindow(QMainWindow):
             print(f"Error: Could not decode JSON from {file_path}")
             return
 
-        self.brushes = level_data.get('brushes', [])
-        
-        self.things = []
+        # QtGameView reads the scene through self.state, as it does in the editor
+        self.state.load_from_data(level_data)
+        self.brushes = self.state.brushes
+        self.things = self.state.things
+
         player_start_pos = [0, TILE_SIZE, 0] # Default player start height
         player_start_angle = -90.0
-        for thing_data in level_data.get('things', []):
-            thing = Thing.from_dict(thing_data)
-            if thing:
-                self.things.append(thing)
-                if isinstance(thing, PlayerStart):
-                    player_start_pos = thing.pos
-                    player_start_angle = thing.get_angle()
+        for thing in self.things:
+            if isinstance(thing, PlayerStart):
+                player_start_pos = thing.pos
+                player_start_angle = thing.get_angle()
 
 
         # Initialize editor camera at player start location
@@ -92,18 +141,24 @@ class GameWindow(QMainWindow):
         self.game_view.camera.yaw = player_start_angle
         print("Level loaded. Editor camera positioned at Player Start.")
 
-        # --- Tilemap generation is skipped ---
-        self.game_view.set_tile_map(None)
-        print("Skipping tilemap generation for direct play.")
+        # Tilemap collision is opt-in through Settings > collision = tilemap
+        tile_map = None
+        if self.config.get('Settings', 'collision', fallback='brushes') == 'tilemap':
+            tile_map = CollisionTileMap.for_level(self.brushes, file_path, default_floor_y(self.brushes, player_start_pos))
+            print(f"Using a {tile_map.tiles.shape[1]}x{tile_map.tiles.shape[0]} collision tilemap.")
+        self.game_view.set_tile_map(tile_map)
 
 
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("Usage: python game.py <path_to_level.json>")
-        sys.exit(1)
-
-    app = QApplication(sys.argv)
-    level_file = sys.argv[1]
-    window = GameWindow(level_file)
+    parser = argparse.ArgumentParser(description="Play a level.")
+    parser.add_argument('level', help="Path to the level .json file")
+    parser.add_argument('--flythrough', nargs='?', const='auto', metavar='PATH',
+                        help="Benchmark a camera fly-through instead of playing: a path recorded with F9, or 'auto' (PlayerStart through all Lights)")
+    parser.add_argument('--speed', type=float, default=FLYTHROUGH_SPEED, help="Fly-through speed in units per second")
+    parser.add_argument('--output', help="Prefix for the fly-through report and heatmap (default: next to the level)")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    window = GameWindow(args.level, args.flythrough, args.speed, args.output)
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file
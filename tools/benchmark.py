@@ -0,0 +1,237 @@
+# End-to-end benchmark suite over synthetic maps.
+#
+#   python tools/benchmark.py --sizes small medium --output benchmarks/results.json
+#
+# Each hot path is timed at every map size and the results are written as JSON
+# so runs can be compared over time. Runs without a display via Qt's offscreen
+# platform (see engine/headless.py).
+
+import os
+import sys
+import json
+import time
+import copy
+import random
+import platform
+import argparse
+import subprocess
+import statistics
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.synthetic_map import PRESETS, generate_synthetic_map
+
+
+def time_call(func, repeat, setup=None):
+    """Runs func repeat times (calling setup untimed before each run) and returns timing stats in ms."""
+    samples = []
+    for _ in range(repeat):
+        if setup: setup()
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return {
+        'runs': repeat,
+        'mean_ms': statistics.fmean(samples),
+        'median_ms': statistics.median(samples),
+        'min_ms': min(samples),
+        'max_ms': max(samples),
+        'stdev_ms': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=PROJECT_ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class BenchmarkSuite:
+    """Times the editor and engine hot paths against one synthetic level at a time."""
+
+    def __init__(self, repeat=10, render=True, ui=True, width=1280, height=720):
+        self.repeat = repeat
+        self.render, self.ui = render, ui
+        self.width, self.height = width, height
+        self.headless = None
+        self.main_window = None
+
+    def setup(self):
+        # The headless module picks the offscreen Qt platform when there is no display,
+        # so it has to be imported before the QApplication is created.
+        from engine import headless
+        from PyQt5.QtWidgets import QApplication
+        self.app = QApplication.instance() or QApplication(sys.argv[:1])
+        if self.render:
+            try:
+                self.headless = headless.HeadlessRenderer(self.width, self.height)
+            except RuntimeError as e:
+                print(f"Skipping render benchmarks: {e}")
+        if self.ui:
+            from editor.main_window import MainWindow
+            self.main_window = MainWindow(root_dir=PROJECT_ROOT)
+            for view in (self.main_window.view_top, self.main_window.view_front, self.main_window.view_side):
+                view.resize(self.width, self.height)
+
+    def run_level(self, level):
+        from editor.editor_state import EditorState
+        results = {}
+        state = EditorState()
+        state.load_from_data(copy.deepcopy(level))
+
+        if self.headless:
+            from engine.headless import default_camera
+            camera = default_camera(state)
+            self.headless.render(state, camera, finish=True) # Warm-up: texture loads, shader caches
+            results['render_scene'] = time_call(lambda: self.headless.render(state, camera, finish=True), self.repeat)
+
+        results['player_update'] = self._bench_player(state)
+        results['player_update_broadphase'] = self._bench_player(state, broadphase=True)
+        results.update(self._bench_json(state, level))
+        results.update(self._bench_undo(state)) # Last: it leaves its edits in the level
+
+
+        if self.main_window:
+            results.update(self._bench_ui(level))
+        return results
+
+    def _bench_player(self, state, ticks=120, broadphase=False):
+        """Times Player.update walking forward through the level, optionally through the spatial hash; reported per tick."""
+        from PyQt5.QtCore import Qt
+        from engine.player import Player
+        from engine.spatial_hash import BrushSpatialHash
+        from editor.things import PlayerStart
+        start = next((t for t in state.things if isinstance(t, PlayerStart)), None)
+        start_pos = start.pos if start else [0, 100, 0]
+        keys = {Qt.Key_W}
+
+        def walk():
+            player = Player(start_pos[0], start_pos[2])
+            player.pos.y = start_pos[1]
+            if broadphase:
+                player.broadphase = BrushSpatialHash()
+                player.broadphase.rebuild(state.brushes)
+            for tick in range(ticks):
+                player.angle = tick * 0.05 # Sweep around so collision hits different brushes
+                player.update(keys, state.brushes, 1.0 / 60.0)
+
+        stats = time_call(walk, self.repeat)
+        per_tick = {key: value / ticks for key, value in stats.items() if key.endswith('_ms')}
+        per_tick['runs'] = stats['runs'] * ticks
+        return per_tick
+
+    def _bench_undo(self, state, edited=100):
+        """Times save_state and undo over a real edit: brushes moved and retextured, and a light added."""
+        from editor.things import Light
+        rng = random.Random(2)
+        state.history.coalesce_seconds = 0 # Every run records a step of its own instead of merging into the last
+
+        def edit():
+            for brush in rng.sample(list(state.brushes), min(edited, len(state.brushes))):
+                pos = brush['pos']
+                brush['pos'] = [pos[0] + 8, pos[1], pos[2]]
+                brush['textures'] = {'north': f"benchmark_{rng.randrange(4)}.png"}
+            state.things.append(Light([rng.uniform(-512, 512), 64, rng.uniform(-512, 512)]))
+
+        def edit_and_save():
+            edit()
+            state.save_state()
+
+        state.save_state() # Nothing pending from the other benchmarks
+        return {
+            'save_state': time_call(state.save_state, self.repeat, setup=edit),
+            'undo': time_call(state.undo, self.repeat, setup=edit_and_save),
+        }
+
+    def _bench_json(self, state, level):
+        from editor.editor_state import EditorState
+        path = os.path.join(PROJECT_ROOT, 'benchmarks', '_benchmark_level.json')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        def save():
+            with open(path, 'w') as f:
+                json.dump(state.get_level_data(), f, indent=4)
+
+        def load():
+            with open(path, 'r') as f:
+                EditorState().load_from_data(json.load(f))
+
+        results = {'json_save': time_call(save, self.repeat), 'json_load': time_call(load, self.repeat)}
+        results['json_size_bytes'] = os.path.getsize(path)
+        os.remove(path)
+        return results
+
+    def _bench_ui(self, level):
+        window = self.main_window
+        rng = random.Random(1)
+        brush_count = len(level['brushes'])
+
+        def reset_with_subtraction():
+            window.state.load_from_data(copy.deepcopy(level))
+            target = window.state.brushes[rng.randrange(1, brush_count)]
+            subtract = {'pos': list(target['pos']), 'size': [s * 0.5 for s in target['size']], 'textures': dict(target['textures'])}
+            window.state.brushes.append(subtract)
+            window.state.selected_object = window.state.brushes[-1] # The stored Brush, not the dict
+
+        def subtract_and_refresh():
+            window.perform_subtraction()
+            window.flush_scene_changes() # The UI refresh is otherwise deferred to the next tick
+
+        results = {'perform_subtraction': time_call(subtract_and_refresh, self.repeat, setup=reset_with_subtraction)}
+
+        window.state.load_from_data(copy.deepcopy(level))
+        window.state.selected_object = None
+        results['view2d_paint'] = time_call(window.view_top.grab, self.repeat)
+        results['scene_hierarchy_refresh'] = time_call(window.scene_hierarchy.refresh_list, self.repeat)
+        return results
+
+    def cleanup(self):
+        if self.headless:
+            self.headless.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark editor and engine hot paths on synthetic maps.")
+    parser.add_argument('--sizes', nargs='+', choices=sorted(PRESETS), default=['small', 'medium'])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--no-render', action='store_true', help="Skip the headless render_scene benchmark")
+    parser.add_argument('--no-ui', action='store_true', help="Skip the Qt widget benchmarks")
+    parser.add_argument('--output', default=os.path.join('benchmarks', f"results_{time.strftime('%Y%m%d_%H%M%S')}.json"))
+    args = parser.parse_args()
+
+    output_path = os.path.abspath(args.output)
+    os.chdir(PROJECT_ROOT) # Asset, shader and settings paths are relative to the project root
+
+    suite = BenchmarkSuite(repeat=args.repeat, render=not args.no_render, ui=not args.no_ui)
+    suite.setup()
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'sizes': {},
+    }
+    for size in args.sizes:
+        params = PRESETS[size]
+        print(f"--- {size}: {params} ---")
+        level = generate_synthetic_map(seed=args.seed, **params)
+        results = suite.run_level(level)
+        for name, stats in results.items():
+            if isinstance(stats, dict):
+                print(f"{name:<26}{stats['mean_ms']:10.3f} ms (median {stats['median_ms']:.3f})")
+        report['sizes'][size] = {'map': params, 'results': results}
+    suite.cleanup()
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# Replays a recorded play session headless and reports simulation speed.
+#
+#   python tools/replay_session.py recordings/session_20250101_120000.json --repeat 5
+#
+# Sessions are recorded in play mode with F8. By default ticks run at a fixed
+# 1/60 s step; --recorded-timing uses the deltas captured live instead, which
+# reproduces the session exactly and checks the player ends where it did.
+
+import os
+import sys
+import argparse
+import cProfile
+import pstats
+import statistics
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from engine.input_recording import REPLAY_TIMESTEP, load_recording, replay
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded play session without a window.")
+    parser.add_argument('recording', help="Recording JSON written by F8 in play mode")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--timestep', type=float, default=REPLAY_TIMESTEP, help="Fixed seconds per tick")
+    parser.add_argument('--recorded-timing', action='store_true', help="Use each tick's recorded delta instead of --timestep")
+    parser.add_argument('--profile', action='store_true', help="Print the top functions by cumulative time for one run")
+    args = parser.parse_args()
+
+    recording = load_recording(args.recording)
+    timestep = None if args.recorded_timing else args.timestep
+    tick_count = len(recording['ticks'])
+    if not tick_count:
+        print("Recording has no ticks.")
+        return
+
+    rates = []
+    for _ in range(max(1, args.repeat)):
+        session, elapsed = replay(recording, timestep)
+        rates.append(tick_count / elapsed if elapsed > 0 else float('inf'))
+
+    pos = session.player.pos
+    print(f"{tick_count} ticks, {len(recording['level']['brushes'])} brushes")
+    print(f"Simulation: mean {statistics.fmean(rates):,.0f} ticks/s, best {max(rates):,.0f} ticks/s over {len(rates)} runs")
+    print(f"Final player position: ({pos.x:.3f}, {pos.y:.3f}, {pos.z:.3f})")
+    if args.recorded_timing:
+        matches = session.snapshot() == recording['end']
+        print("Matches recorded end state." if matches else f"Diverged from recorded end state {recording['end']['pos']}")
+
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.runcall(replay, recording, timestep)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# Generates parameterised synthetic maps for benchmarking.
+#
+#   python tools/synthetic_map.py maps/synthetic_large.json --brushes 5000 --things 5000
+
+import os
+import json
+import random
+import argparse
+
+TEXTURES = [
+    'Brick_09-512x512.png', 'Brick_11-512x512.png', 'Metal_08-512x512.png',
+    'Plaster_05-512x512.png', 'Stone_09-512x512.png', 'Stone_13-512x512.png',
+    'Stone_14-512x512.png', 'Tile_03-512x512.png', 'Tile_05-512x512.png',
+]
+FACES = ['north', 'south', 'east', 'west', 'top', 'bottom']
+GRID = 16
+FLOOR_Y = 0
+
+# Named size presets used by the benchmark suite.
+PRESETS = {
+    'small':  dict(brushes=200, lights=4, shadow_lights=1, fog=2, triggers=5, things=500),
+    'medium': dict(brushes=1000, lights=16, shadow_lights=2, fog=8, triggers=20, things=2000),
+    'large':  dict(brushes=5000, lights=32, shadow_lights=4, fog=16, triggers=50, things=5000),
+}
+
+
+def _snap(value):
+    return round(value / GRID) * GRID
+
+
+def _random_textures(rng):
+    return {face: rng.choice(TEXTURES) for face in FACES}
+
+
+def generate_synthetic_map(brushes=1000, lights=16, shadow_lights=2, fog=8, triggers=20, things=2000, seed=1):
+    """
+    Builds a level dict in the editor's JSON format. Solid brushes are
+    scattered over a square floor that grows with the brush count; each
+    trigger targets its own mover, and Things are a mix of monsters, pickups
+    and speakers. The same arguments always produce the same map.
+    """
+    rng = random.Random(seed)
+    half_extent = _snap(max(1024, (brushes ** 0.5) * 160) / 2)
+
+    level_brushes = [{
+        'pos': [0, FLOOR_Y - 8, 0],
+        'size': [half_extent * 2, 16, half_extent * 2],
+        'textures': _random_textures(rng),
+        'operation': 'add',
+        'name': 'Floor',
+    }]
+
+    for _ in range(brushes):
+        size = [_snap(rng.uniform(32, 256)) or GRID, _snap(rng.uniform(32, 320)) or GRID, _snap(rng.uniform(32, 256)) or GRID]
+        level_brushes.append({
+            'pos': [_snap(rng.uniform(-half_extent, half_extent)), FLOOR_Y + size[1] / 2, _snap(rng.uniform(-half_extent, half_extent))],
+            'size': size,
+            'textures': _random_textures(rng),
+            'operation': 'add',
+        })
+
+    for i in range(fog):
+        size = [_snap(rng.uniform(128, 512)), _snap(rng.uniform(64, 256)), _snap(rng.uniform(128, 512))]
+        level_brushes.append({
+            'pos': [_snap(rng.uniform(-half_extent, half_extent)), FLOOR_Y + size[1] / 2, _snap(rng.uniform(-half_extent, half_extent))],
+            'size': size,
+            'textures': _random_textures(rng),
+            'is_fog': True,
+            'fog_color': [rng.random(), rng.random(), rng.random()],
+            'fog_density': 0.01,
+            'name': f'Fog{i + 1:02d}',
+        })
+
+    for i in range(triggers):
+        mover_name = f'Mover{i + 1:02d}'
+        x, z = _snap(rng.uniform(-half_extent, half_extent)), _snap(rng.uniform(-half_extent, half_extent))
+        level_brushes.append({
+            'pos': [x, FLOOR_Y + 64, z],
+            'size': [128, 128, 128],
+            'textures': _random_textures(rng),
+            'is_trigger': True,
+            'target': mover_name,
+            'trigger_type': rng.choice(['once', 'multiple']),
+            'name': f'Trigger{i + 1:02d}',
+        })
+        level_brushes.append({
+            'pos': [x + 192, FLOOR_Y + 8, z],
+            'size': [128, 16, 128],
+            'textures': _random_textures(rng),
+            'is_mover': True,
+            'name': mover_name,
+            'direction': [0, 1, 0],
+            'distance': 128,
+            'speed': 64,
+            'solid': True,
+            'start_on': False,
+            'move_once': rng.random() < 0.5,
+        })
+
+    level_things = [{'type': 'playerstart', 'pos': [0, FLOOR_Y + 100, 0], 'properties': {'type': 'playerstart', 'name': 'PlayerStart_1', 'angle': '0.0'}}]
+
+    for i in range(lights):
+        properties = {
+            'type': 'light', 'name': f'Light_{i + 1}', 'colour': str([255, 255, 255]), 'intensity': '1.0',
+            'radius': str(float(rng.choice([512, 768, 1024]))), 'state': 'on', 'show_radius': 'False',
+            'casts_shadows': str(i < shadow_lights),
+        }
+        level_things.append({'type': 'light', 'pos': [_snap(rng.uniform(-half_extent, half_extent)), FLOOR_Y + 400, _snap(rng.uniform(-half_extent, half_extent))], 'properties': properties})
+
+    for i in range(things):
+        pos = [_snap(rng.uniform(-half_extent, half_extent)), FLOOR_Y + 32, _snap(rng.uniform(-half_extent, half_extent))]
+        kind = rng.random()
+        if kind < 0.5:
+            properties = {'type': 'monster', 'name': f'Monster_{i + 1}', 'id': '0'}
+        elif kind < 0.9:
+            properties = {'type': 'pickup', 'name': f'Pickup_{i + 1}', 'item_type': 'health', 'value': '25'}
+        else:
+            properties = {'type': 'speaker', 'name': f'Speaker_{i + 1}', 'sound_file': '', 'radius': '512.0', 'global': 'False',
+                          'show_radius': 'False', 'volume': '1.0', 'looping': 'False', 'play_on_start': 'False'}
+        level_things.append({'type': properties['type'], 'pos': pos, 'properties': properties})
+
+    return {'brushes': level_brushes, 'things': level_things}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic benchmark map.")
+    parser.add_argument('output', help="Level JSON file to write")
+    parser.add_argument('--preset', choices=sorted(PRESETS), help="Start from a named size preset")
+    for key, value in PRESETS['medium'].items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=int, dest=key, help=f"(default {value})")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    params = dict(PRESETS[args.preset or 'medium'])
+    params.update({key: getattr(args, key) for key in params if getattr(args, key) is not None})
+    level = generate_synthetic_map(seed=args.seed, **params)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(level, f, indent=4)
+    print(f"Wrote {args.output}: {len(level['brushes'])} brushes, {len(level['things'])} things")
+
+
+if __name__ == '__main__':
+    main()